@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Compare the kubectl and native API backends on a full cluster scan.
+
+Runs the log collection engine plus the cluster overview calls against the
+fake kubectl and the local stub API server, reporting subprocess count, HTTP
+requests/connections and wall-clock time.
+
+    python benchmarks/bench_backends.py --namespaces 50 --pods 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fake_kubectl  # noqa: E402
+from fake_apiserver import FakeApiServer  # noqa: E402
+from helm.collector import collect_logs, load_inventory  # noqa: E402
+from helm.kube import ApiBackend, KubectlBackend, load_kubeconfig  # noqa: E402
+
+
+def scan(backend, workers):
+    started = time.perf_counter()
+    inventory = load_inventory(backend=backend)
+    targets = inventory.select_targets(budget=len(inventory.pods))
+    result = collect_logs(targets, max_workers=workers, call_timeout=60, total_timeout=None, backend=backend)
+    backend.cluster_info()
+    backend.nodes_table()
+    backend.namespaces_table()
+    backend.events_table()
+    return time.perf_counter() - started, len(result.logs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--namespaces', type=int, default=50)
+    parser.add_argument('--pods', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'KUBECTL': fake_kubectl.install(),
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': str(args.latency),
+    })
+
+    kubectl = KubectlBackend()
+    kubectl_time, kubectl_pods = scan(kubectl, args.workers)
+
+    server = FakeApiServer().start()
+    kubeconfig = server.write_kubeconfig(os.path.join(tempfile.mkdtemp(), "config"))
+    api = ApiBackend(load_kubeconfig(kubeconfig), pool_size=args.workers)
+    api_time, api_pods = scan(api, args.workers)
+    api.close()
+    server.stop()
+
+    print(f"Fake cluster: {args.namespaces} namespaces x {args.pods} pods, {args.latency}s per call")
+    print(f"kubectl backend: {kubectl_time:7.2f}s  {kubectl_pods} pods  {kubectl.calls} subprocesses")
+    print(f"API backend:     {api_time:7.2f}s  {api_pods} pods  0 subprocesses, "
+          f"{server.requests} requests over {server.connections} connections")
+    print(f"Speedup: {kubectl_time / api_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Classifier throughput on plain-text and JSON log lines.
+
+    python benchmarks/bench_classifier.py --lines 200000
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_templates import synthetic_lines  # noqa: E402
+from helm.classifier import get_classifier  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    args = parser.parse_args()
+
+    plain = [line for _, _, line in synthetic_lines(args.lines)]
+    structured = []
+    for line in plain:
+        stamp, level, message = line.split(' ', 2)
+        structured.append(json.dumps({'ts': stamp, 'level': level.lower(), 'msg': message}))
+
+    classifier = get_classifier()
+    for label, corpus in (("plain text", plain), ("JSON", structured)):
+        severities, categories = Counter(), Counter()
+        started = time.perf_counter()
+        for line in corpus:
+            result = classifier.classify(line)
+            severities[result.severity] += 1
+            categories.update(result.categories)
+        elapsed = time.perf_counter() - started
+        print(f"{label:10} {len(corpus) / elapsed:>10,.0f} lines/s  {dict(severities)}")
+        print(f"{'':10} categories: {dict(categories.most_common())}")
+
+
+if __name__ == "__main__":
+    main()
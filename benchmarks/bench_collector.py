@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Benchmark serial vs concurrent log collection against the fake kubectl.
+
+    python benchmarks/bench_collector.py --namespaces 20 --pods 10 --latency 0.1
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fake_kubectl  # noqa: E402
+from helm.collector import collect_logs, load_inventory  # noqa: E402
+
+
+def timed_collection(targets, workers):
+    started = time.perf_counter()
+    result = collect_logs(targets, since="1h", max_workers=workers, call_timeout=30, total_timeout=None)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--namespaces', type=int, default=10)
+    parser.add_argument('--pods', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'KUBECTL': fake_kubectl.install(),
+        'HELM_KUBE_BACKEND': 'kubectl',
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': str(args.latency),
+    })
+    # Fetch every pod so both runs do the same amount of work
+    inventory = load_inventory()
+    targets = inventory.select_targets(budget=len(inventory.pods))
+
+    serial_time, serial = timed_collection(targets, workers=1)
+    parallel_time, parallel = timed_collection(targets, workers=args.workers)
+
+    print(f"Fake cluster: {len(inventory.namespaces())} namespaces x {args.pods} pods, {args.latency}s per kubectl call")
+    print(f"Serial   (1 worker):   {serial_time:7.2f}s  {len(serial.logs)} pods")
+    print(f"Parallel ({args.workers} workers): {parallel_time:7.2f}s  {len(parallel.logs)} pods")
+    print(f"Speedup: {serial_time / parallel_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
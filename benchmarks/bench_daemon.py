@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Cron-style cold runs vs. jobs in the warm daemon.
+
+Runs the health check ``--runs`` times as a fresh Python process each time
+(the cron setup), then the same number of times as jobs queued over HTTP on
+one daemon process. Both use the offline stub LLM and the local stub API
+server, so the difference is process start-up: imports, crew construction,
+LLM client and Kubernetes connection setup.
+
+    python benchmarks/bench_daemon.py --runs 5 --latency 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+
+COLD_RUN = """
+import sys
+sys.path[:0] = [{src!r}, {bench!r}]
+from stub_llm import StubLLM
+from helm.main import run_health_check
+run_health_check(llm=StubLLM(latency={latency}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.2, help="seconds per stub LLM call")
+    parser.add_argument('--namespaces', type=int, default=5)
+    parser.add_argument('--pods', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': "0.01",
+        # The health check reads 6h of logs; keep that small so start-up is what is measured
+        'FAKE_K8S_LOG_RATE': "0.1",
+        'HELM_KUBE_BACKEND': "api",
+        'HELM_LLM_CACHE': "0",
+        'HELM_STATE_DIR': workdir,
+        'CREWAI_TELEMETRY_OPT_OUT': "true",
+        'OTEL_SDK_DISABLED': "true",
+    })
+    server = FakeApiServer().start()
+    os.environ['KUBECONFIG'] = server.write_kubeconfig(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    print(f"Fake cluster: {args.namespaces} namespaces x {args.pods} pods, stub LLM {args.latency}s per call")
+
+    script = COLD_RUN.format(src=str(SRC), bench=str(Path(__file__).resolve().parent), latency=args.latency)
+    cold = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], check=True, capture_output=True)
+        cold.append(time.perf_counter() - started)
+    print(f"cold process per run: {sum(cold) / len(cold):6.2f}s per run  (first {cold[0]:.2f}s)")
+
+    started = time.perf_counter()
+    # crewAI's verbose console output would drown the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        from helm.crew import KubernetesLogAnalysis
+        from helm.daemon import Daemon
+        from helm.main import run_health_check
+        from stub_llm import StubLLM
+
+        warm = KubernetesLogAnalysis(llm=StubLLM(latency=args.latency))
+        warm.crew()
+        daemon = Daemon({'health': lambda: run_health_check(analyzer=warm)}, [], port=0).start()
+    startup = time.perf_counter() - started
+    url = f"http://127.0.0.1:{daemon.port}"
+    warm_runs = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            request = urllib.request.Request(f"{url}/run/health", data=b"{}", method="POST")
+            job = json.load(urllib.request.urlopen(request))
+            while json.load(urllib.request.urlopen(f"{url}/jobs/{job['id']}"))['status'] in ("queued", "running"):
+                time.sleep(0.02)
+            warm_runs.append(time.perf_counter() - started)
+        daemon.stop()
+    server.stop()
+    print(f"warm daemon job:      {sum(warm_runs) / len(warm_runs):6.2f}s per run  (daemon start-up {startup:.2f}s once)")
+    print(f"Speedup per run: {sum(cold) / sum(warm_runs):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Crew run with the log_collector agent vs. collection run directly in Python.
+
+Both modes run the full crew offline: a stub LLM (fixed latency per call plus
+a per-token generation cost) against the local stub API server. Reports
+wall-clock time, LLM calls and prompt/output size.
+
+    python benchmarks/bench_direct_collection.py --latency 1.0 --token-latency 0.01
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+from stub_llm import StubLLM  # noqa: E402
+
+
+def run(direct, llm):
+    from helm.crew import KubernetesLogAnalysis
+    from helm.evidence import collect_evidence
+    from helm.main import get_default_inputs
+
+    inputs = get_default_inputs()
+    started = time.perf_counter()
+    # crewAI's verbose console output would drown the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer = KubernetesLogAnalysis(incremental=False, llm=llm, cache=False)
+        if direct:
+            evidence = collect_evidence(inputs['namespaces'], inputs['time_range'], incremental=False)
+            analyzer.evidence = analyzer.prepare_evidence(evidence, inputs)
+        analyzer.crew().kickoff(inputs=inputs)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=1.0, help="seconds per stub LLM call")
+    parser.add_argument('--token-latency', type=float, default=0.01, help="seconds per generated token")
+    parser.add_argument('--namespaces', type=int, default=10)
+    parser.add_argument('--pods', type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': "0.01",
+        'HELM_KUBE_BACKEND': "api",
+        'HELM_STATE_DIR': workdir,
+        'CREWAI_TELEMETRY_OPT_OUT': "true",
+        'OTEL_SDK_DISABLED': "true",
+    })
+    server = FakeApiServer().start()
+    os.environ['KUBECONFIG'] = server.write_kubeconfig(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+
+    print(f"Fake cluster: {args.namespaces} namespaces x {args.pods} pods, stub LLM "
+          f"{args.latency}s per call + {args.token_latency}s per output token")
+    results = {}
+    for label, direct in (("agent", False), ("direct", True)):
+        llm = StubLLM(latency=args.latency, token_latency=args.token_latency)
+        elapsed = run(direct, llm)
+        results[label] = elapsed
+        print(f"{label:6} collection: {elapsed:6.2f}s  {llm.calls:2d} LLM calls  "
+              f"~{llm.prompt_chars // 4:,} prompt tokens  ~{llm.output_chars // 4:,} output tokens")
+    server.stop()
+    print(f"Speedup: {results['agent'] / results['direct']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
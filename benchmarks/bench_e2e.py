@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+"""
+End-to-end cost of every main.py action against a fake cluster and the stub LLM.
+
+Each action runs in a fresh process, in order, sharing one state directory:
+``history`` therefore sees the runs recorded before it. The fake cluster is
+served by the local stub API server or the fake kubectl (``--backend``),
+with per-call latency and optional failure injection (``--fail-rate``,
+limited to calls containing ``--fail-match``). The crew runs on the offline
+stub LLM with prompt caching off. Per action, the suite reports wall time,
+kubectl subprocesses, API requests and bytes, failed calls, the peak
+RSS of the action process, LLM calls and prompt and completion tokens.
+``--save`` writes the results as JSON; ``--compare`` fails when a metric
+grew by more than ``--threshold`` over a saved baseline. The daemon (long
+running, see bench_daemon.py) and train/replay/test (crewAI utilities that
+need a real model) are not measured.
+
+    python benchmarks/bench_e2e.py --namespaces 10 --pods 10 --save e2e.json
+    python benchmarks/bench_e2e.py --namespaces 10 --pods 10 --compare e2e.json
+    python benchmarks/bench_e2e.py --fail-rate 0.2 --fail-match /log --actions collect,run
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+SRC = BENCH.parent / "src"
+sys.path.insert(0, str(SRC))
+sys.path.insert(0, str(BENCH))
+
+import fake_kubectl  # noqa: E402
+from fake_apiserver import FakeApiServer, write_fleet_kubeconfig  # noqa: E402
+
+
+def _run(llm, namespace):
+    from helm.main import run_log_analysis
+    return run_log_analysis(llm=llm)
+
+
+def _incident(llm, namespace):
+    from helm.main import run_incident_investigation
+    return run_incident_investigation(namespace, llm=llm)
+
+
+def _health(llm, namespace):
+    from helm.main import run_health_check
+    return run_health_check(llm=llm)
+
+
+def _security(llm, namespace):
+    from helm.main import run_security_audit
+    return run_security_audit(llm=llm)
+
+
+def _fleet(llm, namespace):
+    from helm.main import run_fleet_analysis
+    results = run_fleet_analysis(llm=llm)
+    failed = [r for r in results if not r.ok]
+    if failed:
+        raise RuntimeError(f"{failed[0].context}: {failed[0].error}")
+    return results
+
+
+def _collect(llm, namespace):
+    from helm.main import run_collect
+    return run_collect()
+
+
+def _events(llm, namespace):
+    from helm.main import run_events
+    return run_events(top=10)
+
+
+def _history(llm, namespace):
+    from helm.main import run_history
+    return run_history()
+
+
+# action -> (function, uses the LLM); in the order they run
+ACTIONS = {
+    'run': (_run, True),
+    'incident': (_incident, True),
+    'health': (_health, True),
+    'security': (_security, True),
+    'fleet': (_fleet, True),
+    'collect': (_collect, False),
+    'events': (_events, False),
+    'history': (_history, False),
+}
+
+# Metrics compared against a baseline; more is worse for each of them
+COMPARED = ('wall', 'kubectl_calls', 'api_requests', 'api_bytes', 'peak_rss_mb', 'llm_calls', 'prompt_tokens')
+
+
+def child(action, out, namespace, llm_latency):
+    """Run one action in this process and write its measurements to ``out``"""
+    function, uses_llm = ACTIONS[action]
+    llm = None
+    if uses_llm:
+        # Only the LLM actions load crewAI, as in the CLI
+        from stub_llm import StubLLM
+        llm = StubLLM(latency=llm_latency)
+    started = time.perf_counter()
+    error = None
+    try:
+        if function(llm, namespace) is False:
+            error = "the action could not start"
+    except Exception as e:
+        error = str(e)
+    elapsed = time.perf_counter() - started
+    with open(out, "w") as f:
+        json.dump({
+            'action_time': elapsed,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'llm_calls': llm.calls if llm else 0,
+            'prompt_tokens': llm.prompt_tokens if llm else 0,
+            'completion_tokens': llm.completion_tokens if llm else 0,
+            'max_prompt_tokens': llm.max_prompt_chars // 4 if llm else 0,
+            'error': error,
+        }, f)
+
+
+def measure(action, workdir, server, namespace, llm_latency):
+    call_log = os.path.join(workdir, "kubectl-calls.log")
+    open(call_log, "w").close()
+    out = os.path.join(workdir, f"{action}.json")
+    requests, sent, failures = server.requests, server.bytes_sent, server.failures
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, __file__, "--child", action, "--out", out, "--namespace", namespace,
+                              "--llm-latency", str(llm_latency)],
+                             cwd=workdir, env=dict(os.environ, FAKE_K8S_CALL_LOG=call_log),
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - started
+    if process.returncode != 0 or not os.path.exists(out):
+        return {'wall': wall, 'error': f"exited with {process.returncode}: {process.stderr[-300:]}"}
+    with open(out) as f:
+        result = json.load(f)
+    with open(call_log) as f:
+        calls = f.read().splitlines()
+    return dict(result, wall=wall, kubectl_calls=len(calls), api_requests=server.requests - requests,
+                api_bytes=server.bytes_sent - sent,
+                failures=server.failures - failures + sum(call.startswith("failed ") for call in calls))
+
+
+def compare(results, baseline, threshold):
+    """Regressions of ``results`` against a saved run"""
+    regressions = []
+    for action, base in baseline['actions'].items():
+        current = results['actions'].get(action)
+        if current is None:
+            continue
+        if current.get('error') and not base.get('error'):
+            regressions.append(f"{action}: now fails ({current['error'][:80]})")
+            continue
+        for metric in COMPARED:
+            if metric in base and metric in current and current[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{action}: {metric} {current[metric]:,.2f} vs {base[metric]:,.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--actions', default=','.join(ACTIONS), help="comma-separated actions to run")
+    parser.add_argument('--backend', choices=['api', 'kubectl'], default='api')
+    parser.add_argument('--namespaces', type=int, default=10)
+    parser.add_argument('--pods', type=int, default=10)
+    parser.add_argument('--log-rate', type=float, default=0.2, help="log lines per pod per second")
+    parser.add_argument('--latency', type=float, default=0.01, help="seconds per cluster call")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="seconds per stub LLM call")
+    parser.add_argument('--fail-rate', type=float, default=0, help="share of cluster calls that fail")
+    parser.add_argument('--fail-match', default="", help="only cluster calls containing this text fail")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per action; the median wall time is kept")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed growth of a metric vs. the baseline")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    parser.add_argument('--namespace', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.out, args.namespace, args.llm_latency)
+        return
+
+    actions = [a.strip() for a in args.actions.split(',') if a.strip()]
+    unknown = [a for a in actions if a not in ACTIONS]
+    if unknown:
+        parser.error(f"unknown actions: {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix="helm-e2e-")
+    os.environ.update({
+        'KUBECTL': fake_kubectl.install(),
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LOG_RATE': str(args.log_rate),
+        'FAKE_K8S_LATENCY': str(args.latency),
+        'FAKE_K8S_FAIL_RATE': str(args.fail_rate),
+        'FAKE_K8S_FAIL_MATCH': args.fail_match,
+        'HELM_KUBE_BACKEND': args.backend,
+        'HELM_STATE_DIR': os.path.join(workdir, "state"),
+        'HELM_FLEET_REPORT_DIR': os.path.join(workdir, "reports"),
+        'HELM_LLM_CACHE': "0",
+        'CREWAI_TELEMETRY_OPT_OUT': "true",
+        'OTEL_SDK_DISABLED': "true",
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(SRC), str(BENCH), os.getenv('PYTHONPATH')])),
+    })
+    os.environ.pop('SLACK_WEBHOOK_URL', None)
+    cfg = fake_kubectl.config()
+    server = FakeApiServer(cfg).start()
+    # Two contexts on the same fake cluster, so fleet mode has something to fan out over
+    os.environ['KUBECONFIG'] = write_fleet_kubeconfig(os.path.join(workdir, "config"),
+                                                      {'fake': server.url, 'fake-b': server.url})
+    namespace = fake_kubectl.namespace_names(cfg)[-1]
+
+    print(f"Fake cluster: {args.namespaces} namespaces x {args.pods} pods via {args.backend}, "
+          f"{args.latency}s per call, {args.fail_rate:.0%} injected failures; stub LLM {args.llm_latency}s per call")
+    print(f"{'action':10} {'wall':>8} {'kubectl':>8} {'requests':>9} {'API bytes':>11} {'failed':>7} "
+          f"{'peak RSS':>9} {'LLM calls':>10} {'prompt tok':>11} {'output tok':>11}")
+    results = {
+        'meta': {
+            'date': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'python': platform.python_version(),
+            'revision': subprocess.run(["git", "describe", "--always", "--dirty"], cwd=BENCH, capture_output=True,
+                                       text=True).stdout.strip() or None,
+            'config': {name: value for name, value in vars(args).items()
+                       if name not in ('save', 'compare', 'child', 'out', 'namespace')},
+        },
+        'actions': {},
+    }
+    for action in actions:
+        runs = [measure(action, workdir, server, namespace, args.llm_latency) for _ in range(args.repeat)]
+        result = dict(runs[-1], wall=statistics.median(r['wall'] for r in runs))
+        results['actions'][action] = result
+        if 'kubectl_calls' not in result:
+            print(f"{action:10} {result['wall']:7.2f}s  {result['error']}")
+            continue
+        print(f"{action:10} {result['wall']:7.2f}s {result['kubectl_calls']:8} {result['api_requests']:9} "
+              f"{result['api_bytes']:11,} {result['failures']:7} {result['peak_rss_mb']:7.0f}Mi "
+              f"{result['llm_calls']:10} {result['prompt_tokens']:11,} {result['completion_tokens']:11,}"
+              + (f"  error: {result['error'][:60]}" if result['error'] else ""))
+    server.stop()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} vs {args.compare} "
+              f"({baseline['meta'].get('revision') or 'unknown revision'})")
+
+
+if __name__ == "__main__":
+    main()
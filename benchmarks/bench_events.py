@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Re-listing every event on each run vs. the watch-maintained event index.
+
+Against the local stub API server, each of ``--runs`` runs either lists all
+events and keeps the first 20 rows of the table sorted by lastTimestamp (the
+old behaviour), or syncs the event index (one list, then watches from the
+stored resourceVersion) and queries the Warning events of the last hour.
+Between runs some warnings repeat. Reports time and bytes per run, and how
+many of the currently repeating warnings each approach surfaces.
+
+    python benchmarks/bench_events.py --namespaces 100 --pods 20 --runs 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--namespaces', type=int, default=100)
+    parser.add_argument('--pods', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--repeating', type=int, default=20, help="warnings that repeat between runs")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': "0",
+        'HELM_STATE_DIR': workdir,
+    })
+    server = FakeApiServer().start()
+    os.environ['KUBECONFIG'] = server.write_kubeconfig(os.path.join(workdir, "config"))
+
+    from helm.events import EventIndex, ago
+    from helm.kube import create_backend
+
+    backend = create_backend("api")
+    print(f"Fake cluster: {args.namespaces} namespaces x {args.pods} pods, {len(server.events):,} events, "
+          f"{args.repeating} warnings repeating between runs")
+    totals = {'list': [0.0, 0, 0], 'index': [0.0, 0, 0]}
+    for run in range(1, args.runs + 1):
+        repeating = {f"pod/{e['involvedObject']['name']}" for e in server.touch_events(args.repeating)}
+
+        sent, started = server.bytes_sent, time.perf_counter()
+        rows = backend.events_table().splitlines()[1:21]
+        elapsed = time.perf_counter() - started
+        found = sum(1 for obj in repeating if any(f" {obj} " in row for row in rows))
+        totals['list'][0] += elapsed
+        totals['list'][1] += server.bytes_sent - sent
+        totals['list'][2] += found
+        print(f"run {run} re-list: {elapsed:6.2f}s  {server.bytes_sent - sent:>10,} bytes  "
+              f"{found:3}/{len(repeating)} repeating warnings in the 20 rows kept")
+
+        # A new index per run, loaded from disk as a fresh process would
+        sent, started = server.bytes_sent, time.perf_counter()
+        index = EventIndex(backend.cluster_id)
+        index.sync(backend)
+        index.save()
+        warnings = index.query(type='Warning', since=ago('1h'), limit=20)
+        elapsed = time.perf_counter() - started
+        found = sum(1 for obj in repeating if any(r.object == obj for r in warnings))
+        totals['index'][0] += elapsed
+        totals['index'][1] += server.bytes_sent - sent
+        totals['index'][2] += found
+        print(f"run {run} index:   {elapsed:6.2f}s  {server.bytes_sent - sent:>10,} bytes  "
+              f"{found:3}/{len(repeating)} repeating warnings in the 20 newest warnings "
+              f"({'list' if index.relists else f'watch, {index.watched} changes'})")
+    server.stop()
+    for label, (elapsed, sent, found) in totals.items():
+        print(f"{label:5} total: {elapsed:6.2f}s  {sent:>11,} bytes  {found} repeating warnings surfaced")
+
+
+if __name__ == "__main__":
+    main()
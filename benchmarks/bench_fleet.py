@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Multi-cluster analysis: one cluster at a time vs. concurrent fan-out.
+
+Starts ``--clusters`` local stub API servers of different sizes and latencies,
+plus one context whose server is down, all in one kubeconfig. The fleet
+analysis runs with the offline stub LLM, first with one worker (clusters in
+sequence) and then with one worker per cluster. Reports each cluster's time
+and the fleet wall time next to the sum and the slowest cluster; the down
+cluster must fail on its own without affecting the others.
+
+    python benchmarks/bench_fleet.py --clusters 4 --latency 0.5
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fake_kubectl  # noqa: E402
+from fake_apiserver import FakeApiServer, write_fleet_kubeconfig  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clusters', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument('--pods', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_PODS': str(args.pods),
+        # Real clusters are dominated by API and LLM waits; keep log parsing (CPU) small
+        'FAKE_K8S_LOG_RATE': "0.05",
+        'HELM_KUBE_BACKEND': "api",
+        'HELM_LLM_CACHE': "0",
+        'HELM_STATE_DIR': workdir,
+        'HELM_FLEET_REPORT_DIR': os.path.join(workdir, "reports"),
+        'CREWAI_TELEMETRY_OPT_OUT': "true",
+        'OTEL_SDK_DISABLED': "true",
+    })
+    servers, urls = [], {}
+    for i in range(args.clusters):
+        # Clusters differ in size and API latency, so one of them is clearly the slowest
+        cfg = dict(fake_kubectl.config(), namespaces=4 + 4 * i, latency=0.01 * (i + 1))
+        server = FakeApiServer(cfg).start()
+        servers.append(server)
+        urls[f"cluster-{i}"] = server.url
+    down = FakeApiServer().start()
+    urls['cluster-down'] = down.url
+    down.stop()
+    os.environ['KUBECONFIG'] = write_fleet_kubeconfig(os.path.join(workdir, "config"), urls)
+    print(f"Fake fleet: {args.clusters} clusters (+1 unreachable), stub LLM {args.latency}s per call")
+
+    from helm.main import run_fleet_analysis
+    from stub_llm import StubLLM
+
+    walls = {}
+    for label, workers in (("sequential", 1), ("fan-out", len(urls))):
+        os.environ['HELM_FLEET_WORKERS'] = str(workers)
+        started = time.perf_counter()
+        # crewAI's verbose console output would drown the results
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_fleet_analysis(llm=StubLLM(latency=args.latency), incremental=False)
+        walls[label] = time.perf_counter() - started
+        times = [r.elapsed for r in results if r.ok]
+        print(f"{label:10} {walls[label]:6.2f}s wall  sum of clusters {sum(times):6.2f}s  "
+              f"slowest {max(times):5.2f}s  analyzed {len(times)}/{len(results)}")
+    for result in results:
+        status = "ok" if result.ok else f"failed: {result.error[:60]}"
+        print(f"  {result.context:14} {result.elapsed:5.2f}s  {status}")
+    for server in servers:
+        server.stop()
+    print(f"Speedup: {walls['sequential'] / walls['fan-out']:.1f}x  "
+          f"(fleet report: {os.path.join(workdir, 'reports', 'fleet_report.md')})")
+
+
+if __name__ == "__main__":
+    main()
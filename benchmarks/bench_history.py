@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Trend questions from the history store vs. re-collecting the logs.
+
+Scans one hour of logs from the local stub API server, then records that
+scan as ``--days`` days of hourly incremental runs in a fresh history store.
+The question "errors per workload per day over the last 7 days" is answered
+from the store and, for comparison, by collecting 7 days of logs again.
+Also reports recording time, store size and what compaction removes.
+
+    python benchmarks/bench_history.py --days 14 --namespaces 10 --pods 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+
+
+def size(path):
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--namespaces', type=int, default=10)
+    parser.add_argument('--pods', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': "0",
+        'FAKE_K8S_LOG_RATE': "0.05",
+        'HELM_KUBE_BACKEND': "api",
+        'HELM_LOG_BUDGET': str(args.namespaces * args.pods),
+        'HELM_COLLECT_TIMEOUT': "600",
+        'HELM_CALL_TIMEOUT': "120",
+        'HELM_STATE_DIR': workdir,
+    })
+    server = FakeApiServer().start()
+    os.environ['KUBECONFIG'] = server.write_kubeconfig(os.path.join(workdir, "config"))
+
+    from helm.evidence import LogScanner
+    from helm.history import HistoryStore
+
+    scan = LogScanner(incremental=False).scan("ALL_NAMESPACES", "1h")
+    store = HistoryStore(os.path.join(workdir, "history.db"))
+    now = time.time()
+    runs = args.days * 24
+    started = time.perf_counter()
+    for hour in range(runs, 0, -1):
+        ts = now - hour * 3600
+        run_id = store.record_scan(scan, "routine health check", ts=ts)
+        store.record_findings(run_id, scan.cluster, {
+            'log_analysis_task': f"High: OOMKilled in team-{hour % args.namespaces}, connection refused errors "
+                                 f"in {hour % 7 + 1} workloads; Medium: image pull failures",
+        }, ts=ts)
+    recorded = time.perf_counter() - started
+    lines = sum(log.digest.lines for log in scan.collection.logs)
+    print(f"Fake cluster: {args.namespaces} namespaces x {args.pods} pods, {lines:,} lines per hourly run")
+    print(f"record:   {runs} runs in {recorded:.2f}s ({recorded / runs * 1000:.1f}ms per run), "
+          f"store {size(store.path) / 1e6:.1f}MB")
+
+    for label, query in [
+        ("trend 7d", lambda: store.trend(scan.cluster, now - 7 * 86400, now)),
+        ("report 7d", lambda: store.report(scan.cluster, "7d")),
+        ("evidence", lambda: store.history_items(scan, now=now)),
+        ("search", lambda: store.search("OOMKilled", scan.cluster)),
+    ]:
+        started = time.perf_counter()
+        rows = query()
+        print(f"{label:9} {(time.perf_counter() - started) * 1000:7.1f}ms  {len(rows):5} "
+              f"{'chars' if isinstance(rows, str) else 'rows'}")
+
+    started = time.perf_counter()
+    week = LogScanner(incremental=False).scan("ALL_NAMESPACES", "7d")
+    elapsed = time.perf_counter() - started
+    print(f"re-collect 7d of logs: {elapsed:6.2f}s  {sum(log.digest.lines for log in week.collection.logs):,} lines "
+          f"read  {server.bytes_sent / 1e6:.1f}MB transferred")
+    server.stop()
+
+    before = size(store.path)
+    deleted = store.compact(now)
+    store.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(f"compact (raw 7d, rollups 90d): {sum(deleted.values()):,} rows deleted "
+          f"({', '.join(f'{t} {n}' for t, n in deleted.items() if n)}), "
+          f"store {before / 1e6:.1f}MB -> {size(store.path) / 1e6:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Measure log traffic of repeated scans with and without resume cursors.
+
+Each fake pod writes ``--rate`` lines per second. The benchmark does a first
+scan over the ``--since`` window, waits ``--interval`` seconds (standing in for
+the gap between scheduled runs), then scans again both ways. It reports bytes
+received from the stub API server and collection time.
+
+    python benchmarks/bench_incremental.py --since 1h --interval 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+from helm.collector import collect_logs, load_inventory  # noqa: E402
+from helm.cursors import CursorStore  # noqa: E402
+from helm.kube import ApiBackend, load_kubeconfig  # noqa: E402
+
+
+def scan(backend, targets, since, cursors):
+    before = backend.bytes_received
+    started = time.perf_counter()
+    result = collect_logs(targets, since=since, call_timeout=60, total_timeout=None,
+                          backend=backend, cursors=cursors)
+    lines = sum(log.digest.lines for log in result.logs)
+    return backend.bytes_received - before, time.perf_counter() - started, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--namespaces', type=int, default=5)
+    parser.add_argument('--pods', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=2.0, help='log lines per pod per second')
+    parser.add_argument('--since', default='1h')
+    parser.add_argument('--interval', type=float, default=5.0)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': '0',
+        'FAKE_K8S_LOG_RATE': str(args.rate),
+    })
+    workdir = tempfile.mkdtemp()
+    server = FakeApiServer().start()
+    backend = ApiBackend(load_kubeconfig(server.write_kubeconfig(os.path.join(workdir, "config"))))
+    inventory = load_inventory(backend=backend)
+    targets = inventory.select_targets(budget=len(inventory.pods))
+    cursors = CursorStore(os.path.join(workdir, "cursors.json"))
+
+    first = scan(backend, targets, args.since, cursors)
+    time.sleep(args.interval)
+    full = scan(backend, targets, args.since, None)
+    incremental = scan(backend, targets, args.since, CursorStore(cursors.path))
+    backend.close()
+    server.stop()
+
+    print(f"{len(targets)} containers, {args.rate} lines/s each, --since={args.since}, "
+          f"{args.interval}s between runs")
+    for label, (size, elapsed, lines) in [("first run (full window)", first),
+                                          ("repeat run, full window", full),
+                                          ("repeat run, incremental", incremental)]:
+        print(f"{label:26} {size / 1e6:9.2f} MB  {lines:9d} lines  {elapsed:6.2f}s")
+    print(f"Traffic reduction: {full[0] / max(incremental[0], 1):.0f}x, "
+          f"time reduction: {full[1] / max(incremental[1], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
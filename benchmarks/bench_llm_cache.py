@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Repeat crew runs on a quiet cluster with and without the LLM result cache.
+
+Runs the full crew against the local stub API server with an offline stub
+LLM, so no cluster or Azure credentials are needed. The pods stop logging
+before the first run, so every run collects identical evidence.
+
+    python benchmarks/bench_llm_cache.py --runs 3 --latency 1.0
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+from stub_llm import StubLLM  # noqa: E402
+
+
+def run_crew(llm, cache):
+    from helm.crew import KubernetesLogAnalysis
+    from helm.main import get_default_inputs
+
+    analyzer = KubernetesLogAnalysis(incremental=False, llm=llm, cache=cache)
+    started = time.perf_counter()
+    # crewAI's verbose console output would drown the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.crew().kickoff(inputs=get_default_inputs())
+    return time.perf_counter() - started, analyzer.llm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=1.0, help="seconds per stub LLM call")
+    parser.add_argument('--namespaces', type=int, default=5)
+    parser.add_argument('--pods', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': "0",
+        'FAKE_K8S_QUIET_SINCE': str(time.time() - 60),
+        'HELM_KUBE_BACKEND': "api",
+        'HELM_STATE_DIR': workdir,
+        'CREWAI_TELEMETRY_OPT_OUT': "true",
+        'OTEL_SDK_DISABLED': "true",
+    })
+    server = FakeApiServer().start()
+    os.environ['KUBECONFIG'] = server.write_kubeconfig(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+
+    print(f"Quiet fake cluster: {args.namespaces} namespaces x {args.pods} pods, "
+          f"stub LLM {args.latency}s per call")
+    for label, cache in (("no cache", False), ("cache", True)):
+        for run in range(1, args.runs + 1):
+            stub = StubLLM(latency=args.latency)
+            elapsed, llm = run_crew(stub, cache)
+            line = f"{label:8} run {run}: {elapsed:6.2f}s  {stub.calls:2d} LLM calls"
+            if cache:
+                line += f"  ({llm.cache.summary()})"
+            print(line)
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
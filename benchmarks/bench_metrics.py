@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Bulk metrics API sweeps vs. per-pod usage calls, and the sample buffer vs. dicts.
+
+Reads the usage of every pod in the fake cluster three ways: one
+``kubectl top pod`` subprocess per pod, one metrics API GET per pod against
+the stub API server (both with ``--workers`` concurrent calls), and one
+cluster-wide sweep (pods and nodes lists) on each backend. Reports calls,
+bytes and wall-clock time. Then fills helm.metrics.SampleBuffer with
+``--containers`` series x ``--samples`` sweeps and compares its memory and
+the time to compute latest/mean/peak/slope with the same samples kept as a
+list of dicts per sweep.
+
+    python benchmarks/bench_metrics.py --namespaces 20 --pods 25 --latency 0.02
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fake_kubectl  # noqa: E402
+from fake_apiserver import FakeApiServer  # noqa: E402
+from helm.collector import load_inventory  # noqa: E402
+from helm.kube import METRICS_PATH, ApiBackend, KubeError, KubectlBackend, load_kubeconfig  # noqa: E402
+from helm.metrics import ResourceMetrics, SampleBuffer  # noqa: E402
+
+
+def per_pod(pods, fetch, workers):
+    def one(pod):
+        try:
+            return fetch(pod)
+        except KubeError:
+            # No metrics yet (pods that never started)
+            return None
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        found = sum(result is not None for result in pool.map(one, pods))
+    return time.perf_counter() - started, found
+
+
+def bulk(backend):
+    metrics = ResourceMetrics("bench")
+    started = time.perf_counter()
+    metrics.sweep(backend)
+    return time.perf_counter() - started, len(metrics.pods.keys)
+
+
+def collection(namespaces, pods, latency, workers):
+    os.environ.update({
+        'KUBECTL': fake_kubectl.install(),
+        'FAKE_K8S_NAMESPACES': str(namespaces),
+        'FAKE_K8S_PODS': str(pods),
+        'FAKE_K8S_LATENCY': str(latency),
+    })
+    server = FakeApiServer().start()
+    api = ApiBackend(load_kubeconfig(server.write_kubeconfig(os.path.join(tempfile.mkdtemp(), "config"))),
+                     pool_size=workers)
+    kubectl = KubectlBackend()
+    targets = [(pod.namespace, pod.name) for pod in load_inventory(backend=api).pods]
+
+    print(f"Fake cluster: {namespaces} namespaces x {pods} pods, {latency}s per call, {workers} workers")
+    print(f"{'method':<28} {'calls':>7} {'bytes':>11} {'time':>8} {'containers':>11}")
+
+    calls = kubectl.calls
+    elapsed, found = per_pod(targets, lambda p: kubectl._run(["top", "pod", p[1], "-n", p[0]], 30), workers)
+    print(f"{'kubectl top, per pod':<28} {kubectl.calls - calls:7} {'-':>11} {elapsed:7.2f}s {found:11}")
+    calls = kubectl.calls
+    elapsed, found = bulk(kubectl)
+    print(f"{'kubectl get --raw, bulk':<28} {kubectl.calls - calls:7} {'-':>11} {elapsed:7.2f}s {found:11}")
+
+    requests, sent = server.requests, server.bytes_sent
+    elapsed, found = per_pod(targets, lambda p: api.get_json(f"{METRICS_PATH}/namespaces/{p[0]}/pods/{p[1]}"),
+                             workers)
+    print(f"{'metrics API GET, per pod':<28} {server.requests - requests:7} {server.bytes_sent - sent:11,} "
+          f"{elapsed:7.2f}s {found:11}")
+    requests, sent = server.requests, server.bytes_sent
+    elapsed, found = bulk(api)
+    print(f"{'metrics API list, bulk':<28} {server.requests - requests:7} {server.bytes_sent - sent:11,} "
+          f"{elapsed:7.2f}s {found:11}")
+    api.close()
+    server.stop()
+
+
+def buffering(containers, samples):
+    rng = np.random.default_rng(3)
+    keys = [(f"ns-{i // 100}", f"pod-{i}", "app") for i in range(containers)]
+    cpu = rng.gamma(2, 0.05, (samples, containers))
+    memory = rng.uniform(50, 500, containers) * 2 ** 20 + np.arange(samples)[:, None] * 2 ** 16
+    stamps = [1_700_000_000 + 15 * t for t in range(samples)]
+
+    tracemalloc.start()
+    buffer = SampleBuffer(('cpu', 'memory'), samples)
+    started = time.perf_counter()
+    for t in range(samples):
+        buffer.add(stamps[t], keys, {'cpu': cpu[t], 'memory': memory[t]})
+    filled = time.perf_counter() - started
+    buffer_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    started = time.perf_counter()
+    stats = buffer.stats('memory')
+    buffer_stats = time.perf_counter() - started
+
+    tracemalloc.start()
+    cpu_list, memory_list = cpu.tolist(), memory.tolist()
+    started = time.perf_counter()
+    sweeps = [(stamps[t], {key: {'cpu': cpu_list[t][i], 'memory': memory_list[t][i]} for i, key in enumerate(keys)})
+              for t in range(samples)]
+    dict_filled = time.perf_counter() - started
+    dict_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del cpu_list, memory_list
+    started = time.perf_counter()
+    slopes = []
+    for key in keys:
+        values = [(ts, sweep[key]['memory']) for ts, sweep in sweeps if key in sweep]
+        n = len(values)
+        mean_t = sum(ts for ts, _ in values) / n
+        mean_v = sum(v for _, v in values) / n
+        spread = sum((ts - mean_t) ** 2 for ts, _ in values)
+        slopes.append((values[-1][1], mean_v, max(v for _, v in values),
+                       sum((ts - mean_t) * (v - mean_v) for ts, v in values) / spread))
+    dict_stats = time.perf_counter() - started
+    assert np.allclose(stats['slope'], [s[3] for s in slopes], rtol=1e-3), "the buffer and the dicts disagree"
+
+    print(f"\n{containers:,} containers x {samples} samples")
+    print(f"{'storage':<18} {'memory':>10} {'fill':>9} {'stats':>9}")
+    print(f"{'list of dicts':<18} {dict_memory / 2 ** 20:8.1f}Mi {dict_filled:8.2f}s {dict_stats:8.3f}s")
+    print(f"{'SampleBuffer':<18} {buffer_memory / 2 ** 20:8.1f}Mi {filled:8.2f}s {buffer_stats:8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--namespaces', type=int, default=20)
+    parser.add_argument('--pods', type=int, default=25)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--containers', type=int, default=10000)
+    parser.add_argument('--samples', type=int, default=120)
+    args = parser.parse_args()
+
+    collection(args.namespaces, args.pods, args.latency, args.workers)
+    buffering(args.containers, args.samples)
+
+
+if __name__ == "__main__":
+    main()
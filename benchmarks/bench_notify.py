@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Blocking Slack posts vs. the notification queue.
+
+Replays ``--runs`` alerting runs against a local webhook stand-in that allows
+one message per second and answers 429 beyond that. Each run raises the same
+``--alerts`` alerts with changed counts, a few new ones, and one repeat of
+the first alert within the run. The blocking sender is the previous tool code:
+one new connection and one message per alert, and nothing retried. The queue
+batches, retries and deduplicates. Reports how long the agent was blocked,
+the alerts delivered or lost, messages posted and 429s.
+
+    python benchmarks/bench_notify.py --runs 3 --alerts 15
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_slack import FakeSlack  # noqa: E402
+
+
+def blocking_post(webhook_url, message, severity="info", title="K8s Alert"):
+    """SlackWebhookTool._run before the notification queue"""
+    payload = {
+        "username": "K8s Log Analyzer",
+        "icon_emoji": ":kubernetes:",
+        "attachments": [{
+            "color": "#FF6600",
+            "title": f"⚠️ {title}",
+            "text": message,
+            "fields": [
+                {"title": "Severity", "value": severity.upper(), "short": True},
+                {"title": "Time", "value": datetime.now().strftime("%H:%M:%S"), "short": True}
+            ]
+        }]
+    }
+    try:
+        response = requests.post(webhook_url, json=payload, timeout=10)
+        return response.status_code == 200
+    except Exception:
+        return False
+
+
+def alerts_for(run, count):
+    """What one alerting run raises: recurring alerts with new counts, new alerts, one repeat"""
+    alerts = [(f"pod api-{i} restarted {10 * run + i} times in the last hour", "high",
+               f"CrashLoopBackOff in team-{i}") for i in range(count)]
+    alerts += [(f"job loader-{run}-{i} was OOMKilled", "critical", f"OOMKilled in batch-{run}")
+               for i in range(max(1, count // 5))]
+    return alerts + alerts[:1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--alerts', type=int, default=15, help="recurring alerts per run")
+    parser.add_argument('--window', type=float, default=2.0, help="seconds to batch alerts into one message")
+    args = parser.parse_args()
+    os.environ['HELM_STATE_DIR'] = tempfile.mkdtemp()
+
+    from helm.notify import FingerprintStore, SlackNotifier
+
+    raised = sum(len(alerts_for(run, args.alerts)) for run in range(args.runs))
+    print(f"{args.runs} runs, {raised} alerts raised, webhook allows 1 message/s")
+
+    slack = FakeSlack().start()
+    blocked, delivered = 0.0, 0
+    for run in range(args.runs):
+        for message, severity, title in alerts_for(run, args.alerts):
+            started = time.perf_counter()
+            delivered += blocking_post(slack.url, message, severity, title)
+            blocked += time.perf_counter() - started
+    print(f"blocking: agent blocked {blocked:5.2f}s  delivered {slack.alerts:3} alerts ({raised - delivered} lost)  "
+          f"{slack.requests:3} requests  {slack.connections:3} connections  {slack.throttled:3} got 429")
+    slack.stop()
+
+    slack = FakeSlack().start()
+    blocked, wall = 0.0, 0.0
+    for run in range(args.runs):
+        # A new notifier per run, as separate cron runs would have; the fingerprints persist on disk
+        notifier = SlackNotifier(slack.url, FingerprintStore(), batch_window=args.window)
+        started = time.perf_counter()
+        for message, severity, title in alerts_for(run, args.alerts):
+            notifier.notify(message, severity, title)
+        blocked += time.perf_counter() - started
+        notifier.flush()
+        wall += time.perf_counter() - started
+        print(f"  run {run + 1}: {notifier.summary()}")
+    print(f"queued:   agent blocked {blocked:5.2f}s  delivered {slack.alerts:3} alerts  "
+          f"{slack.requests:3} requests  {slack.connections:3} connections  {slack.throttled:3} got 429  "
+          f"({wall:.1f}s until everything was sent)")
+    slack.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Evidence size before and after token-budget packing, per crew task.
+
+Collects logs once from the local stub API server, then packs the evidence
+into each task's budget. Reports the unpacked size, the packed size, how many
+items were dropped, whether every error item survived, and the packing time.
+
+    python benchmarks/bench_packer.py --namespaces 40 --pods 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--namespaces', type=int, default=40)
+    parser.add_argument('--pods', type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': "0",
+        'HELM_KUBE_BACKEND': "api",
+        'HELM_LOG_BUDGET': str(args.namespaces * args.pods),
+        'HELM_STATE_DIR': workdir,
+    })
+    server = FakeApiServer().start()
+    os.environ['KUBECONFIG'] = server.write_kubeconfig(os.path.join(workdir, "config"))
+
+    from helm.classifier import SEVERITY_RANK
+    from helm.evidence import collect_evidence
+    from helm.main import get_default_inputs
+    from helm.packer import TASK_BUDGETS, ContextPacker, count_tokens
+
+    inputs = get_default_inputs()
+    evidence = collect_evidence(inputs['namespaces'], inputs['time_range'], incremental=False)
+    server.stop()
+    items = evidence.items()
+    errors = [item for item in items if not item.pinned and item.priority >= SEVERITY_RANK['error']]
+    print(f"Fake cluster: {args.namespaces} namespaces x {args.pods} pods, {len(items):,} evidence items, "
+          f"~{count_tokens(ContextPacker().pack(items)):,} tokens unpacked")
+
+    for task, budget in TASK_BUDGETS.items():
+        packer = ContextPacker(budget)
+        started = time.perf_counter()
+        text = packer.pack(items)
+        elapsed = time.perf_counter() - started
+        kept = sum(1 for item in errors if item.text.splitlines()[0] in text)
+        print(f"{task:18} budget {budget:6,}  packed ~{count_tokens(text):6,} tokens  "
+              f"{packer.omitted:4} items omitted  errors kept {kept}/{len(errors)}  {elapsed * 1000:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
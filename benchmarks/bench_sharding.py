@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Single-prompt vs. map-reduce sharded log analysis on a large fake cluster.
+
+Logs are collected once, then the crew runs offline twice on the same
+evidence: with one analysis prompt, then with the evidence split into
+namespace shards that are analyzed in parallel and merged by
+log_analysis_task. The stub LLM charges time per prompt token, so a call's
+latency follows its input size, and it rejects its first calls with 429s to
+exercise the shared back-off.
+
+    python benchmarks/bench_sharding.py --namespaces 40 --pods 10 --shard-tokens 3000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+from stub_llm import StubLLM  # noqa: E402
+
+
+def analyze(evidence, inputs, llm, shard_tokens, workers):
+    from helm.crew import KubernetesLogAnalysis
+
+    analyzer = KubernetesLogAnalysis(incremental=False, llm=llm, cache=False)
+    analyzer.shard_tokens = shard_tokens
+    analyzer.analysis_workers = workers
+    started = time.perf_counter()
+    # crewAI's verbose console output would drown the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.evidence = analyzer.prepare_evidence(evidence, inputs)
+        analyzer.crew().kickoff(inputs=inputs)
+    return time.perf_counter() - started, analyzer.shard_findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--namespaces', type=int, default=40)
+    parser.add_argument('--pods', type=int, default=10)
+    parser.add_argument('--shard-tokens', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument('--prompt-token-latency', type=float, default=0.0005, help="seconds per prompt token")
+    parser.add_argument('--rate-limited', type=int, default=2, help="stub calls rejected with 429 first")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': str(args.namespaces),
+        'FAKE_K8S_PODS': str(args.pods),
+        'FAKE_K8S_LATENCY': "0",
+        'HELM_KUBE_BACKEND': "api",
+        'HELM_LOG_BUDGET': str(args.namespaces * args.pods),
+        'HELM_STATE_DIR': workdir,
+        'CREWAI_TELEMETRY_OPT_OUT': "true",
+        'OTEL_SDK_DISABLED': "true",
+    })
+    server = FakeApiServer().start()
+    os.environ['KUBECONFIG'] = server.write_kubeconfig(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+
+    from helm.evidence import collect_evidence
+    from helm.packer import count_tokens
+    from helm.main import get_default_inputs
+
+    inputs = get_default_inputs()
+    evidence = collect_evidence(inputs['namespaces'], inputs['time_range'], incremental=False)
+    print(f"Fake cluster: {args.namespaces} namespaces x {args.pods} pods, "
+          f"~{count_tokens(evidence.render()):,} tokens of evidence")
+
+    single = StubLLM(latency=args.latency, prompt_token_latency=args.prompt_token_latency)
+    single_time, _ = analyze(evidence, inputs, single, shard_tokens=10 ** 9, workers=1)
+    print(f"single prompt: {single_time:6.2f}s  {single.calls} LLM calls, "
+          f"largest prompt ~{single.max_prompt_chars // 4:,} tokens")
+
+    sharded = StubLLM(latency=args.latency, prompt_token_latency=args.prompt_token_latency,
+                      rate_limited_calls=args.rate_limited)
+    sharded_time, findings = analyze(evidence, inputs, sharded, args.shard_tokens, args.workers)
+    print(f"sharded:       {sharded_time:6.2f}s  {sharded.calls} LLM calls, "
+          f"largest prompt ~{sharded.max_prompt_chars // 4:,} tokens, {len(findings)} shards, "
+          f"slowest shard {max(f.elapsed for f in findings):.2f}s, {sharded.rejected} calls rate limited")
+    server.stop()
+    print(f"Speedup: {single_time / sharded_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
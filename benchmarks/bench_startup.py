@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Cold-start time per CLI action, with ``python -X importtime``.
+
+Each action runs as a fresh process against the local stub API server. The
+report shows wall time, total import time, modules imported, whether crewAI
+was loaded and the slowest top-level imports. ``--save`` writes the results
+as a baseline; ``--compare`` fails when an action got slower than the
+baseline by more than ``--threshold``.
+
+    python benchmarks/bench_startup.py --repeat 3 --save startup.json
+    python benchmarks/bench_startup.py --compare startup.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_apiserver import FakeApiServer  # noqa: E402
+
+# The LLM actions need credentials and a model, so their cost is measured as the crew import
+ACTIONS = {
+    'help': ["-m", "helm.main", "--help"],
+    'events': ["-m", "helm.main", "events", "--top", "5"],
+    'collect': ["-m", "helm.main", "collect", "--budget", "2000"],
+    'crew import': ["-c", "import helm.main, helm.crew"],
+}
+
+_IMPORT_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(args):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed: {result.stderr[-500:]}")
+    modules, top = [], []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_RE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own)))
+            if len(indent) == 1:
+                top.append((int(cumulative), name))
+    return {
+        'wall': elapsed,
+        'imports': sum(own for _, own in modules) / 1e6,
+        'modules': len(modules),
+        'crewai': any(name == 'crewai' or name.startswith('crewai.') for name, _ in modules),
+        'slowest': [f"{name} {us / 1e6:.2f}s" for us, name in sorted(top, reverse=True)[:3]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="runs per action; the median is reported")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown vs. the baseline")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'FAKE_K8S_NAMESPACES': "5",
+        'FAKE_K8S_PODS': "5",
+        'FAKE_K8S_LATENCY': "0",
+        'HELM_KUBE_BACKEND': "api",
+        'HELM_STATE_DIR': workdir,
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(SRC), os.getenv('PYTHONPATH')])),
+    })
+    server = FakeApiServer().start()
+    os.environ['KUBECONFIG'] = server.write_kubeconfig(os.path.join(workdir, "config"))
+
+    results = {}
+    for action, action_args in ACTIONS.items():
+        runs = [measure(action_args) for _ in range(args.repeat)]
+        result = dict(runs[-1], wall=statistics.median(r['wall'] for r in runs),
+                      imports=statistics.median(r['imports'] for r in runs))
+        results[action] = result
+        print(f"{action:12} {result['wall']:6.2f}s wall  {result['imports']:5.2f}s imports  "
+              f"{result['modules']:5} modules  crewai {'yes' if result['crewai'] else 'no ':3}  "
+              f"slowest: {', '.join(result['slowest'])}")
+    server.stop()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = [f"{action}: {results[action]['wall']:.2f}s vs {base['wall']:.2f}s"
+                       for action, base in baseline.items()
+                       if action in results and results[action]['wall'] > base['wall'] * (1 + args.threshold)]
+        regressions += [f"{action}: now imports crewAI" for action, base in baseline.items()
+                        if action in results and results[action]['crewai'] and not base['crewai']]
+        if regressions:
+            print("Start-up regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No start-up regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Peak memory of buffered vs streaming log reads for one chatty pod.
+
+Each mode runs in its own process against the fake kubectl, so ru_maxrss
+reflects only that mode. The buffered mode mirrors the old behaviour
+(capture the whole output, classify the first 400 characters); the streaming
+mode digests every line with bounded state.
+
+    python benchmarks/bench_streaming.py --since 24h --rate 10
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fake_kubectl  # noqa: E402
+
+
+def child(mode, since, namespace, pod):
+    from helm.kube import KubectlBackend
+    from helm.logstream import LogDigest, line_severity
+
+    backend = KubectlBackend()
+    started = time.perf_counter()
+    if mode == "buffered":
+        output = backend.pod_logs(namespace, pod, since=since, tail=-1, timeout=600)
+        lines = output.count('\n')
+        issues = int(line_severity(output[:400]) != 'info')
+    else:
+        digest = LogDigest().consume(backend.stream_logs(namespace, pod, since=since, timeout=600))
+        lines, issues = digest.lines, digest.issue_count
+    print(json.dumps({
+        'mode': mode, 'lines': lines, 'issue_lines': issues,
+        'bytes': backend.bytes_received, 'seconds': time.perf_counter() - started,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--since', default='24h')
+    parser.add_argument('--rate', type=float, default=10.0, help='log lines per second')
+    parser.add_argument('--child', choices=['buffered', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--pod', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    # Read a pod whose logs contain errors so issue detection has something to find
+    cfg = fake_kubectl.config()
+    namespace = 'default'
+    pod = args.pod or next(p for p in fake_kubectl.pod_names(cfg, namespace)
+                           if fake_kubectl.pod_health(namespace, p) in ('crashloop', 'oomkilled'))
+    if args.child:
+        return child(args.child, args.since, namespace, pod)
+
+    env = dict(os.environ, KUBECTL=fake_kubectl.install(), FAKE_K8S_LATENCY='0',
+               FAKE_K8S_LOG_RATE=str(args.rate))
+    print(f"Pod {namespace}/{pod}, --since={args.since}, {args.rate} lines/s")
+    for mode in ("buffered", "streaming"):
+        out = subprocess.run([sys.executable, __file__, '--child', mode, '--since', args.since, '--pod', pod],
+                             env=env, capture_output=True, text=True, check=True).stdout
+        r = json.loads(out)
+        print(f"{mode:10} {r['bytes'] / 1e6:8.1f} MB read  {r['lines']:9d} lines  "
+              f"issue lines seen: {r['issue_lines']:7d}  peak RSS {r['peak_rss_mb']:7.1f} MB  {r['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Local stand-in for the Kubernetes API server used by the benchmarks.
+
+Serves the same fake cluster as ``fake_kubectl.py`` (configured through the
+same FAKE_K8S_* environment variables) over HTTP/1.1 keep-alive, and counts
+requests and accepted connections so connection reuse can be observed.
+FAKE_K8S_FAIL_RATE makes a share of requests fail with 500, as kubectl does.
+Events support list and watch with resourceVersions: ``touch_events`` makes
+warnings repeat, ``compact`` expires old resourceVersions (410 Gone).
+Setting ``tokens`` makes every other bearer token get 401 Unauthorized, as
+when a credential plugin's token expires or is revoked.
+"""
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+import fake_kubectl
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, cfg=None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.cfg = cfg or fake_kubectl.config()
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.events = {e['metadata']['uid']: e for e in fake_kubectl.event_objects(self.cfg)}
+        self.changes = [(int(e['metadata']['resourceVersion']), 'ADDED', e) for e in self.events.values()]
+        self.resource_version = len(self.events)
+        self.compacted = 0
+        self.bytes_sent = 0
+        self.failures = 0
+        # Bearer tokens accepted, None for any; requests rejected with 401
+        self.tokens = None
+        self.unauthorized = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        """Clients dropping their keep-alive connections is normal here, not worth a traceback"""
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+    def touch_events(self, count):
+        """The first ``count`` warnings happen again: count and lastTimestamp go up, as MODIFIED"""
+        now = fake_kubectl.format_time(int(time.time()), nanos=False)
+        touched = []
+        with self.lock:
+            for event in [e for e in self.events.values() if e['type'] == 'Warning'][:count]:
+                self.resource_version += 1
+                event = dict(event, count=event['count'] + 1, lastTimestamp=now,
+                             metadata=dict(event['metadata'], resourceVersion=str(self.resource_version)))
+                self.events[event['metadata']['uid']] = event
+                self.changes.append((self.resource_version, 'MODIFIED', event))
+                touched.append(event)
+        return touched
+
+    def compact(self):
+        """Forget the change history, as etcd compaction does; older watches get 410 Gone"""
+        with self.lock:
+            self.compacted = self.resource_version
+            self.changes = []
+
+    def write_kubeconfig(self, path, context="fake"):
+        config = {
+            'apiVersion': 'v1', 'kind': 'Config', 'current-context': context,
+            'clusters': [{'name': context, 'cluster': {'server': self.url}}],
+            'users': [{'name': context, 'user': {'token': 'fake-token'}}],
+            'contexts': [{'name': context, 'context': {'cluster': context, 'user': context}}],
+        }
+        with open(path, "w") as f:
+            yaml.safe_dump(config, f)
+        return path
+
+
+def write_fleet_kubeconfig(path, servers):
+    """One kubeconfig with a context per server, for multi-cluster runs; ``servers`` maps context -> URL"""
+    config = {
+        'apiVersion': 'v1', 'kind': 'Config', 'current-context': next(iter(servers)),
+        'clusters': [{'name': name, 'cluster': {'server': url}} for name, url in servers.items()],
+        'users': [{'name': name, 'user': {'token': 'fake-token'}} for name in servers],
+        'contexts': [{'name': name, 'context': {'cluster': name, 'user': name}} for name in servers],
+    }
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server.lock:
+            self.server.bytes_sent += len(data)
+
+    def _chunk(self, body):
+        data = (json.dumps(body) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+        with self.server.lock:
+            self.server.bytes_sent += len(data)
+
+    def _watch_events(self, query):
+        server = self.server
+        since = int(query.get('resourceVersion', ['0'])[0] or 0)
+        deadline = time.monotonic() + int(query.get('timeoutSeconds', ['1'])[0])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if since < server.compacted:
+            self._chunk({'type': 'ERROR', 'object': {'kind': 'Status', 'code': 410, 'reason': 'Expired',
+                                                     'message': f"too old resource version: {since}"}})
+        else:
+            while True:
+                with server.lock:
+                    new = [(rv, kind, event) for rv, kind, event in server.changes if rv > since]
+                for rv, kind, event in new:
+                    self._chunk({'type': kind, 'object': event})
+                    since = rv
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+            self._chunk({'type': 'BOOKMARK', 'object': {'metadata': {'resourceVersion': str(since)}}})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        cfg = self.server.cfg
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(cfg['latency'])
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path
+        namespaces = fake_kubectl.namespace_names(cfg)
+        tokens = self.server.tokens
+        if tokens is not None and self.headers.get('Authorization', '').removeprefix('Bearer ') not in tokens:
+            with self.server.lock:
+                self.server.unauthorized += 1
+            return self._send(401, {'kind': 'Status', 'status': 'Failure', 'reason': 'Unauthorized',
+                                    'message': 'Unauthorized', 'code': 401})
+        if fake_kubectl.injected_failure(cfg, self.path):
+            with self.server.lock:
+                self.server.failures += 1
+            return self._send(500, {'kind': 'Status', 'status': 'Failure', 'reason': 'InternalError',
+                                    'message': 'injected failure', 'code': 500})
+
+        if path == "/version":
+            return self._send(200, {'gitVersion': 'v1.30.0-fake'})
+        if path == "/api/v1/namespaces":
+            return self._send(200, {'items': [{'metadata': {'name': ns}, 'status': {'phase': 'Active'}}
+                                              for ns in namespaces]})
+        if path == "/api/v1/nodes":
+            return self._send(200, {'items': fake_kubectl.node_objects(cfg)})
+        if path == "/apis/metrics.k8s.io/v1beta1/pods":
+            return self._send(200, fake_kubectl.pod_metrics_list(cfg))
+        if path == "/apis/metrics.k8s.io/v1beta1/nodes":
+            return self._send(200, fake_kubectl.node_metrics_list(cfg))
+        match = re.fullmatch(r"/apis/metrics.k8s.io/v1beta1/namespaces/([^/]+)/pods/([^/]+)", path)
+        if match:
+            metrics = fake_kubectl.pod_metrics_object(*match.groups())
+            if metrics is None:
+                return self._send(404, {'kind': 'Status', 'message': 'metrics not available yet', 'code': 404})
+            return self._send(200, metrics)
+        if path == "/api/v1/events" and query.get('watch'):
+            return self._watch_events(query)
+        if path == "/api/v1/events":
+            with self.server.lock:
+                items = list(self.server.events.values())
+                resource_version = str(self.server.resource_version)
+            start = int(query.get('continue', ['0'])[0])
+            limit = int(query.get('limit', [len(items)])[0])
+            page = {'items': items[start:start + limit], 'metadata': {'resourceVersion': resource_version}}
+            if start + limit < len(items):
+                page['metadata']['continue'] = str(start + limit)
+            return self._send(200, page)
+        if path == "/api/v1/pods":
+            items = [fake_kubectl.pod_object(ns, p) for ns in namespaces for p in fake_kubectl.pod_names(cfg, ns)]
+            start = int(query.get('continue', ['0'])[0])
+            limit = int(query.get('limit', [len(items)])[0])
+            page = {'items': items[start:start + limit], 'metadata': {}}
+            if start + limit < len(items):
+                page['metadata']['continue'] = str(start + limit)
+            return self._send(200, page)
+
+        match = re.fullmatch(r"/api/v1/namespaces/([^/]+)/pods(?:/([^/]+)/log)?", path)
+        if match and match.group(1) in namespaces:
+            namespace, pod = match.groups()
+            if pod is None:
+                return self._send(200, {'items': [fake_kubectl.pod_object(namespace, p)
+                                                  for p in fake_kubectl.pod_names(cfg, namespace)]})
+            since = query.get('sinceSeconds', [None])[0]
+            tail = query.get('tailLines', [None])[0]
+            lines = fake_kubectl.log_lines(cfg, namespace, pod, since_seconds=int(since) if since else None,
+                                           since_time=query.get('sinceTime', [None])[0],
+                                           tail=int(tail) if tail else None,
+                                           timestamps=query.get('timestamps', [''])[0] == 'true')
+            return self._send(200, ''.join(line + '\n' for line in lines), "text/plain")
+
+        self._send(404, {'kind': 'Status', 'message': f'{path} not found', 'code': 404})
+
+
+if __name__ == "__main__":
+    server = FakeApiServer().start()
+    print(f"Fake API server listening on {server.url}")
+    server.thread.join()
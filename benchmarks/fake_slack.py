@@ -0,0 +1,95 @@
+"""
+Local stand-in for a Slack incoming webhook used by the benchmarks.
+
+Accepts POSTed messages over HTTP/1.1 keep-alive and throttles like Slack:
+more than ``rate`` messages per second get ``429 Too Many Requests`` with a
+``Retry-After`` header. Counts requests, connections, 429s and the alerts
+(attachments) delivered.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeSlack(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, rate=1.0, latency=0.05, retry_after=1):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.rate = rate
+        self.latency = latency
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.throttled = 0
+        self.messages = []
+        self._allowance = 1.0
+        self._checked = time.monotonic()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/services/T000/B000/fake"
+
+    @property
+    def alerts(self):
+        return sum(len(m.get('attachments', [])) for m in self.messages)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def admit(self):
+        """Token bucket of ``rate`` messages per second with a burst of one"""
+        with self.lock:
+            now = time.monotonic()
+            self._allowance = min(1.0, self._allowance + (now - self._checked) * self.rate)
+            self._checked = now
+            if self._allowance < 1.0:
+                self.throttled += 1
+                return False
+            self._allowance -= 1.0
+            return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = body.encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency)
+        if not server.admit():
+            return self._send(429, "rate_limited", {"Retry-After": str(server.retry_after)})
+        try:
+            message = json.loads(body)
+        except ValueError:
+            return self._send(400, "invalid_payload")
+        with server.lock:
+            server.messages.append(message)
+        self._send(200, "ok")
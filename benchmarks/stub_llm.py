@@ -0,0 +1,97 @@
+"""
+Offline stand-in for the Azure LLM used by the crew benchmarks.
+
+Each call costs a fixed latency plus time per prompt token (prefill) and per
+generated token; ``latencies`` scripts the fixed part call by call instead
+(the last value repeats). The first ``rate_limited_calls`` calls fail with a
+429 error. Prompt and completion tokens are counted as the analysis counts
+them (helm.packer.count_tokens).
+
+Answers in the ReAct format the crewAI agent executor expects. An agent that
+has one of ``tool_calls`` available calls it once, then gives a final answer.
+Answers are derived from a hash of the prompt with its digits dropped, so
+prompts that differ only in timestamps get identical answers.
+"""
+import hashlib
+import re
+import threading
+import time
+
+from crewai.llms.base_llm import BaseLLM
+
+from helm.packer import count_tokens
+
+_TOOL_NAMES_RE = re.compile(r'only one name of \[([^\]]*)\]')
+# A real observation, not the one in the format instructions
+_OBSERVATION_RE = re.compile(r'^Observation:(?! the result of the action)', re.MULTILINE)
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class StubLLM(BaseLLM):
+    def __init__(self, latency: float = 1.0, token_latency: float = 0.0, prompt_token_latency: float = 0.0,
+                 rate_limited_calls: int = 0, tool_calls=None, latencies=None):
+        super().__init__(model="stub/offline")
+        # Fixed cost per call plus a cost per prompt and generated token (~4 characters)
+        self.latency = latency
+        self.latencies = list(latencies or [])
+        self.token_latency = token_latency
+        self.prompt_token_latency = prompt_token_latency
+        self.rate_limited_calls = rate_limited_calls
+        self.rejected = 0
+        self.max_prompt_chars = 0
+        self.tool_calls = tool_calls if tool_calls is not None else {
+            "Cluster Info Collector": '{"info_type": "overview"}',
+            "Kubernetes Log Collector": '{"namespaces": "ALL_NAMESPACES", "since": "1h"}',
+        }
+        self.calls = 0
+        self.prompt_chars = 0
+        self.output_chars = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, prompt: str, task: str) -> str:
+        match = _TOOL_NAMES_RE.search(prompt)
+        tools_available = [t.strip() for t in match.group(1).split(',')] if match else []
+        for tool in tools_available:
+            if tool in self.tool_calls and f"Action: {tool}\n" not in prompt:
+                return f"Thought: I need data first\nAction: {tool}\nAction Input: {self.tool_calls[tool]}"
+        digest = hashlib.sha256(re.sub(r'\d', '', prompt).encode()).hexdigest()[:12]
+        # Like a real agent, pass on what the tools returned in the final answer
+        observations = [prompt[m.end():].split('\nThought:')[0].strip() for m in _OBSERVATION_RE.finditer(prompt)]
+        return "Thought: I now know the final answer\nFinal Answer: " + '\n\n'.join([f"{task} result {digest}"] + observations)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None):
+        if isinstance(messages, str):
+            messages = [{'role': 'user', 'content': messages}]
+        prompt = '\n'.join(str(m.get('content', '')) for m in messages)
+        with self._lock:
+            if self.rejected < self.rate_limited_calls:
+                self.rejected += 1
+                raise RateLimitError("Error code: 429 - Rate limit exceeded. Retry after 1 seconds.")
+        answer = self._answer(prompt, getattr(from_task, 'name', None) or 'task')
+        prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(answer)
+        with self._lock:
+            latency = self.latencies[min(self.calls, len(self.latencies) - 1)] if self.latencies else self.latency
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            self.max_prompt_chars = max(self.max_prompt_chars, len(prompt))
+            self.output_chars += len(answer)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        time.sleep(latency + len(prompt) / 4 * self.prompt_token_latency
+                   + len(answer) / 4 * self.token_latency)
+        return answer
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 128000
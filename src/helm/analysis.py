@@ -0,0 +1,148 @@
+"""Map-reduce log analysis: shard the evidence, analyze shards in parallel, merge the findings."""
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from helm import tracing
+
+_RETRY_AFTER_RE = re.compile(r'retry[- ]after[^\d]{0,20}(\d+(?:\.\d+)?)', re.IGNORECASE)
+
+
+@dataclass
+class Shard:
+    name: str
+    namespaces: List[str]
+    evidence: str = ""
+
+
+@dataclass
+class ShardFinding:
+    shard: Shard
+    text: str = ""
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    attempts: int = 0
+
+
+def plan_shards(sizes: Dict[str, int], max_tokens: int) -> List[List[str]]:
+    """
+    Group namespaces so each group's evidence stays under ``max_tokens``
+    (``sizes`` are token counts per namespace): first-fit decreasing bin
+    packing. A namespace that is larger than the budget on its own gets a
+    shard to itself. Groups keep the input order.
+    """
+    order = {ns: i for i, ns in enumerate(sizes)}
+    groups: List[List[str]] = []
+    totals: List[int] = []
+    for ns in sorted(sizes, key=lambda n: (-sizes[n], order[n])):
+        for i, total in enumerate(totals):
+            if total + sizes[ns] <= max_tokens:
+                groups[i].append(ns)
+                totals[i] += sizes[ns]
+                break
+        else:
+            groups.append([ns])
+            totals.append(sizes[ns])
+    groups = [sorted(group, key=order.get) for group in groups]
+    return sorted(groups, key=lambda group: order[group[0]])
+
+
+def is_rate_limit(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return 'ratelimit' in text or 'rate limit' in text or '429' in text or 'too many requests' in text
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Server-suggested wait, from a Retry-After header or the error message"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        if value:
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+    match = _RETRY_AFTER_RE.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+class RateLimiter:
+    """
+    Shared back-off for concurrent LLM calls. When one call is rate limited,
+    every worker holds off until the pause is over instead of piling on more
+    requests that would be rejected too.
+    """
+
+    def __init__(self):
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.limited += 1
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def call_with_backoff(llm, messages, limiter: RateLimiter, retries: int = 5,
+                      base_delay: float = 2.0, max_delay: float = 60.0):
+    """``llm.call`` retried with exponential backoff and jitter on rate-limit errors"""
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return llm.call(messages), attempt + 1
+        except Exception as e:
+            if not is_rate_limit(e) or attempt == retries:
+                raise
+            delay = retry_after(e) or min(max_delay, base_delay * 2 ** attempt)
+            limiter.pause(delay * random.uniform(1.0, 1.25))
+
+
+def map_shards(llm, shards: List[Shard], build_messages: Callable[[Shard], List[Dict[str, str]]],
+               max_workers: int = 4, limiter: Optional[RateLimiter] = None,
+               retries: int = 5, base_delay: float = 2.0) -> List[ShardFinding]:
+    """Analyze every shard with at most ``max_workers`` LLM calls in flight; results keep shard order"""
+    limiter = limiter or RateLimiter()
+
+    def analyze(shard: Shard) -> ShardFinding:
+        started = time.perf_counter()
+        finding = ShardFinding(shard)
+        with tracing.span(f"analyze {shard.name}", "analysis", namespaces=len(shard.namespaces)) as span:
+            try:
+                text, finding.attempts = call_with_backoff(llm, build_messages(shard), limiter, retries, base_delay)
+                finding.text = str(text).strip()
+            except Exception as e:
+                finding.error = str(e)
+            span.set(attempts=finding.attempts, error=finding.error)
+        finding.elapsed = time.perf_counter() - started
+        return finding
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(tracing.bind(analyze), shards))
+
+
+def render_findings(findings: List[ShardFinding]) -> str:
+    """Per-shard findings as the input of the reduce step"""
+    out = [f"=== SHARD FINDINGS: {len(findings)} shards analyzed separately ===",
+           "Merge these into one analysis: deduplicate issues reported by several shards "
+           "and correlate them across namespaces.", ""]
+    for finding in findings:
+        out.append(f"--- {finding.shard.name}: {', '.join(finding.shard.namespaces)} ---")
+        if finding.error:
+            out.append(f"Analysis failed: {finding.error}")
+        else:
+            out.append(finding.text)
+        out.append("")
+    return '\n'.join(out)
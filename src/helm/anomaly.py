@@ -0,0 +1,238 @@
+"""Statistical anomaly detection over per-workload, per-pattern log and event rates, vectorised with NumPy."""
+import os
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from helm.classifier import SEVERITY_RANK
+from helm.collector import ClusterScan
+from helm.inventory import workload_of
+from helm.kube import parse_duration
+from helm.packer import Item
+
+# Workload-wide series over every line of a severity, whatever its pattern
+ALL_LINES = "all {} lines"
+
+
+@lru_cache(maxsize=8192)
+def _minute(prefix: str) -> int:
+    """Epoch seconds of a "YYYY-MM-DDTHH:MM" timestamp prefix"""
+    return int(datetime.strptime(prefix, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc).timestamp())
+
+
+def _epoch(timestamp: str) -> Optional[int]:
+    try:
+        return _minute(timestamp[:16])
+    except ValueError:
+        return None
+
+
+def _clock(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%H:%MZ')
+
+
+@dataclass
+class RateSeries:
+    """Many rate series on one time axis: ``counts[i, t]`` is series ``keys[i]`` in bin ``t``"""
+    # (namespace, workload, pattern, severity)
+    keys: List[Tuple[str, str, str, str]]
+    counts: np.ndarray
+    start: int
+    bin: int
+
+
+@dataclass
+class Anomaly:
+    namespace: str
+    workload: str
+    pattern: str
+    severity: str
+    # Start of the bin furthest above the baseline
+    at: int
+    value: float
+    expected: float
+    median: float
+    z: float
+    robust_z: float
+    total: float
+    bin: int
+
+    @property
+    def score(self) -> float:
+        return min(self.z, self.robust_z)
+
+    def render(self) -> str:
+        unit = "min" if self.bin == 60 else f"{self.bin // 60}min"
+        return (f"{self.namespace}/{self.workload}: {self.value:g}/{unit} at {_clock(self.at)}, "
+                f"expected {self.expected:.1f} (median {self.median:.1f}, z {self.z:.1f}, robust z {self.robust_z:.1f}), "
+                f"{self.total:g} in the window | [{self.severity.upper()}] {self.pattern}")
+
+
+def rate_series(scan: ClusterScan, bin_seconds: int = 60, max_bins: int = 240) -> RateSeries:
+    """
+    Bin a scan's timestamped log lines per workload and pattern, plus one
+    series per workload and severity over all its error and warning lines, and
+    warning events per object and reason. Bins span the timestamps actually
+    read, so an incremental run is not compared against minutes it skipped;
+    bins are widened to keep at most ``max_bins``. Events only carry a count
+    and first/last seen, so each is spread evenly between those two times.
+    """
+    templates = scan.collection.templates.templates if scan.collection.templates else []
+    points: Dict[Tuple[str, str, str, str], Counter] = defaultdict(Counter)
+    for log in scan.collection.logs:
+        if not log.digest.rates:
+            continue
+        workload = workload_of(log.pod)
+        for (template_id, severity, minute), lines in log.digest.rates.items():
+            at = _minute(minute)
+            if template_id is not None:
+                template = templates[template_id - 1]
+                points[(log.namespace, workload, template.template, template.severity)][at] += lines
+            if severity in ('error', 'warning'):
+                points[(log.namespace, workload, ALL_LINES.format(severity), severity)][at] += lines
+
+    minutes = [at for counter in points.values() for at in counter]
+    if minutes:
+        start, end = min(minutes), max(minutes)
+    else:
+        end = _epoch(datetime.now(timezone.utc).isoformat())
+        start = end - parse_duration(scan.since)
+    span = end - start + 60
+    bin_seconds = max(bin_seconds, -(-span // (max_bins * 60)) * 60)
+    bins = -(-span // bin_seconds)
+
+    rows, cols, values = [], [], []
+    for row, counter in enumerate(points.values()):
+        for at, lines in counter.items():
+            rows.append(row)
+            cols.append((at - start) // bin_seconds)
+            values.append(lines)
+    keys = list(points)
+
+    for record in scan.events:
+        first, last = _epoch(record.first_seen or record.last_seen), _epoch(record.last_seen)
+        if first is None or last is None or last < start:
+            continue
+        per_minute = record.count / ((last - first) // 60 + 1)
+        lo, hi = (max(first, start) - start) // bin_seconds, (min(last, end) - start) // bin_seconds
+        row = len(keys)
+        keys.append((record.namespace, workload_of(record.name), f"event {record.reason} on {record.object}",
+                     'warning'))
+        for col in range(lo, hi + 1):
+            # Minutes of [first, last] that fall in this bin
+            left = max(first, start + col * bin_seconds)
+            right = min(last + 60, start + (col + 1) * bin_seconds)
+            rows.append(row)
+            cols.append(col)
+            values.append(per_minute * max(0, right - left) / 60)
+
+    counts = np.zeros((len(keys), bins), dtype=np.float32)
+    if rows:
+        np.add.at(counts, (np.array(rows), np.array(cols)), np.array(values, dtype=np.float32))
+    return RateSeries(keys, counts, start, bin_seconds)
+
+
+def _row_median(values: np.ndarray) -> np.ndarray:
+    """Median of each row; sorting short rows is several times faster than np.median's partition"""
+    ordered = np.sort(values, axis=1)
+    middle = values.shape[1] // 2
+    if values.shape[1] % 2:
+        return ordered[:, middle]
+    return (ordered[:, middle - 1] + ordered[:, middle]) / 2
+
+
+def detect(counts: np.ndarray, threshold: float = 4.0, min_count: float = 5, alpha: float = 0.3,
+           warmup: int = 5) -> Tuple[np.ndarray, ...]:
+    """
+    Flag series whose rate rises significantly above their own baseline, for
+    every series at once (one vectorised step per bin, not per series).
+
+    Counts are scored on the Anscombe scale, 2 * sqrt(x + 3/8), where Poisson
+    noise has a variance of about 1 whatever the rate, so one threshold suits
+    a pod logging twice an hour and one logging every millisecond. Two
+    baselines must agree: an EWMA of the preceding bins (mean and variance,
+    smoothing ``alpha``), which follows drifting rates, and the series'
+    median and MAD over the whole window, which one burst cannot drag along.
+    A bin is anomalous when both z-scores exceed ``threshold``, it holds at
+    least ``min_count`` lines and it comes after the first ``warmup`` bins.
+    Returns (series, peak bin, expected count, median count, EWMA z, robust z)
+    for the flagged series, each at its most anomalous bin.
+    """
+    x = np.asarray(counts, dtype=np.float32)
+    n, bins = x.shape
+    if not n or bins <= warmup:
+        empty = np.zeros(0, np.float32)
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), empty, empty, empty, empty
+    # Column-major, so each step below reads one contiguous bin of every series
+    y = np.asfortranarray(2 * np.sqrt(x + 0.375))
+    median = _row_median(y)
+    scale = np.maximum(1.4826 * _row_median(np.abs(y - median[:, None])), 1)
+    floor = 2 * np.sqrt(min_count + 0.375)
+
+    mean = y[:, 0].copy()
+    var = np.ones(n, np.float32)
+    best = np.full(n, -np.inf, np.float32)
+    peak = np.zeros(n, np.int64)
+    expected, ewma_z, robust_z = (np.zeros(n, np.float32) for _ in range(3))
+    for t in range(1, bins):
+        col = y[:, t]
+        diff = col - mean
+        if t >= warmup:
+            z = diff / np.sqrt(np.maximum(var, 1))
+            rz = (col - median) / scale
+            score = np.minimum(z, rz)
+            hit = (score > threshold) & (col >= floor) & (score > best)
+            if hit.any():
+                best[hit], peak[hit], expected[hit] = score[hit], t, mean[hit]
+                ewma_z[hit], robust_z[hit] = z[hit], rz[hit]
+        step = alpha * diff
+        mean += step
+        var = (1 - alpha) * (var + diff * step)
+
+    flagged = np.flatnonzero(best > threshold)
+
+    def counts_of(anscombe):
+        return np.maximum((anscombe / 2) ** 2 - 0.375, 0)
+
+    return (flagged, peak[flagged], counts_of(expected[flagged]), counts_of(median[flagged]),
+            ewma_z[flagged], robust_z[flagged])
+
+
+def find_anomalies(scan: ClusterScan, threshold: Optional[float] = None, min_count: Optional[float] = None,
+                   bin_seconds: Optional[int] = None) -> Tuple[List[Anomaly], int]:
+    """Anomalies of a scan, most severe and strongest first, and the number of series examined"""
+    threshold = threshold if threshold is not None else float(os.getenv("HELM_ANOMALY_Z", "4"))
+    min_count = min_count if min_count is not None else float(os.getenv("HELM_ANOMALY_MIN_COUNT", "5"))
+    bin_seconds = bin_seconds or parse_duration(os.getenv("HELM_ANOMALY_BIN", "1m"))
+    series = rate_series(scan, bin_seconds)
+    if not series.keys:
+        return [], 0
+    totals = series.counts.sum(axis=1)
+    anomalies = []
+    for index, peak, expected, median, z, rz in zip(*detect(series.counts, threshold, min_count)):
+        namespace, workload, pattern, severity = series.keys[index]
+        anomalies.append(Anomaly(namespace, workload, pattern, severity, series.start + int(peak) * series.bin,
+                                 round(float(series.counts[index, peak]), 1), float(expected), float(median),
+                                 float(z), float(rz), round(float(totals[index]), 1), series.bin))
+    anomalies.sort(key=lambda a: (-SEVERITY_RANK.get(a.severity, 0), -a.score))
+    return anomalies, len(series.keys)
+
+
+def anomaly_items(anomalies: List[Anomaly], series: int, namespaces: Optional[List[str]] = None,
+                  limit: Optional[int] = None) -> List[Item]:
+    """The anomalies in ``namespaces`` as evidence items; the series behind them are not sent"""
+    limit = limit or int(os.getenv("HELM_ANOMALY_LIMIT", "20"))
+    if namespaces is not None:
+        scope = set(namespaces)
+        anomalies = [a for a in anomalies if a.namespace in scope]
+    if not anomalies:
+        return [Item(f"No log or event rate rose above its baseline ({series} series checked)",
+                     "=== RATE ANOMALIES ===", pinned=True)] if series else []
+    section = f"=== RATE ANOMALIES: {len(anomalies)} of {series} series above their baseline ==="
+    return [Item(a.render(), section, SEVERITY_RANK.get(a.severity, 0),
+                 datetime.fromtimestamp(a.at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'))
+            for a in anomalies[:limit]]
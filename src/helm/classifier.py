@@ -0,0 +1,212 @@
+"""Single-pass severity and category classifier for log lines."""
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+SEVERITIES = ('info', 'warning', 'error')
+SEVERITY_RANK = {name: rank for rank, name in enumerate(SEVERITIES)}
+DEFAULT_RULES_FILE = Path(__file__).parent / "config" / "rules.yaml"
+
+# Fields that carry the level / message in structured (JSON) logs
+_LEVEL_FIELDS = ('level', 'severity', 'lvl', 'log.level', 'levelname', 'loglevel')
+_MESSAGE_FIELDS = ('msg', 'message', 'error', 'err', 'log', 'event')
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+# Words of a log line as written: identifiers such as timeoutSeconds or sigsegv_handler stay whole
+_TOKEN_RE = re.compile(r'[A-Za-z0-9_]+')
+# Categories of broad keywords, which never override a line's explicit level
+_GENERIC_CATEGORIES = ('error', 'warning', 'timeout', 'restart')
+# Distinct words whose keyword lookups are kept before the lookups start over
+_WORD_CACHE_SIZE = 100000
+
+
+def _plain(word: str) -> bool:
+    """Whether ``word`` is a plain word ("errors", "Crashed", "TIMEOUTS") rather than an identifier"""
+    return word.isalpha() and (word.islower() or word.isupper() or word[1:].islower())
+
+
+def _at_word_start(keyword: str, text: str) -> bool:
+    """Whether ``keyword`` occurs in ``text`` where a word starts"""
+    start = text.find(keyword)
+    while start != -1:
+        if start == 0 or not text[start - 1].isalnum():
+            return True
+        start = text.find(keyword, start + 1)
+    return False
+
+
+@dataclass(frozen=True)
+class Classification:
+    severity: str
+    categories: Tuple[str, ...] = ()
+    structured: bool = False
+
+
+class LogClassifier:
+    """
+    Rules are matched in one pass over the line. The line is lowercased and
+    split into words once, and the start of each word is looked up in a hash
+    index of every rule keyword (Aho-Corasick over words rather than
+    characters). A keyword matches at the start of a plain word, so ``error``
+    also matches "errors" and "errored", but not identifiers such as
+    "errorCount" or "error_rate", and a number only matches whole. Rules
+    that need a regular expression are compiled into a single alternation of
+    named groups. Explicit levels are read from JSON ``level`` fields, logfmt
+    ``level=``, klog prefixes and the level word a line starts with.
+    """
+
+    def __init__(self, rules: List[Dict], levels: Dict[str, List[str]]):
+        self.rules = rules
+        # first word of a keyword -> [(keyword, rule index)]
+        self._keywords: Dict[str, List[Tuple[str, int]]] = {}
+        self._group_info: Dict[str, int] = {}
+        parts = []
+        for i, rule in enumerate(rules):
+            for keyword in rule.get('keywords') or []:
+                keyword = str(keyword).lower()
+                words = _WORD_RE.findall(keyword)
+                if words:
+                    self._keywords.setdefault(words[0], []).append((keyword, i))
+            if rule.get('pattern'):
+                self._group_info[f"r{i}"] = i
+                parts.append(f"(?P<r{i}>{rule['pattern']})")
+        self._combined = re.compile('|'.join(parts), re.IGNORECASE) if parts else None
+        # Keywords starting with a number ("401"), which only match a whole word
+        self._numbers = {word: [(keyword, rule, keyword == word) for keyword, rule in keywords]
+                         for word, keywords in self._keywords.items() if word[0].isdigit()}
+        # Lengths of the other first words, to look up the prefixes of each word
+        self._prefix_lengths = sorted({len(word) for word in self._keywords if word not in self._numbers})
+        # Words looked up so far, and those among them that start a keyword -> (keyword, rule, whole word);
+        # log lines repeat the same words, so each is looked up once. Replaced, never changed in place,
+        # when it is reset, as collection threads share the classifier.
+        self._seen = set()
+        self._word_keywords: Dict[str, List[Tuple[str, int, bool]]] = dict(self._numbers)
+        self._levels = {word.lower(): severity for severity, words in levels.items() for word in words}
+        words = '|'.join(sorted((re.escape(w) for w in self._levels), key=len, reverse=True))
+        # After up to two timestamp tokens: "[warn] ...", "<error> ...", "ERROR ..." or "error: ...";
+        # or logfmt "level=error" anywhere. A lowercase word without a colon is prose ("trace id ...").
+        self._level_re = re.compile(
+            rf'^\s*(?:\[\d[^\]]*\]\s*|\d\S*\s+){{0,2}}'
+            rf'(?:[\[(<](?P<word>{words})[\])>]:?|(?P<bare>{words})(?P<colon>:)?)(?=\s|$)'
+            rf'|\blevel=["\']?(?P<kv>\w+)',
+            re.IGNORECASE)
+        self._klog_re = re.compile(r'^(?P<klog>[IWEF])\d{4} \d{2}:\d{2}:\d{2}')
+
+    def _learn(self, word: str):
+        """Look up the keywords whose first word starts ``word`` and remember the word as seen"""
+        if len(self._seen) >= _WORD_CACHE_SIZE:
+            self._seen.clear()
+            self._word_keywords = dict(self._numbers)
+        self._seen.add(word)
+        lowered = word.lower()
+        # "errors" starts with "error", but names such as "error404", "timeoutSeconds" or
+        # "sigsegv_handler" only match a keyword whole
+        lengths = self._prefix_lengths if _plain(word) else [len(word)]
+        found = []
+        for length in lengths:
+            if length > len(word):
+                break
+            prefix = lowered[:length]
+            if prefix in self._keywords:
+                found.extend((keyword, rule, keyword == prefix) for keyword, rule in self._keywords[prefix])
+        if found:
+            self._word_keywords[word] = found
+
+    def _matches(self, text: str) -> List[int]:
+        """Indexes of the rules matching ``text``, in rule file order"""
+        lowered = text.lower()
+        words = set(_TOKEN_RE.findall(text))
+        for word in words.difference(self._seen):
+            # Numbers (IPs, ports, ids) only match whole, and those keywords are always in the lookup
+            if word[0] > '9':
+                self._learn(word)
+        hits = set()
+        lookup = self._word_keywords
+        for word in lookup.keys() & words:
+            for keyword, rule, whole in lookup[word]:
+                if rule not in hits and (whole or _at_word_start(keyword, lowered)):
+                    hits.add(rule)
+        if self._combined is not None:
+            for match in self._combined.finditer(text):
+                hits.add(self._group_info[match.lastgroup])
+        return sorted(hits)
+
+    @classmethod
+    def from_file(cls, path) -> "LogClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+        return cls(config.get('rules') or [], config.get('levels') or {})
+
+    def _level(self, line: str) -> Optional[str]:
+        klog = self._klog_re.match(line)
+        if klog:
+            return {'I': 'info', 'W': 'warning', 'E': 'error', 'F': 'error'}[klog.group('klog')]
+        match = self._level_re.search(line)
+        if not match:
+            return None
+        bare = match.group('bare')
+        if bare and not (bare.isupper() or match.group('colon')):
+            return None
+        return self._levels.get((match.group('word') or bare or match.group('kv') or '').lower())
+
+    def _structured(self, line: str) -> Optional[Tuple[Optional[str], str]]:
+        """(level, text to match) for a JSON log line, or None if it is not one"""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict):
+            return None
+        level = None
+        for name in _LEVEL_FIELDS:
+            value = record.get(name)
+            if isinstance(value, str):
+                level = self._levels.get(value.lower())
+                break
+            if isinstance(value, int):
+                # Numeric levels: syslog (0-7, low is severe) or bunyan/pino (10-60)
+                level = ('error' if value >= 50 else 'warning' if value >= 40 else 'info') if value >= 10 \
+                    else ('error' if value <= 3 else 'warning' if value == 4 else 'info')
+                break
+        text = ' '.join(str(record[name]) for name in _MESSAGE_FIELDS if name in record)
+        return level, text or line
+
+    def classify(self, line: str) -> Classification:
+        structured = None
+        if line.lstrip().startswith('{'):
+            structured = self._structured(line.strip())
+        if structured is not None:
+            level, text = structured
+        else:
+            level, text = self._level(line), line
+
+        severity = level or 'info'
+        categories = []
+        for index in self._matches(text):
+            rule = self.rules[index]
+            category, rule_severity = rule['category'], rule.get('severity', 'info')
+            if category not in categories:
+                categories.append(category)
+            # An explicit level is trusted over broad keywords, but specific
+            # categories (OOM, auth, ...) can still raise it
+            if level is not None and category in _GENERIC_CATEGORIES:
+                continue
+            if SEVERITY_RANK[rule_severity] > SEVERITY_RANK[severity]:
+                severity = rule_severity
+        return Classification(severity, tuple(categories), structured is not None)
+
+
+@lru_cache(maxsize=None)
+def _load(path: str) -> LogClassifier:
+    return LogClassifier.from_file(path)
+
+
+def get_classifier() -> LogClassifier:
+    """Shared classifier built once from $HELM_RULES_FILE or the bundled rules"""
+    return _load(os.getenv("HELM_RULES_FILE", str(DEFAULT_RULES_FILE)))
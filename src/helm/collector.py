@@ -0,0 +1,303 @@
+"""Concurrent log collection engine used by the Kubernetes tools."""
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from helm import tracing
+from helm.cursors import CursorStore, split_timestamp, window_start
+from helm.events import EventRecord
+from helm.inventory import LogTarget, PodInventory
+from helm.kube import KubeError, KubeTimeout, get_backend, parse_duration
+from helm.logstream import LogDigest
+from helm.templates import TemplateMiner
+
+# Namespaces that are always scanned first when collecting across the cluster
+PRIORITY_NAMESPACE_HINTS = ['default', 'kube-system', 'monitoring', 'logging', 'ingress',
+                            'cert-manager', 'prometheus', 'grafana']
+# Log lines digested per hold of the collection run's lock
+DIGEST_BATCH = 256
+
+
+class Deadline:
+    """
+    Overall time budget shared by every call of one collection run. Once the
+    run is closed, workers it abandoned may no longer change shared state
+    (the template miner, resume cursors): ``if_open`` runs a change only
+    while the run is open, and ``close`` waits for any change in progress.
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+
+    def if_open(self, change: Callable, *args) -> bool:
+        """Apply ``change(*args)`` unless the run is closed; False once it is"""
+        with self._lock:
+            if self.closed:
+                return False
+            change(*args)
+            return True
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def clamp(self, timeout: float) -> float:
+        """Shorten a per-call timeout so it never outlives the deadline"""
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
+
+
+@dataclass
+class PodLogResult:
+    namespace: str
+    pod: str
+    container: Optional[str] = None
+    previous: bool = False
+    digest: LogDigest = field(default_factory=LogDigest)
+    stderr: str = ""
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    resumed_from: Optional[str] = None
+
+
+@dataclass
+class CollectionResult:
+    logs: List[PodLogResult] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+    deadline_hit: bool = False
+    templates: Optional[TemplateMiner] = None
+
+    def logs_for(self, namespace: str) -> List[PodLogResult]:
+        return [log for log in self.logs if log.namespace == namespace]
+
+
+@dataclass
+class ClusterScan:
+    """What one collection run found, kept structured until it is rendered for an agent"""
+    inventory: PodInventory
+    namespaces: List[str]
+    collection: CollectionResult
+    since: str = "1h"
+    all_namespaces: bool = False
+    # Warning events in the scanned namespaces, from the event index
+    events: List[EventRecord] = field(default_factory=list)
+    # Backend cluster_id (the kubeconfig context), which keys persisted state
+    cluster: str = "default"
+    # Log and event rates that rose above their baseline (helm.anomaly.Anomaly), of how many series
+    anomalies: List = field(default_factory=list)
+    rate_series: int = 0
+
+
+def list_namespaces(timeout: float = 30, backend=None) -> List[str]:
+    """Return every namespace name in the cluster"""
+    return (backend or get_backend()).list_namespaces(timeout=timeout)
+
+
+def load_inventory(timeout: float = 60, backend=None) -> PodInventory:
+    """Build the pod index from one cluster-wide listing instead of one call per namespace"""
+    return PodInventory.from_items((backend or get_backend()).list_all_pods(timeout=timeout))
+
+
+def order_namespaces(namespace_list: List[str]) -> List[str]:
+    """Put well-known infrastructure namespaces first, keep the rest in listing order"""
+    priority = [ns for ns in namespace_list
+                if any(important in ns.lower() for important in PRIORITY_NAMESPACE_HINTS)]
+    return priority + [ns for ns in namespace_list if ns not in priority]
+
+
+def _fetch_logs(backend, target: LogTarget, since: str, tail: Optional[int], timeout: float,
+                cursors: Optional[CursorStore] = None,
+                miner: Optional[TemplateMiner] = None, rates: bool = False,
+                deadline: Optional[Deadline] = None) -> PodLogResult:
+    started = time.monotonic()
+    deadline = deadline or Deadline(None)
+    log = PodLogResult(target.namespace, target.pod, target.container, target.previous,
+                       digest=LogDigest(miner=miner, source=f"{target.namespace}/{target.pod}", rates=rates))
+    # Clamped when the fetch starts, not when it was queued
+    timeout = deadline.clamp(timeout)
+    if deadline.expired() or deadline.closed:
+        log.error = "Timeout"
+        return log
+    key = resume = newest = None
+    if cursors is not None:
+        key = cursors.key(backend.cluster_id, target.namespace, target.pod,
+                          target.container, target.restart_count)
+        resume = cursors.get(key, target.container_id)
+        # A cursor older than the requested window would fetch more than asked for
+        if resume is not None and resume < window_start(parse_duration(since)):
+            resume = None
+        log.resumed_from = resume
+    # Lines are digested in batches, each only while the run is still open: once it is
+    # closed without this fetch, its lines must not reach the shared template miner
+    batch = []
+
+    def digest():
+        open_ = deadline.if_open(log.digest.add_all, batch)
+        batch.clear()
+        return open_
+
+    try:
+        lines = backend.stream_logs(target.namespace, target.pod, since, tail, timeout=timeout,
+                                    container=target.container, previous=target.previous,
+                                    since_time=resume, timestamps=True)
+        for line in lines:
+            stamp, line = split_timestamp(line)
+            if stamp is not None:
+                # --since-time is inclusive, the boundary line was already read
+                if resume is not None and stamp <= resume:
+                    continue
+                if newest is None or stamp > newest:
+                    newest = stamp
+            batch.append((line, stamp))
+            if len(batch) >= DIGEST_BATCH and not digest():
+                break
+        digest()
+    except KubeTimeout:
+        # Whatever arrived before the timeout is still worth keeping
+        digest()
+        log.digest.truncated = True
+        if not log.digest.lines:
+            log.error = "Timeout"
+    except KubeError as e:
+        digest()
+        log.stderr = str(e)
+    except Exception as e:
+        log.error = str(e)
+    if cursors is not None:
+        # Only if the run still takes this result; its cursors may already be saved
+        deadline.if_open(cursors.advance, key, newest, target.container_id)
+    log.elapsed = time.monotonic() - started
+    return log
+
+
+class DaemonPool:
+    """
+    A bounded worker pool for work that may be abandoned at a deadline. The
+    workers are daemon threads: ThreadPoolExecutor joins its workers at
+    interpreter exit, so a hung call it abandoned would keep the process
+    alive past the deadline, while here it dies with the process.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max(1, max_workers)
+        self.thread_name_prefix = thread_name_prefix
+        self._work = queue.SimpleQueue()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, fn: Callable, *args) -> Future:
+        future = Future()
+        self._work.put((future, fn, args))
+        if len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, daemon=True,
+                                      name=f"{self.thread_name_prefix}_{len(self._threads)}")
+            self._threads.append(thread)
+            thread.start()
+        return future
+
+    def _worker(self):
+        while True:
+            item = self._work.get()
+            if item is None:
+                return
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self):
+        """Cancel the queued work and stop idle workers; nothing waits for work still running"""
+        while True:
+            try:
+                item = self._work.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+        for _ in self._threads:
+            self._work.put(None)
+
+
+def collect_logs(targets: List[LogTarget], since: str = "1h", tail: Optional[int] = None,
+                 max_workers: int = 16, call_timeout: float = 10.0,
+                 total_timeout: Optional[float] = 60.0, backend=None,
+                 cursors: Optional[CursorStore] = None, mine_templates: bool = True,
+                 track_rates: bool = False) -> CollectionResult:
+    """
+    Stream logs for ``targets`` across a bounded worker pool.
+
+    Each stream is digested line by line (see :class:`helm.logstream.LogDigest`),
+    so memory stays flat however much a pod logs. ``tail`` optionally caps the
+    number of lines requested per container; by default the whole window is read.
+
+    Every Kubernetes call is limited by ``call_timeout`` and by whatever is left
+    of ``total_timeout``, counted from when each call starts; fetches that have
+    not finished when the deadline passes are reported in ``skipped``, and
+    from then on no longer feed the template miner or move their cursors.
+    They run on a :class:`DaemonPool`, so a hung fetch cannot hold up the
+    process after the deadline either. Results keep the order of ``targets``,
+    which
+    :meth:`PodInventory.select_targets` puts worst-first. ``backend``
+    defaults to the shared backend from :func:`helm.kube.get_backend`.
+
+    With a ``cursors`` store each container is read from where the previous run
+    stopped (``--since-time``) and the store is saved afterwards. With
+    ``mine_templates`` every line is also clustered into ``result.templates``,
+    and with ``track_rates`` each digest counts its lines per minute.
+    """
+    started = time.monotonic()
+    backend = backend or get_backend()
+    deadline = Deadline(total_timeout)
+    collection = CollectionResult(templates=TemplateMiner() if mine_templates else None)
+    pending = {}
+
+    executor = DaemonPool(max_workers, thread_name_prefix="helm-collect")
+    # Each fetch is traced under the caller's span, not as a stray top-level one
+    fetch = tracing.bind(_fetch_logs)
+    try:
+        for target in targets:
+            future = executor.submit(fetch, backend, target, since, tail,
+                                     call_timeout, cursors, collection.templates, track_rates, deadline)
+            pending[future] = target
+
+        while pending:
+            done, _ = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                collection.deadline_hit = True
+                break
+            for future in done:
+                pending.pop(future)
+                collection.logs.append(future.result())
+    finally:
+        # Anything still queued when the deadline fires is abandoned, not waited for
+        for future, target in pending.items():
+            future.cancel()
+            collection.skipped.append(f"{target.namespace}/{target.pod}")
+        executor.shutdown()
+        # Workers still running are abandoned: they may not touch the miner or the cursors from here on
+        deadline.close()
+        if cursors is not None:
+            cursors.save()
+
+    # Keep report order stable regardless of completion order
+    order = {(t.namespace, t.pod): i for i, t in enumerate(targets)}
+    collection.logs.sort(key=lambda log: order.get((log.namespace, log.pod), len(order)))
+    collection.elapsed = time.monotonic() - started
+    return collection
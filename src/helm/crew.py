@@ -1,215 +1,167 @@
 from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
+from crewai.tasks.task_output import TaskOutput
 from crewai.tools import BaseTool
-from typing import List
-import subprocess
+from crewai.utilities.string_utils import interpolate_only
+from pydantic import Field
+from typing import Dict, List, Optional
+import functools
 import json
 import yaml
 import os
-import requests
-from datetime import datetime, timedelta
+
+from helm import tracing
+from helm.analysis import Shard, ShardFinding, map_shards, plan_shards, render_findings
+from helm.collector import load_inventory
+from helm.evidence import Evidence, LogScanner, cluster_overview
+from helm.history import get_history, history_enabled
+from helm.kube import KubeError, get_backend
+from helm.llm_cache import CachedLLM, TracedLLM
+from helm.metrics import get_metrics, metrics_enabled
+from helm.notify import get_notifier
+from helm.packer import TASK_BUDGETS, ContextPacker, Item, count_tokens
+
+def traced_tool(run):
+    """Record a tool's _run as a ``tool`` span; tools return errors as text, which marks the span failed"""
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        with tracing.span(f"tool {self.name}", "tool") as span:
+            result = run(self, *args, **kwargs)
+            span.set(bytes=len(result))
+            if result.startswith("Error"):
+                span.fail(result[:200])
+            return result
+    return wrapper
+
+_traced_tasks = False
+
+def trace_tasks():
+    """Record every crew task as a span (``report`` for tasks that write a file); registered once"""
+    global _traced_tasks
+    if _traced_tasks:
+        return
+    _traced_tasks = True
+    from crewai.utilities.events import (TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent,
+                                         ToolUsageErrorEvent, crewai_event_bus)
+    open_spans = {}
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def task_started(source, event):
+        task = event.task
+        span = tracing.start_span(getattr(task, 'name', None) or "task",
+                                  'report' if getattr(task, 'output_file', None) else 'task',
+                                  agent=getattr(getattr(task, 'agent', None), 'role', None))
+        open_spans[id(task)] = (span, tracing.activate(span))
+
+    def task_ended(task, error=None):
+        span, token = open_spans.pop(id(task), (None, None))
+        if span is not None:
+            tracing.deactivate(token)
+            span.finish(error)
+
+    crewai_event_bus.on(TaskCompletedEvent)(lambda source, event: task_ended(event.task))
+    crewai_event_bus.on(TaskFailedEvent)(lambda source, event: task_ended(event.task, event.error))
+
+    @crewai_event_bus.on(ToolUsageErrorEvent)
+    def tool_failed(source, event):
+        # The agent retries a tool call it got wrong; count the retries on the task
+        tracing.current_span().add('tool_errors')
 
 # Custom Tools for Kubernetes Log Analysis
 class KubernetesLogCollectorTool(BaseTool):
     name: str = "Kubernetes Log Collector"
     description: str = "Collect logs from Kubernetes pods across the entire cluster"
+    # The scan settings; the collection itself lives in helm.evidence
+    scanner: LogScanner = Field(default_factory=LogScanner)
 
+    @traced_tool
     def _run(self, namespaces: str = "ALL_NAMESPACES", since: str = "1h") -> str:
         """Collect logs from Kubernetes cluster"""
         try:
-            all_logs = []
-            
-            # If ALL_NAMESPACES, get all namespaces first
-            if namespaces == "ALL_NAMESPACES":
-                # Get all namespaces
-                ns_cmd = "kubectl get namespaces -o name"
-                ns_result = subprocess.run(ns_cmd.split(), capture_output=True, text=True, timeout=30)
-                
-                if ns_result.returncode != 0:
-                    return f"Error getting namespaces: {ns_result.stderr}"
-                
-                namespace_list = [ns.replace('namespace/', '') for ns in ns_result.stdout.strip().split('\n') if ns.strip()]
-                all_logs.append(f"=== SCANNING {len(namespace_list)} NAMESPACES ===")
-                
-                # Limit to important namespaces to avoid timeout
-                priority_namespaces = []
-                for ns in namespace_list:
-                    if any(important in ns.lower() for important in ['default', 'kube-system', 'monitoring', 'logging', 'ingress', 'cert-manager', 'prometheus', 'grafana']):
-                        priority_namespaces.append(ns)
-                
-                # Add some other namespaces if we have few priority ones
-                if len(priority_namespaces) < 5:
-                    for ns in namespace_list:
-                        if ns not in priority_namespaces and not ns.startswith('kube-'):
-                            priority_namespaces.append(ns)
-                            if len(priority_namespaces) >= 8:  # Limit to 8 namespaces
-                                break
-                
-                namespaces_to_check = priority_namespaces[:8]  # Max 8 namespaces
-                all_logs.append(f"=== PRIORITY NAMESPACES: {', '.join(namespaces_to_check)} ===\n")
-            else:
-                # Use specified namespaces
-                namespaces_to_check = [ns.strip() for ns in namespaces.split(',')]
-            
-            total_pods_checked = 0
-            
-            for namespace in namespaces_to_check:
-                try:
-                    # Get pods in this namespace
-                    cmd = f"kubectl get pods -n {namespace} -o name"
-                    result = subprocess.run(cmd.split(), capture_output=True, text=True, timeout=20)
-                    
-                    if result.returncode != 0:
-                        all_logs.append(f"=== NAMESPACE {namespace}: Error getting pods ===")
-                        continue
-                    
-                    pods = [p.strip() for p in result.stdout.strip().split('\n') if p.strip()]
-                    
-                    if not pods:
-                        all_logs.append(f"=== NAMESPACE {namespace}: No pods found ===")
-                        continue
-                    
-                    all_logs.append(f"=== NAMESPACE {namespace}: Found {len(pods)} pods ===")
-                    
-                    # Get logs from first 2-3 pods per namespace
-                    pods_to_check = pods[:3]
-                    total_pods_checked += len(pods_to_check)
-                    
-                    for pod in pods_to_check:
-                        if pod:
-                            pod_name = pod.replace('pod/', '')
-                            log_cmd = f"kubectl logs {pod_name} -n {namespace} --since={since} --tail=20"
-                            log_result = subprocess.run(log_cmd.split(), capture_output=True, text=True, timeout=10)
-                            
-                            if log_result.stdout:
-                                # Look for errors, warnings, or interesting content
-                                log_content = log_result.stdout[:400]  # Limit content
-                                if any(keyword in log_content.lower() for keyword in ['error', 'warn', 'fail', 'exception', 'crash', 'restart']):
-                                    all_logs.append(f"--- {namespace}/{pod_name} (ISSUES FOUND) ---")
-                                    all_logs.append(log_content)
-                                elif len(log_content.strip()) > 10:
-                                    all_logs.append(f"--- {namespace}/{pod_name} (Normal) ---")
-                                    all_logs.append(log_content[:200] + "...")
-                            elif log_result.stderr:
-                                all_logs.append(f"--- {namespace}/{pod_name} (ERROR) ---")
-                                all_logs.append(log_result.stderr[:200])
-                            
-                except subprocess.TimeoutExpired:
-                    all_logs.append(f"=== NAMESPACE {namespace}: Timeout ===")
-                    continue
-                except Exception as e:
-                    all_logs.append(f"=== NAMESPACE {namespace}: Error: {str(e)} ===")
-                    continue
-            
-            summary = f"=== CLUSTER SCAN SUMMARY ===\n"
-            summary += f"Namespaces scanned: {len(namespaces_to_check)}\n"
-            summary += f"Total pods checked: {total_pods_checked}\n"
-            summary += f"Time range: {since}\n"
-            summary += f"Scan completed at: {datetime.now().strftime('%H:%M:%S')}\n\n"
-            
-            return summary + "\n".join(all_logs) if all_logs else "No logs collected from cluster"
-            
+            try:
+                scan = self.scanner.scan(namespaces, since)
+            except KubeError as e:
+                return f"Error getting pod inventory: {e}"
+            return self.scanner.render(scan)
         except Exception as e:
             return f"Error collecting cluster logs: {str(e)}"
 
 class ClusterInfoTool(BaseTool):
     name: str = "Cluster Info Collector"
     description: str = "Get overall cluster information and status"
+    backend_kind: str = os.getenv("HELM_KUBE_BACKEND", "auto")
+    token_budget: int = int(os.getenv("HELM_OVERVIEW_TOKENS", "4000"))
+    events_since: str = "1h"
+    context: Optional[str] = None
 
+    @traced_tool
     def _run(self, info_type: str = "overview") -> str:
         """Get cluster overview information"""
         try:
-            cluster_info = []
-            
-            # Get cluster info
-            try:
-                info_cmd = "kubectl cluster-info"
-                info_result = subprocess.run(info_cmd.split(), capture_output=True, text=True, timeout=15)
-                if info_result.returncode == 0:
-                    cluster_info.append("=== CLUSTER INFO ===")
-                    cluster_info.append(info_result.stdout[:300])
-            except:
-                pass
-            
-            # Get node status
-            try:
-                nodes_cmd = "kubectl get nodes -o wide"
-                nodes_result = subprocess.run(nodes_cmd.split(), capture_output=True, text=True, timeout=15)
-                if nodes_result.returncode == 0:
-                    cluster_info.append("\n=== NODE STATUS ===")
-                    cluster_info.append(nodes_result.stdout)
-            except:
-                pass
-            
-            # Get namespace summary
-            try:
-                ns_cmd = "kubectl get namespaces"
-                ns_result = subprocess.run(ns_cmd.split(), capture_output=True, text=True, timeout=15)
-                if ns_result.returncode == 0:
-                    cluster_info.append("\n=== NAMESPACES ===")
-                    cluster_info.append(ns_result.stdout)
-            except:
-                pass
-            
-            # Get recent events
-            try:
-                events_cmd = "kubectl get events --all-namespaces --sort-by=.lastTimestamp"
-                events_result = subprocess.run(events_cmd.split(), capture_output=True, text=True, timeout=15)
-                if events_result.returncode == 0:
-                    events_lines = events_result.stdout.split('\n')
-                    recent_events = events_lines[:20]  # Last 20 events
-                    cluster_info.append("\n=== RECENT EVENTS ===")
-                    cluster_info.append('\n'.join(recent_events))
-            except:
-                pass
-            
-            return '\n'.join(cluster_info) if cluster_info else "Unable to gather cluster information"
+            items = cluster_overview(self.backend_kind, self.events_since, context=self.context)
+            return ContextPacker(self.token_budget).pack(items) if items else "Unable to gather cluster information"
             
         except Exception as e:
             return f"Error getting cluster info: {str(e)}"
 
+class LogHistoryTool(BaseTool):
+    name: str = "Log History Query"
+    description: str = ("Trends from earlier runs of this analysis, without re-reading old logs: errors and "
+                        "warnings per workload over time, log patterns first seen in the period, and past "
+                        "findings matching a search text. Use it to tell new problems from recurring ones.")
+    backend_kind: str = os.getenv("HELM_KUBE_BACKEND", "auto")
+    context: Optional[str] = None
+
+    @traced_tool
+    def _run(self, namespaces: str = "", workload: str = "", since: str = "7d", search: str = "") -> str:
+        """Answer a trend question from the history store"""
+        try:
+            cluster = get_backend(self.backend_kind, self.context).cluster_id
+            scope = [ns.strip() for ns in namespaces.split(',') if ns.strip()] or None
+            return get_history().report(cluster, since, scope, workload or None, search or None)
+        except Exception as e:
+            return f"Error reading run history: {str(e)}"
+
+class ResourceMetricsTool(BaseTool):
+    name: str = "Resource Metrics Collector"
+    description: str = ("CPU and memory usage of every pod and node from the metrics API, against their requests, "
+                        "limits and allocatable capacity: containers near their memory limit (OOM risk) or CPU "
+                        "limit (throttling), memory growing towards its limit, and node utilisation. Set sweeps "
+                        "above 1 to sample several times, interval seconds apart, and see peaks and growth.")
+    backend_kind: str = os.getenv("HELM_KUBE_BACKEND", "auto")
+    token_budget: int = int(os.getenv("HELM_METRICS_TOKENS", "3000"))
+    context: Optional[str] = None
+
+    @traced_tool
+    def _run(self, namespaces: str = "", sweeps: int = 1, interval: float = 15) -> str:
+        """Sample usage with bulk metrics API calls and join it with the pod inventory"""
+        try:
+            backend = get_backend(self.backend_kind, self.context)
+            metrics = get_metrics(backend)
+            metrics.sample(backend, min(max(int(sweeps), 1), 10), float(interval))
+            scope = [ns.strip() for ns in namespaces.split(',') if ns.strip()] or None
+            return ContextPacker(self.token_budget).pack(metrics.items(load_inventory(backend=backend), scope))
+        except KubeError as e:
+            return f"Error reading resource metrics (is metrics-server installed?): {e}"
+        except Exception as e:
+            return f"Error reading resource metrics: {str(e)}"
+
 class SlackWebhookTool(BaseTool):
     name: str = "Slack Webhook Notifier"
     description: str = "Send notifications to Slack"
 
+    @traced_tool
     def _run(self, message: str, severity: str = "info", title: str = "K8s Alert") -> str:
-        """Send Slack notification"""
+        """Queue a Slack notification; delivery happens in the background"""
         webhook_url = os.getenv("SLACK_WEBHOOK_URL")
         if not webhook_url:
             return f"ℹ️ Slack not configured. Alert: [{severity.upper()}] {title} - {message}"
         
-        color_map = {
-            "critical": "#FF0000", "high": "#FF6600", "medium": "#FFCC00",
-            "low": "#0066CC", "info": "#36a64f"
-        }
-        
-        emoji_map = {
-            "critical": "🚨", "high": "⚠️", "medium": "🔶", "low": "🔵", "info": "ℹ️"
-        }
-        
-        payload = {
-            "username": "K8s Log Analyzer",
-            "icon_emoji": ":kubernetes:",
-            "attachments": [{
-                "color": color_map.get(severity, "#36a64f"),
-                "title": f"{emoji_map.get(severity, 'ℹ️')} {title}",
-                "text": message,
-                "fields": [
-                    {"title": "Severity", "value": severity.upper(), "short": True},
-                    {"title": "Time", "value": datetime.now().strftime("%H:%M:%S"), "short": True}
-                ]
-            }]
-        }
-        
-        try:
-            response = requests.post(webhook_url, json=payload, timeout=10)
-            if response.status_code == 200:
-                return f"✅ Slack notification sent: [{severity.upper()}] {title}"
-            else:
-                return f"⚠️ Slack notification failed: {response.status_code}"
-        except Exception as e:
-            return f"⚠️ Slack error: {str(e)}"
+        notifier = get_notifier(webhook_url)
+        if notifier.notify(message, severity, title):
+            return f"✅ Slack notification queued: [{severity.upper()}] {title}"
+        return f"ℹ️ Duplicate alert not sent again (already sent or queued recently): [{severity.upper()}] {title}"
 
 @CrewBase
 class KubernetesLogAnalysis():
@@ -218,15 +170,87 @@ class KubernetesLogAnalysis():
     agents: List[BaseAgent]
     tasks: List[Task]
 
-    def __init__(self):
+    def __init__(self, incremental: bool = True, llm=None, cache: bool = None,
+                 evidence: Optional[Dict[str, str]] = None, context: Optional[str] = None,
+                 report_file: Optional[str] = 'kubernetes_log_analysis_report.md', scope: str = "run"):
         super().__init__()
+        # Incremental runs only read log lines newer than the previous run of the same scope
+        self.incremental = incremental
+        self.scope = scope
+        # kubeconfig context the collection tools talk to (default: the current one)
+        self.context = context
+        # Where reporting_task writes its report; None writes no file
+        self.report_file = report_file
+        # Output of prepare_evidence() per task; when given, the log_collector agent is skipped
+        self.evidence = evidence
+        # Evidence larger than this many tokens is analyzed in namespace shards (see prepare_evidence)
+        self.shard_tokens = int(os.getenv("HELM_SHARD_TOKENS", "10000"))
+        self.analysis_workers = int(os.getenv("HELM_ANALYSIS_WORKERS", "4"))
+        self.shard_findings: List[ShardFinding] = []
         # Configure Azure OpenAI LLM
-        self.llm = LLM(
+        self.llm = llm or LLM(
             model="azure/gpt-4o",
             base_url=os.getenv("AZURE_API_BASE"),
             api_key=os.getenv("AZURE_API_KEY"),
             api_version=os.getenv("AZURE_API_VERSION")
         )
+        # Identical prompts (same task, inputs and evidence) are answered from disk
+        if cache is None:
+            cache = os.getenv("HELM_LLM_CACHE", "1") != "0"
+        # A traced LLM passed in (daemon jobs share one) is unwrapped, then traced again around the cache
+        if isinstance(self.llm, TracedLLM):
+            self.llm = self.llm.llm
+        if cache and not isinstance(self.llm, CachedLLM):
+            self.llm = CachedLLM(self.llm)
+        if tracing.enabled():
+            self.llm = TracedLLM(self.llm)
+            trace_tasks()
+
+    def token_budget(self, task: str) -> int:
+        """Evidence budget of a task, leaving at least half the model's context for everything else"""
+        budget = TASK_BUDGETS.get(task, TASK_BUDGETS['reporting_task'])
+        return min(budget, self.llm.get_context_window_size() // 2)
+
+    def prepare_evidence(self, evidence: Evidence, inputs: Dict) -> Dict[str, str]:
+        """
+        The collection output handed to each task, packed into the task's
+        token budget: the most severe and most recent evidence first. Evidence
+        too large for one analysis prompt is split into groups of namespaces
+        that are analyzed in parallel (map); log_analysis_task then merges the
+        per-shard findings (reduce) into the analysis the later tasks expect.
+        """
+        tasks = [name for name in self.tasks_config if name != 'log_collection_task']  # type: ignore[union-attr]
+        packed = {task: evidence.render(budget=self.token_budget(task)) for task in tasks}
+        if evidence.scan is None or count_tokens(evidence.render()) <= self.shard_tokens:
+            return packed
+        scan, scanner = evidence.scan, evidence.scanner
+        sizes = {ns: count_tokens(ContextPacker().pack(scanner.items(scan, [ns]))) for ns in scan.namespaces}
+        groups = plan_shards(sizes, self.shard_tokens)
+        if len(groups) < 2:
+            return packed
+        shards = [Shard(f"shard {i}/{len(groups)}", group, scanner.render(scan, group, budget=self.shard_tokens))
+                  for i, group in enumerate(groups, 1)]
+        self.shard_findings = map_shards(self.llm, shards, lambda shard: self._shard_messages(shard, inputs),
+                                         max_workers=self.analysis_workers)
+        findings = render_findings(self.shard_findings)
+        budget = max(0, self.token_budget('log_analysis_task') - count_tokens(findings))
+        summary = evidence.render(details=False, budget=budget)
+        packed['log_analysis_task'] = f"{summary}\n\n{findings}"
+        return packed
+
+    def _shard_messages(self, shard: Shard, inputs: Dict) -> List[Dict[str, str]]:
+        analyzer = self.agents_config['log_analyzer']  # type: ignore[index]
+        task = self.tasks_config['log_analysis_task']  # type: ignore[index]
+        system = (f"You are {analyzer['role'].strip()}. {analyzer['backstory'].strip()}\n"
+                  f"Your personal goal is: {analyzer['goal'].strip()}")
+        user = (f"This is one shard of a larger cluster analysis, covering namespaces: {', '.join(shard.namespaces)}. "
+                "The other namespaces are analyzed separately and all findings are merged afterwards.\n\n"
+                f"{interpolate_only(task['description'], inputs)}\n"
+                "Report only what this evidence supports, as a list of findings. For each give the severity "
+                "(Critical/High/Medium/Low), category, affected namespace/pods, supporting evidence "
+                "(counts, sample lines), likely root cause and recommended action.\n\n"
+                f"Evidence:\n{shard.evidence}")
+        return [{'role': 'system', 'content': system}, {'role': 'user', 'content': user}]
 
     @agent
     def log_collector(self) -> Agent:
@@ -234,7 +258,10 @@ class KubernetesLogAnalysis():
             config=self.agents_config['log_collector'],  # type: ignore[index]
             verbose=True,
             llm=self.llm,
-            tools=[KubernetesLogCollectorTool(), ClusterInfoTool()]
+            tools=[KubernetesLogCollectorTool(scanner=LogScanner(incremental=self.incremental, context=self.context,
+                                                              cursor_scope=self.scope)),
+                   ClusterInfoTool(context=self.context)]
+                  + ([ResourceMetricsTool(context=self.context)] if metrics_enabled() else [])
         )
 
     @agent
@@ -243,7 +270,8 @@ class KubernetesLogAnalysis():
             config=self.agents_config['log_analyzer'],  # type: ignore[index]
             verbose=True,
             llm=self.llm,
-            tools=[]
+            tools=([LogHistoryTool(context=self.context)] if history_enabled() else [])
+                  + ([ResourceMetricsTool(context=self.context)] if metrics_enabled() else [])
         )
 
     @agent
@@ -286,15 +314,65 @@ class KubernetesLogAnalysis():
     def reporting_task(self) -> Task:
         return Task(
             config=self.tasks_config['reporting_task'],  # type: ignore[index]
-            output_file='kubernetes_log_analysis_report.md'
+            output_file=self.report_file
         )
 
+    @staticmethod
+    def _collected(collection: Task, evidence: str) -> Task:
+        done = Task(description=collection.description, expected_output=collection.expected_output,
+                    agent=collection.agent, name=collection.name)
+        done.output = TaskOutput(
+            description=collection.description,
+            name=collection.name,
+            raw=evidence,
+            agent=collection.agent.role,
+        )
+        return done
+
+    def rebind(self, incremental: bool = True, report_file: Optional[str] = 'kubernetes_log_analysis_report.md',
+               scope: str = "run"):
+        """
+        Point an already built crew definition at the next run (daemon jobs
+        reuse one): only the per-run settings change, the configs, agents,
+        tools and tasks are kept. Call next_crew() after prepare_evidence().
+        """
+        self.incremental, self.report_file, self.scope = incremental, report_file, scope
+        self.evidence = None
+        self.shard_findings = []
+        self.reporting_task().output_file = report_file
+        for tool in self.log_collector().tools:
+            if isinstance(tool, KubernetesLogCollectorTool):
+                tool.scanner = LogScanner(incremental=incremental, context=self.context, cursor_scope=scope)
+
+    def next_crew(self) -> Crew:
+        """The crew for this run: built on first use, afterwards reassembled from the same agents and tasks"""
+        if 'tasks' not in vars(self):
+            return self.crew()
+        return self._assemble()
+
     @crew
     def crew(self) -> Crew:
         """Creates the Kubernetes Log Analysis crew"""
+        return self._assemble()
+
+    def _assemble(self) -> Crew:
+        agents, tasks = self.agents, self.tasks
+        # The contexts from tasks.yaml, restored when a reused definition runs without evidence
+        self._config_contexts = getattr(self, '_config_contexts', None) or {t.name: t.context for t in tasks}
+        for t in tasks:
+            t.context = self._config_contexts[t.name]
+        if self.evidence is not None:
+            # The collection task is completed up front and handed to every later
+            # task as context, exactly as its agent's output would have been; each
+            # task gets its own copy holding the evidence packed for its budget
+            collection = self.log_collection_task()
+            tasks = [t for t in tasks if t is not collection]
+            for i, t in enumerate(tasks):
+                t.context = [self._collected(collection, self.evidence[t.name])] + tasks[:i]
+            agents = [a for a in agents if a is not collection.agent]
         return Crew(
-            agents=self.agents,
-            tasks=self.tasks,
+            agents=agents,
+            tasks=tasks,
             process=Process.sequential,
             verbose=True,
         )
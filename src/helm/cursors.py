@@ -0,0 +1,118 @@
+"""Per-container resume cursors so repeated runs only fetch new log lines."""
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from helm.state import state_path
+
+# kubelet prefixes every line with an RFC3339Nano timestamp when asked for --timestamps
+_TIMESTAMP_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d{1,9}))?(Z|[+-]\d{2}:\d{2}) ')
+
+# Cursors untouched for this long belong to pods that no longer exist
+CURSOR_TTL = 7 * 86400
+# Stores saving the same file from several threads (fleet fan-out) merge one at a time
+_SAVE_LOCK = threading.Lock()
+
+
+def normalise_timestamp(seconds: str, fraction: Optional[str], zone: str = "Z") -> str:
+    """
+    Fixed-width UTC form of a kubelet timestamp. RFC3339Nano drops trailing
+    zeros, so raw timestamps do not sort correctly as strings.
+    """
+    if zone != "Z":
+        moment = datetime.fromisoformat(seconds + zone).astimezone(timezone.utc)
+        seconds = moment.strftime('%Y-%m-%dT%H:%M:%S')
+    return f"{seconds}.{(fraction or '').ljust(9, '0')}Z"
+
+
+def split_timestamp(line: str) -> Tuple[Optional[str], str]:
+    """Split a ``--timestamps`` line into its normalised timestamp and the original text"""
+    match = _TIMESTAMP_RE.match(line)
+    if not match:
+        return None, line
+    return normalise_timestamp(*match.groups()), line[match.end():]
+
+
+def window_start(since_seconds: int) -> str:
+    moment = datetime.now(timezone.utc) - timedelta(seconds=since_seconds)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond:06d}000Z"
+
+
+class CursorStore:
+    """
+    Last ingested timestamp per cluster/namespace/pod/container/restartCount,
+    kept separately per ``scope``: each kind of run (``run``, ``health``,
+    ``security``...) resumes from where the previous run of that kind stopped,
+    so a 24h security audit is not cut down to what was logged since the last
+    health check.
+
+    A container restart bumps restartCount, so the new instance starts with no
+    cursor. A pod recreated under the same name (e.g. a StatefulSet replica)
+    keeps its restartCount but gets a new container ID, and its cursor is reset.
+    """
+
+    def __init__(self, path: Optional[str] = None, scope: str = "run"):
+        self.path = path or state_path("log_cursors.json")
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, Dict] = self._read()
+
+    def key(self, cluster: str, namespace: str, pod: str, container: Optional[str], restart_count: int) -> str:
+        return f"{self.scope}:{cluster}/{namespace}/{pod}/{container or ''}/{restart_count}"
+
+    def get(self, key: str, container_id: Optional[str] = None) -> Optional[str]:
+        """Timestamp to resume from, or None if this container instance was never read"""
+        with self._lock:
+            entry = self._cursors.get(key)
+        if not entry:
+            return None
+        if container_id and entry.get('container_id') and entry['container_id'] != container_id:
+            return None
+        return entry.get('last')
+
+    def advance(self, key: str, timestamp: Optional[str], container_id: Optional[str] = None):
+        with self._lock:
+            entry = self._cursors.get(key)
+            if entry and container_id and entry.get('container_id') not in (None, container_id):
+                entry = None
+            if timestamp is None:
+                # Nothing new; just keep the cursor alive
+                if entry:
+                    entry['updated'] = time.time()
+                return
+            if entry is None or timestamp > (entry.get('last') or ''):
+                self._cursors[key] = {'last': timestamp, 'container_id': container_id, 'updated': time.time()}
+            else:
+                entry['updated'] = time.time()
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """
+        Write the cursors, merged with what other stores (fleet clusters
+        scanned at the same time, other scopes) saved since this one loaded:
+        per key the entry updated last wins.
+        """
+        cutoff = time.time() - CURSOR_TTL
+        with _SAVE_LOCK, self._lock:
+            merged = self._read()
+            for key, entry in self._cursors.items():
+                if entry.get('updated', 0) >= merged.get(key, {}).get('updated', 0):
+                    merged[key] = entry
+            self._cursors = {k: v for k, v in merged.items() if v.get('updated', 0) >= cutoff}
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._cursors, f)
+            os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self._cursors)
@@ -0,0 +1,253 @@
+"""Long-running mode: scheduled analyses from one warm process, plus a local trigger endpoint."""
+import itertools
+import json
+import os
+import queue
+import random
+import signal
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from helm.kube import parse_duration
+
+
+@dataclass
+class Schedule:
+    """Run ``job`` every ``interval`` seconds, each time shifted by up to ``jitter`` of the interval"""
+    job: str
+    interval: float
+    jitter: float = 0.1
+    next_run: float = 0.0
+
+    def plan(self, now: float, first: bool = False):
+        # The first run is spread over one jitter window so jobs started together do not collide
+        if first:
+            self.next_run = now + random.uniform(0, self.jitter * self.interval)
+        else:
+            self.next_run = now + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+@dataclass
+class JobRun:
+    id: int
+    job: str
+    params: Dict = field(default_factory=dict)
+    trigger: str = "schedule"
+    queued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    status: str = "queued"
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.job}:{json.dumps(self.params, sort_keys=True)}"
+
+    def summary(self) -> Dict:
+        elapsed = (self.finished_at or time.time()) - self.started_at if self.started_at else None
+        return {'id': self.id, 'job': self.job, 'params': self.params, 'trigger': self.trigger,
+                'status': self.status, 'error': self.error, 'queued_at': self.queued_at,
+                'elapsed': round(elapsed, 2) if elapsed is not None else None}
+
+
+def parse_schedule(value: str, jitter: float = 0.1) -> List[Schedule]:
+    """``health=15m,security=6h`` -> schedules"""
+    schedules = []
+    for part in filter(None, (p.strip() for p in value.split(','))):
+        job, sep, every = part.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid schedule entry '{part}', expected job=interval")
+        schedules.append(Schedule(job.strip(), parse_duration(every.strip()), jitter))
+    return schedules
+
+
+class Daemon:
+    """
+    Runs jobs from a queue in one process, so imports, the crew definition,
+    the LLM client and the Kubernetes connections stay warm between runs.
+    Scheduled jobs are enqueued when due; a job that is still queued or
+    running is not enqueued again. A local HTTP endpoint queues ad-hoc runs.
+    """
+
+    def __init__(self, jobs: Dict[str, Callable[..., object]], schedules: List[Schedule],
+                 host: str = "127.0.0.1", port: int = 8787, workers: int = 1, history: int = 50):
+        unknown = [s.job for s in schedules if s.job not in jobs]
+        if unknown:
+            raise ValueError(f"Unknown job(s) in schedule: {', '.join(unknown)}")
+        self.jobs = jobs
+        self.schedules = schedules
+        self.host, self.port = host, port
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue[Optional[JobRun]]" = queue.Queue()
+        self.active: Dict[str, JobRun] = {}
+        self.finished: deque = deque(maxlen=history)
+        self.runs: Dict[int, JobRun] = {}
+        self.skipped = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def submit(self, job: str, trigger: str = "manual", **params) -> Optional[JobRun]:
+        """Queue a run, or return None when the same job with the same parameters is already pending"""
+        if job not in self.jobs:
+            raise KeyError(job)
+        run = JobRun(0, job, params, trigger)
+        with self._lock:
+            if run.key in self.active:
+                self.skipped += 1
+                return None
+            run.id = next(self._ids)
+            self.active[run.key] = run
+            self.runs[run.id] = run
+        self.queue.put(run)
+        return run
+
+    def _work(self):
+        while True:
+            run = self.queue.get()
+            if run is None:
+                return
+            run.status, run.started_at = "running", time.time()
+            print(f"▶️ Job {run.id} ({run.job}) started")
+            try:
+                self.jobs[run.job](**run.params)
+                run.status = "done"
+            except Exception as e:
+                run.status, run.error = "failed", str(e)
+            run.finished_at = time.time()
+            print(f"{'✅' if run.status == 'done' else '❌'} Job {run.id} ({run.job}) {run.status} "
+                  f"in {run.finished_at - run.started_at:.1f}s")
+            with self._lock:
+                self.active.pop(run.key, None)
+                self.finished.append(run)
+                # Keep lookups for recent runs only
+                for old in [i for i in self.runs if i <= run.id - self.finished.maxlen * 2]:
+                    self.runs.pop(old, None)
+
+    def _schedule(self):
+        now = time.monotonic()
+        for schedule in self.schedules:
+            schedule.plan(now, first=True)
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for schedule in self.schedules:
+                if now >= schedule.next_run:
+                    if self.submit(schedule.job, trigger="schedule") is None:
+                        print(f"⏭️ Skipping {schedule.job}: previous run still pending")
+                    schedule.plan(now)
+            wait = min((s.next_run for s in self.schedules), default=now + 60) - time.monotonic()
+            self._stop.wait(max(0.1, min(wait, 60)))
+
+    def status(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'schedules': [{'job': s.job, 'interval': s.interval, 'next_run_in': round(s.next_run - now, 1)}
+                              for s in self.schedules],
+                'queued': self.queue.qsize(),
+                'active': [r.summary() for r in self.active.values()],
+                'finished': [r.summary() for r in reversed(self.finished)],
+                'skipped': self.skipped,
+            }
+
+    def start(self) -> "Daemon":
+        for _ in range(self.workers):
+            self._threads.append(threading.Thread(target=self._work, name="helm-worker", daemon=True))
+        if self.schedules:
+            self._threads.append(threading.Thread(target=self._schedule, name="helm-scheduler", daemon=True))
+        if self.port is not None:
+            self.server = ThreadingHTTPServer((self.host, self.port), _Handler)
+            self.server.daemon_threads = True
+            self.server.helm = self
+            self.port = self.server.server_address[1]
+            self._threads.append(threading.Thread(target=self.server.serve_forever, name="helm-http", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        """Stop scheduling and serving; queued jobs are dropped, a running job is allowed to finish"""
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        for _ in range(self.workers):
+            self.queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def wait(self):
+        """Block until interrupted with Ctrl-C or SIGTERM"""
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        daemon: Daemon = self.server.helm
+        if self.path == "/status":
+            return self._send(200, daemon.status())
+        if self.path.startswith("/jobs/"):
+            run = daemon.runs.get(int(self.path[6:])) if self.path[6:].isdigit() else None
+            return self._send(200, run.summary()) if run else self._send(404, {'error': "unknown job id"})
+        self._send(404, {'error': f"{self.path} not found"})
+
+    def do_POST(self):
+        daemon: Daemon = self.server.helm
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        except ValueError:
+            return self._send(400, {'error': "body must be JSON"})
+        if self.path == "/incident":
+            if not body.get('namespace'):
+                return self._send(400, {'error': "namespace is required"})
+            params = {k: body[k] for k in ('namespace', 'pod', 'since') if body.get(k)}
+            return self._queued(daemon.submit('incident', trigger="http", **params))
+        if self.path.startswith("/run/") and self.path[5:] in daemon.jobs and self.path[5:] != 'incident':
+            return self._queued(daemon.submit(self.path[5:], trigger="http"))
+        self._send(404, {'error': f"{self.path} not found"})
+
+    def _queued(self, run: Optional[JobRun]):
+        if run is None:
+            return self._send(409, {'error': "the same job is already queued or running"})
+        self._send(202, run.summary())
+
+
+def daemon_settings() -> Dict:
+    """Daemon options from the environment"""
+    port = os.getenv("HELM_DAEMON_PORT", "8787")
+    return {
+        'schedule': os.getenv("HELM_DAEMON_SCHEDULE", "health=15m,security=6h"),
+        'jitter': float(os.getenv("HELM_DAEMON_JITTER", "0.1")),
+        'port': int(port) if port not in ("", "off") else None,
+        'host': os.getenv("HELM_DAEMON_HOST", "127.0.0.1"),
+        'workers': int(os.getenv("HELM_DAEMON_WORKERS", "1")),
+    }
@@ -0,0 +1,247 @@
+"""Kubernetes event index kept current with list-then-watch and resourceVersion bookmarks."""
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from helm.kube import KubeError, parse_duration
+from helm.state import state_path
+
+
+@dataclass
+class EventRecord:
+    """All events about one object with one reason, however many times the cluster reported them"""
+    namespace: str
+    kind: str
+    name: str
+    reason: str
+    type: str = "Normal"
+    message: str = ""
+    count: int = 0
+    first_seen: str = ""
+    last_seen: str = ""
+    # Event object uid -> its own count, so MODIFIED updates are not counted twice
+    sources: Dict[str, int] = field(default_factory=dict)
+    # Event object uid -> when it last happened, so counts can be limited to a window
+    source_seen: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return event_key(self.namespace, self.kind, self.name, self.reason)
+
+    @property
+    def object(self) -> str:
+        return f"{self.kind.lower()}/{self.name}"
+
+    def count_since(self, since: Optional[str]) -> int:
+        """Events reported by the event objects that last happened at or after ``since``"""
+        if since is None:
+            return self.count
+        return sum(count for uid, count in self.sources.items()
+                   if self.source_seen.get(uid, self.last_seen) >= since)
+
+    def forget_before(self, before: str):
+        """Drop the event objects that last happened before ``before``"""
+        for uid in [u for u in self.sources if self.source_seen.get(u, self.last_seen) < before]:
+            del self.sources[uid]
+            self.source_seen.pop(uid, None)
+        self.count = sum(self.sources.values())
+
+
+def event_key(namespace: str, kind: str, name: str, reason: str) -> str:
+    return f"{namespace}/{kind}/{name}/{reason}"
+
+
+def _seconds(timestamp: Optional[str]) -> str:
+    """RFC3339 with or without a fraction, cut to whole seconds so it sorts as a string"""
+    return timestamp[:19] + 'Z' if timestamp else ''
+
+
+def ago(duration: str) -> str:
+    """Timestamp ``duration`` (e.g. ``1h``) before now, in the index's format"""
+    moment = datetime.now(timezone.utc) - timedelta(seconds=parse_duration(duration))
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class EventIndex:
+    """
+    Deduplicated events of one cluster. The first sync lists every event and
+    remembers the list's resourceVersion; later syncs only watch for changes
+    since then, advancing the resourceVersion with each event and bookmark.
+    When the API server has compacted that version away (410 Gone) the index
+    lists again. The index and its resourceVersion persist between runs.
+    """
+
+    def __init__(self, cluster: str = "default", path: Optional[str] = None,
+                 retention: Optional[str] = None):
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', cluster)
+        self.cluster = cluster
+        self.path = path or state_path(f"events_{safe}.json")
+        self.retention = parse_duration(retention or os.getenv("HELM_EVENT_RETENTION", "24h"))
+        self.resource_version: Optional[str] = None
+        self.records: Dict[str, EventRecord] = {}
+        self.synced_at = 0.0
+        self.relists = 0
+        self.watched = 0
+        self._by_namespace: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.resource_version = data.get('resource_version')
+        for raw in data.get('records', []):
+            record = EventRecord(**raw)
+            self.records[record.key] = record
+            self._by_namespace[record.namespace].add(record.key)
+
+    def save(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+        self.prune(cutoff.strftime('%Y-%m-%dT%H:%M:%SZ'))
+        with self._lock:
+            data = json.dumps({'resource_version': self.resource_version,
+                               'records': [vars(r) for r in self.records.values()]})
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def prune(self, before: str):
+        """Forget objects whose last event is older than ``before``, and older event objects of the rest"""
+        with self._lock:
+            for key in [k for k, r in self.records.items() if r.last_seen < before]:
+                record = self.records.pop(key)
+                self._by_namespace[record.namespace].discard(key)
+            for record in self.records.values():
+                record.forget_before(before)
+
+    def apply(self, kind: str, event: Dict):
+        """Fold one watch event (ADDED, MODIFIED, DELETED or BOOKMARK) into the index"""
+        meta = event.get('metadata') or {}
+        with self._lock:
+            if meta.get('resourceVersion'):
+                self.resource_version = meta['resourceVersion']
+            # Deleted events have only expired on the server; what they said still counts
+            if kind not in ('ADDED', 'MODIFIED'):
+                return
+            involved = event.get('involvedObject') or event.get('regarding') or {}
+            namespace = meta.get('namespace') or involved.get('namespace') or ''
+            key = event_key(namespace, involved.get('kind', ''), involved.get('name', ''), event.get('reason', ''))
+            record = self.records.get(key)
+            if record is None:
+                record = self.records[key] = EventRecord(namespace, involved.get('kind', ''),
+                                                         involved.get('name', ''), event.get('reason', ''))
+                self._by_namespace[namespace].add(key)
+            series = event.get('series') or {}
+            first = _seconds(event.get('firstTimestamp') or event.get('eventTime') or meta.get('creationTimestamp'))
+            last = _seconds(event.get('lastTimestamp') or series.get('lastObservedTime')
+                            or event.get('eventTime') or meta.get('creationTimestamp'))
+            uid = meta.get('uid') or meta.get('name') or key
+            record.sources[uid] = event.get('count') or series.get('count') or 1
+            record.source_seen[uid] = max(last, record.source_seen.get(uid, ''))
+            record.count = sum(record.sources.values())
+            if first and (not record.first_seen or first < record.first_seen):
+                record.first_seen = first
+            if last >= record.last_seen:
+                record.last_seen = last
+                record.type = event.get('type') or record.type
+                record.message = (event.get('message') or event.get('note') or '').replace('\n', ' ')
+
+    def sync(self, backend, watch_seconds: Optional[int] = None):
+        """Bring the index up to date: a full list the first time, a watch from the bookmark after that"""
+        if watch_seconds is None:
+            watch_seconds = int(os.getenv("HELM_EVENT_WATCH_SECONDS", "1"))
+        with self._lock:
+            if self.resource_version is None:
+                self._relist(backend)
+            else:
+                try:
+                    self._watch(backend, watch_seconds)
+                except KubeError as e:
+                    # The resourceVersion was compacted away: list again and resume from there
+                    if not _is_expired(e):
+                        raise
+                    self._relist(backend)
+            self.synced_at = time.monotonic()
+
+    def _relist(self, backend):
+        items, resource_version = backend.list_events()
+        self.relists += 1
+        for item in items:
+            self.apply('ADDED', item)
+        self.resource_version = resource_version
+
+    def _watch(self, backend, seconds: int):
+        for change in backend.watch_events(self.resource_version, seconds):
+            if change.get('type') == 'ERROR':
+                status = change.get('object') or {}
+                raise KubeError(f"watch failed ({status.get('code')}): {status.get('message')}")
+            self.watched += 1
+            self.apply(change.get('type', ''), change.get('object') or {})
+
+    def refresh(self, backend, max_age: float = 5.0):
+        """Sync and persist unless another caller did so in the last ``max_age`` seconds"""
+        with self._lock:
+            if self.synced_at and time.monotonic() - self.synced_at < max_age:
+                return
+            self.sync(backend)
+            self.save()
+
+    def query(self, namespaces: Optional[Iterable[str]] = None, type: Optional[str] = None,
+              since: Optional[str] = None, reason: Optional[str] = None,
+              limit: Optional[int] = None) -> List[EventRecord]:
+        """Matching records, newest first; ``since`` is a timestamp (see ``ago``)"""
+        with self._lock:
+            if namespaces is None:
+                keys = self.records.keys()
+            else:
+                keys = [k for ns in namespaces for k in self._by_namespace.get(ns, ())]
+            found = [r for r in (self.records[k] for k in keys)
+                     if (type is None or r.type == type) and (reason is None or r.reason == reason)
+                     and (since is None or r.last_seen >= since)]
+        found.sort(key=lambda r: (r.last_seen, r.count), reverse=True)
+        return found if limit is None else found[:limit]
+
+    def top_reasons(self, since: Optional[str] = None, namespaces: Optional[Iterable[str]] = None,
+                    type: Optional[str] = None, limit: int = 10) -> List[Tuple[str, str, int, int]]:
+        """
+        (reason, type, event count, objects affected), most frequent first;
+        only events of the event objects seen since ``since`` are counted
+        """
+        events, objects, types = Counter(), Counter(), {}
+        with self._lock:
+            for record in self.query(namespaces, type, since):
+                events[record.reason] += record.count_since(since)
+                objects[record.reason] += 1
+                # A reason is a warning if any object reported it as one
+                if types.get(record.reason) != 'Warning':
+                    types[record.reason] = record.type
+        return [(reason, types[reason], count, objects[reason]) for reason, count in events.most_common(limit)]
+
+
+def _is_expired(error: Exception) -> bool:
+    text = str(error).lower()
+    return '410' in text or 'expired' in text or 'too old' in text
+
+
+_indexes: Dict[str, EventIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_event_index(backend) -> EventIndex:
+    """The shared, up-to-date event index of the backend's cluster"""
+    with _indexes_lock:
+        index = _indexes.get(backend.cluster_id)
+        if index is None:
+            index = _indexes[backend.cluster_id] = EventIndex(backend.cluster_id)
+    index.refresh(backend)
+    return index
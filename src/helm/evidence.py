@@ -0,0 +1,365 @@
+"""Cluster evidence for the crew and the CLI: log scans and the cluster overview, without crewAI."""
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from helm import tracing
+from helm.anomaly import anomaly_items, find_anomalies
+from helm.classifier import SEVERITY_RANK
+from helm.collector import ClusterScan, collect_logs, load_inventory, order_namespaces
+from helm.cursors import CursorStore
+from helm.events import EventRecord, ago, get_event_index
+from helm.history import get_history, history_enabled
+from helm.kube import KubeError, format_table, get_backend
+from helm.metrics import ResourceMetrics, metrics_enabled, sample_metrics
+from helm.packer import TASK_BUDGETS, ContextPacker, Item
+
+
+@dataclass
+class LogScanner:
+    """Collects pod logs and turns a scan into evidence items"""
+    max_workers: int = int(os.getenv("HELM_COLLECT_WORKERS", "16"))
+    call_timeout: float = float(os.getenv("HELM_CALL_TIMEOUT", "10"))
+    total_timeout: float = float(os.getenv("HELM_COLLECT_TIMEOUT", "60"))
+    log_budget: int = int(os.getenv("HELM_LOG_BUDGET", "60"))
+    tail_lines: int = int(os.getenv("HELM_LOG_TAIL", "0"))
+    mine_templates: bool = os.getenv("HELM_MINE_TEMPLATES", "1") != "0"
+    pattern_limit: int = int(os.getenv("HELM_PATTERN_LIMIT", "40"))
+    backend_kind: str = os.getenv("HELM_KUBE_BACKEND", "auto")
+    # kubeconfig context to scan; None is the current context
+    context: Optional[str] = None
+    incremental: bool = os.getenv("HELM_INCREMENTAL", "1") != "0"
+    # Runs of the same kind share resume cursors (see CursorStore)
+    cursor_scope: str = "run"
+    detect_anomalies: bool = os.getenv("HELM_ANOMALIES", "1") != "0"
+    token_budget: int = TASK_BUDGETS['log_analysis_task']
+
+    def scan(self, namespaces: str = "ALL_NAMESPACES", since: str = "1h") -> ClusterScan:
+        """Collect logs without rendering them"""
+        backend = get_backend(self.backend_kind, self.context)
+        
+        # One cluster-wide listing gives the health of every pod up front
+        inventory = load_inventory(backend=backend)
+        
+        all_namespaces = namespaces == "ALL_NAMESPACES"
+        if all_namespaces:
+            namespaces_to_check = order_namespaces(inventory.namespaces())
+        else:
+            # Use specified namespaces
+            namespaces_to_check = [ns.strip() for ns in namespaces.split(',')]
+        
+        # Spend the log budget on the most unhealthy pods first
+        targets = inventory.select_targets(self.log_budget, namespaces_to_check)
+        with tracing.span("collect logs", "collect", targets=len(targets)) as span:
+            collection = collect_logs(
+                targets,
+                since=since,
+                tail=self.tail_lines or None,
+                max_workers=self.max_workers,
+                call_timeout=self.call_timeout,
+                total_timeout=self.total_timeout,
+                backend=backend,
+                cursors=CursorStore(scope=self.cursor_scope) if self.incremental else None,
+                mine_templates=self.mine_templates,
+                track_rates=self.detect_anomalies,
+            )
+            span.set(skipped=len(collection.skipped), deadline_hit=collection.deadline_hit)
+        with tracing.span("event index", "collect"):
+            try:
+                events = get_event_index(backend).query(namespaces_to_check, type='Warning', since=ago(since))
+            except KubeError:
+                events = []
+        scan = ClusterScan(inventory, namespaces_to_check, collection, since, all_namespaces, events,
+                           backend.cluster_id)
+        if self.detect_anomalies:
+            with tracing.span("anomaly detection", "analysis") as span:
+                scan.anomalies, scan.rate_series = find_anomalies(scan)
+                span.set(series=scan.rate_series, anomalies=len(scan.anomalies))
+        return scan
+
+    def render(self, scan: ClusterScan, namespaces: Optional[List[str]] = None, details: bool = True,
+               budget: Optional[int] = None) -> str:
+        """
+        Text report of a scan, packed into ``budget`` tokens (default: the
+        scanner's token_budget). ``namespaces`` limits it to part of the cluster;
+        without ``details`` only the cluster-wide summary sections are included.
+        """
+        items = self.items(scan, namespaces, details)
+        if not items:
+            return "No logs collected from cluster"
+        return ContextPacker(self.token_budget if budget is None else budget).pack(items)
+
+    def items(self, scan: ClusterScan, namespaces: Optional[List[str]] = None, details: bool = True) -> List[Item]:
+        """The scan as prioritised evidence items for the context packer"""
+        all_logs = []
+        inventory, collection = scan.inventory, scan.collection
+        namespaces_to_check = scan.namespaces if namespaces is None else namespaces
+        logs = [log for log in collection.logs if log.namespace in set(namespaces_to_check)]
+        total_pods_checked = len(logs)
+        resumed = [log for log in logs if log.resumed_from]
+        
+        if scan.all_namespaces and namespaces is None:
+            all_logs.append(Item(f"=== SCANNING {len(namespaces_to_check)} NAMESPACES ===\n"
+                                 f"=== SCAN ORDER: {', '.join(namespaces_to_check)} ===\n", pinned=True))
+        
+        unhealthy = inventory.unhealthy(namespaces_to_check)
+        section = f"=== UNHEALTHY PODS: {len(unhealthy)} ==="
+        for pod in unhealthy:
+            # Already ranked worst first
+            all_logs.append(Item(f"{pod.namespace}/{pod.name} [{pod.phase}] {'; '.join(pod.problems())}",
+                                 section, priority=SEVERITY_RANK['error']))
+        
+        # Categories (auth-failure, oom, probe-failure, ...) over every line read
+        category_lines, category_pods = Counter(), Counter()
+        for log in logs:
+            category_lines.update(log.digest.categories)
+            category_pods.update(log.digest.categories.keys())
+        if category_lines:
+            all_logs.append(Item("\n".join(f"{category}: {count} lines in {category_pods[category]} containers"
+                                           for category, count in category_lines.most_common()),
+                                 "=== LOG CATEGORIES ===", pinned=True))
+        
+        # Rates that rose above their baseline, instead of the series themselves
+        all_logs += anomaly_items(scan.anomalies, scan.rate_series, namespaces)
+        
+        # Repeated lines are collapsed into templates; the raw text is not sent on
+        if details and collection.templates is not None and collection.templates.lines:
+            rows = collection.templates.rows(namespaces=namespaces)
+            lines = sum(count for _, count, _ in rows)
+            section = f"=== LOG PATTERNS: {len(rows)} patterns from {lines} lines ==="
+            for template, count, text in rows[:self.pattern_limit]:
+                all_logs.append(Item(text, section, SEVERITY_RANK.get(template.severity, 0),
+                                     template.last_seen, key=f"template:{template.id}"))
+        
+        for namespace in namespaces_to_check if details else []:
+            pods = inventory.pods_in(namespace)
+            if not pods:
+                all_logs.append(Item(f"=== NAMESPACE {namespace}: No pods found ==="))
+                continue
+            
+            bad = sum(1 for pod in pods if not pod.healthy)
+            section = f"=== NAMESPACE {namespace}: Found {len(pods)} pods ({bad} unhealthy) ==="
+            
+            for record in scan.events:
+                if record.namespace == namespace:
+                    all_logs.append(Item(f"event: {record.type} {record.reason} on {record.object} "
+                                         f"x{record.count}, last {record.last_seen}: {record.message}",
+                                         section, SEVERITY_RANK['warning'], record.last_seen))
+            
+            for log in collection.logs_for(namespace):
+                source = f"{namespace}/{log.pod}" + (f" [{log.container}]" if log.container else "")
+                if log.previous:
+                    source += " (previous instance)"
+                digest = log.digest
+                stamp = digest.last_timestamp
+                if log.error:
+                    all_logs.append(Item(f"--- {source} (ERROR) ---\n{log.error}", section,
+                                         SEVERITY_RANK['warning'], stamp))
+                elif digest.issue_count:
+                    # Severity was counted over every line of the window
+                    text = f"--- {source} (ISSUES FOUND: {digest.summary()}) ---"
+                    if collection.templates is None:
+                        text += "\n" + digest.render()
+                    severity = 'error' if digest.counts['error'] else 'warning'
+                    all_logs.append(Item(text, section, SEVERITY_RANK[severity], stamp))
+                elif digest.lines:
+                    text = f"--- {source} (Normal: {digest.summary()}) ---"
+                    if collection.templates is None:
+                        text += "\n" + digest.render()
+                    all_logs.append(Item(text, section, SEVERITY_RANK['info'], stamp))
+                elif log.stderr:
+                    all_logs.append(Item(f"--- {source} (ERROR) ---\n{log.stderr}", section,
+                                         SEVERITY_RANK['warning'], stamp))
+        
+        if collection.skipped:
+            all_logs.append(Item(f"=== DEADLINE REACHED: {len(collection.skipped)} targets skipped ===", pinned=True))
+        
+        if not all_logs:
+            return []
+        
+        summary = f"=== CLUSTER SCAN SUMMARY ===\n"
+        summary += f"Namespaces scanned: {len(namespaces_to_check)}\n"
+        summary += f"Total pods in scope: {sum(len(inventory.pods_in(ns)) for ns in namespaces_to_check)}\n"
+        summary += f"Unhealthy pods: {len(unhealthy)}\n"
+        summary += f"Total pods checked: {total_pods_checked}\n"
+        summary += f"Time range: {scan.since}\n"
+        if resumed:
+            summary += (f"Incremental: {len(resumed)} containers resumed from last run, "
+                        f"{sum(1 for log in resumed if log.digest.lines)} with new lines\n")
+        summary += f"Collection time: {collection.elapsed:.1f}s\n"
+        summary += f"Scan completed at: {datetime.now().strftime('%H:%M:%S')}\n"
+        
+        return [Item(summary, pinned=True)] + all_logs
+
+
+def cluster_overview(backend_kind: Optional[str] = None, events_since: str = "1h",
+                     event_rows: bool = True, context: Optional[str] = None) -> List[Item]:
+    """
+    Cluster overview as prioritised evidence items for the context packer.
+    Without ``event_rows`` only the event summary is included, for callers
+    that report events per namespace themselves.
+    """
+    cluster_info = []
+    backend = get_backend(backend_kind, context)
+    if context:
+        cluster_info.append(Item(f"=== CLUSTER CONTEXT: {context} ===", pinned=True))
+    
+    # Get cluster info
+    try:
+        info = backend.cluster_info(timeout=15)
+        cluster_info.append(Item(info.strip(), "=== CLUSTER INFO ===", SEVERITY_RANK['warning']))
+    except KubeError:
+        pass
+    
+    # Get node status
+    try:
+        nodes = backend.nodes_table(timeout=15)
+        cluster_info += _table_items(nodes, "=== NODE STATUS ===",
+                                     lambda row: 'error' if 'NotReady' in row or 'Unknown' in row else 'info')
+    except KubeError:
+        pass
+    
+    # Get namespace summary
+    try:
+        namespaces = backend.namespaces_table(timeout=15)
+        cluster_info += _table_items(namespaces, "=== NAMESPACES ===",
+                                     lambda row: 'warning' if 'Terminating' in row else 'info')
+    except KubeError:
+        pass
+    
+    # Events come from the watch-maintained index, already merged per object and reason
+    try:
+        index = get_event_index(backend)
+        since = ago(events_since)
+        cluster_info += _reason_items(index.top_reasons(since), events_since)
+        if event_rows:
+            cluster_info += _event_items(index.query(since=since), "=== RECENT EVENTS ===")
+    except KubeError:
+        pass
+    
+    return cluster_info
+
+
+def _table_items(table: str, section: str, severity) -> List[Item]:
+    """One item per row of a kubectl-style table; the column header row is always kept"""
+    lines = [line for line in table.splitlines() if line.strip()]
+    if not lines:
+        return []
+    items = [Item(lines[0], section, pinned=True)]
+    for row in lines[1:]:
+        items.append(Item(row, section, SEVERITY_RANK[severity(row)]))
+    return items
+
+
+def _reason_items(reasons, since: str) -> List[Item]:
+    if not reasons:
+        return []
+    text = "\n".join(f"{reason} ({type}): {count} events on {objects} objects"
+                     for reason, type, count, objects in reasons)
+    return [Item(text, f"=== TOP EVENT REASONS (last {since}) ===", pinned=True)]
+
+
+def _event_items(records: List[EventRecord], section: str) -> List[Item]:
+    """Events as table rows, warnings ranked above normal events"""
+    if not records:
+        return []
+    rows = [[r.namespace, r.last_seen, r.type, r.reason, r.object, str(r.count), r.message] for r in records]
+    lines = format_table(['NAMESPACE', 'LAST SEEN', 'TYPE', 'REASON', 'OBJECT', 'COUNT', 'MESSAGE'], rows).splitlines()
+    items = [Item(lines[0], section, pinned=True)]
+    for record, line in zip(records, lines[1:]):
+        severity = 'warning' if record.type == 'Warning' else 'info'
+        items.append(Item(line, section, SEVERITY_RANK[severity], record.last_seen))
+    return items
+
+
+@dataclass
+class Evidence:
+    """Collected data for the crew: the cluster overview, the structured log scan, resource usage and earlier runs"""
+    overview: List[Item]
+    scan: Optional[ClusterScan] = None
+    scanner: Optional[LogScanner] = None
+    error: Optional[str] = None
+    history: List[Item] = field(default_factory=list)
+    metrics: Optional[ResourceMetrics] = None
+    metrics_error: Optional[str] = None
+
+    def items(self, namespaces: Optional[List[str]] = None, details: bool = True) -> List[Item]:
+        if self.scan is None:
+            logs = [Item(self.error or "No logs collected from cluster", pinned=True)]
+        else:
+            logs = self.scanner.items(self.scan, namespaces, details)
+        if self.metrics is not None:
+            usage = self.metrics.items(self.scan.inventory if self.scan else None, namespaces)
+        elif self.metrics_error:
+            usage = [Item(f"Resource usage unavailable: {self.metrics_error}")]
+        else:
+            usage = []
+        return self.overview + logs + usage + self.history
+
+    def render(self, namespaces: Optional[List[str]] = None, details: bool = True,
+               budget: Optional[int] = None) -> str:
+        """The evidence packed into ``budget`` tokens (default: everything)"""
+        return ContextPacker(budget).pack(self.items(namespaces, details))
+
+
+def collect_evidence(namespaces: str = "ALL_NAMESPACES", since: str = "1h", incremental: bool = True,
+                     context: Optional[str] = None, scope: str = "run") -> Evidence:
+    """
+    Run the collection step directly, without the log_collector agent: the
+    cluster overview, the pod logs and resource usage are gathered
+    concurrently. ``context`` selects the kubeconfig context (default: the
+    current one). ``scope`` names the resume cursors an incremental run uses.
+    """
+    scanner = LogScanner(incremental=incremental, context=context, cursor_scope=scope)
+    with tracing.span("collect evidence", "collect", context=context), ThreadPoolExecutor(max_workers=3) as pool:
+        overview = pool.submit(tracing.bind(_overview_items), since, context)
+        scan = pool.submit(tracing.bind(_scan), scanner, namespaces, since)
+        usage = pool.submit(tracing.bind(_sample_usage), scanner.backend_kind, context) if metrics_enabled() else None
+        metrics, metrics_error = None, None
+        if usage is not None:
+            try:
+                metrics = usage.result()
+            except Exception as e:
+                metrics_error = str(e)
+        try:
+            result = scan.result()
+            return Evidence(overview.result(), result, scanner, history=_history_items(result),
+                            metrics=metrics, metrics_error=metrics_error)
+        except KubeError as e:
+            return Evidence(overview.result(), scanner=scanner, error=f"Error getting pod inventory: {e}")
+        except Exception as e:
+            return Evidence(overview.result(), scanner=scanner, error=f"Error collecting cluster logs: {str(e)}")
+
+
+def _scan(scanner: LogScanner, namespaces: str, since: str) -> ClusterScan:
+    with tracing.span("log scan", "collect", namespaces=namespaces):
+        return scanner.scan(namespaces, since)
+
+
+def _overview_items(since: str, context: Optional[str] = None) -> List[Item]:
+    with tracing.span("cluster overview", "collect"):
+        try:
+            # Warning events are listed per namespace with the scan
+            return cluster_overview(events_since=since, event_rows=False, context=context)
+        except Exception as e:
+            return [Item(f"Error getting cluster info: {str(e)}", pinned=True)]
+
+
+def _sample_usage(backend_kind: str, context: Optional[str] = None) -> ResourceMetrics:
+    """Pod and node usage from the metrics API; metrics-server is optional, so callers report failures"""
+    with tracing.span("resource metrics", "collect"):
+        return sample_metrics(get_backend(backend_kind, context))
+
+
+def _history_items(scan: ClusterScan) -> List[Item]:
+    """Trends from earlier runs; the analysis works without them if the store is unavailable"""
+    if not history_enabled():
+        return []
+    with tracing.span("history trends", "history"):
+        try:
+            return get_history().history_items(scan)
+        except Exception as e:
+            return [Item(f"Run history unavailable: {e}")]
@@ -0,0 +1,153 @@
+"""Fleet mode: one analysis per kubeconfig context, run concurrently, merged into one report."""
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from helm import tracing
+from helm.collector import DaemonPool
+from helm.evidence import Evidence
+
+
+@dataclass
+class ClusterResult:
+    """Outcome of one cluster's run; ``error`` is set when it failed or missed the deadline"""
+    context: str
+    evidence: Optional[Evidence] = None
+    report: str = ""
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def stats(self) -> Dict[str, int]:
+        """Headline numbers from the collected evidence"""
+        scan = self.evidence.scan if self.evidence else None
+        if scan is None:
+            return {'pods': 0, 'unhealthy': 0, 'error_containers': 0, 'warning_events': 0}
+        return {
+            'pods': sum(len(scan.inventory.pods_in(ns)) for ns in scan.namespaces),
+            'unhealthy': len(scan.inventory.unhealthy(scan.namespaces)),
+            'error_containers': sum(1 for log in scan.collection.logs if log.digest.counts['error']),
+            'warning_events': len(scan.events),
+        }
+
+
+def _run_one(job: Callable[[str], Tuple[Optional[Evidence], str]], context: str) -> ClusterResult:
+    started = time.perf_counter()
+    try:
+        with tracing.span(f"cluster {context}", "cli", context=context):
+            evidence, report = job(context)
+        return ClusterResult(context, evidence, report, elapsed=time.perf_counter() - started)
+    except Exception as e:
+        return ClusterResult(context, error=f"{type(e).__name__}: {e}", elapsed=time.perf_counter() - started)
+
+
+def fan_out(contexts: List[str], job: Callable[[str], Tuple[Optional[Evidence], str]],
+            max_workers: Optional[int] = None, deadline: Optional[float] = None) -> List[ClusterResult]:
+    """
+    Run ``job(context)`` for every context concurrently; it returns the
+    cluster's evidence and report. A job that raises, or is still running
+    ``deadline`` seconds after the fan-out started, fails only its own
+    cluster. Jobs run on a :class:`DaemonPool`, so a hung cluster does not
+    keep the process alive after the deadline. Results are in the order of
+    ``contexts``.
+    """
+    if not contexts:
+        return []
+    pool = DaemonPool(max_workers or len(contexts), thread_name_prefix="helm-cluster")
+    futures = [pool.submit(tracing.bind(_run_one), job, context) for context in contexts]
+    wait(futures, timeout=deadline)
+    results = []
+    for context, future in zip(contexts, futures):
+        if future.done():
+            results.append(future.result())
+        else:
+            results.append(ClusterResult(context, error=f"not finished within {deadline:g}s", elapsed=deadline))
+    # A job past the deadline keeps its thread until it returns or the process exits
+    pool.shutdown()
+    return results
+
+
+def _shorten(text: str, width: int) -> str:
+    text = " ".join(text.split()).replace("|", "/")
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def _markdown_table(headers: List[str], rows: List[List[str]]) -> str:
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    lines += ["| " + " | ".join(str(v) for v in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def render_fleet_report(results: List[ClusterResult], title: str = "Kubernetes Fleet Report") -> str:
+    """
+    Markdown report for the fleet: a summary table with the worst clusters
+    first, the issue categories and event reasons seen across clusters, then
+    each cluster's own report.
+    """
+    failed = [r for r in results if not r.ok]
+    lines = [f"# {title}", "",
+             f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  ",
+             f"Clusters: {len(results)} ({len(results) - len(failed)} analyzed, {len(failed)} failed)  ",
+             f"Slowest cluster: {max((r.elapsed for r in results), default=0):.1f}s", "",
+             "## Fleet Summary", ""]
+    ranked = sorted(results, key=lambda r: (r.ok, -r.stats()['unhealthy'], -r.stats()['error_containers']))
+    rows = []
+    for result in ranked:
+        stats = result.stats()
+        # The full error is in the cluster's own section
+        status = "✅ analyzed" if result.ok else f"❌ {_shorten(result.error, 80)}"
+        rows.append([result.context, status, stats['pods'], stats['unhealthy'], stats['error_containers'],
+                     stats['warning_events'], f"{result.elapsed:.1f}s"])
+    lines += [_markdown_table(['Cluster', 'Status', 'Pods', 'Unhealthy pods', 'Containers with errors',
+                               'Warning events', 'Time'], rows), ""]
+
+    # The same problem in several clusters usually has a shared cause (a release, a dependency)
+    categories, reasons = Counter(), Counter()
+    category_clusters, reason_clusters = defaultdict(set), defaultdict(set)
+    for result in results:
+        scan = result.evidence.scan if result.evidence else None
+        if scan is None:
+            continue
+        for log in scan.collection.logs:
+            for category, count in log.digest.categories.items():
+                categories[category] += count
+                category_clusters[category].add(result.context)
+        for record in scan.events:
+            reasons[record.reason] += record.count
+            reason_clusters[record.reason].add(result.context)
+    if categories or reasons:
+        lines += ["## Issues Across Clusters", ""]
+        rows = [[f"log: {category}", count, len(category_clusters[category]),
+                 ", ".join(sorted(category_clusters[category]))] for category, count in categories.most_common()]
+        rows += [[f"event: {reason}", count, len(reason_clusters[reason]),
+                  ", ".join(sorted(reason_clusters[reason]))] for reason, count in reasons.most_common(10)]
+        lines += [_markdown_table(['Issue', 'Count', 'Clusters', 'Affected clusters'], rows), ""]
+
+    for result in results:
+        lines += [f"## Cluster: {result.context}", ""]
+        lines += [result.report.strip() if result.ok else f"❌ Analysis failed: {result.error}", ""]
+    return "\n".join(lines)
+
+
+def report_path(directory: str, context: str) -> str:
+    """Per-cluster report file; context names can contain ``/`` and ``:`` (e.g. EKS ARNs)"""
+    return os.path.join(directory, re.sub(r'[^A-Za-z0-9_.-]', '_', context) + ".md")
+
+
+def fleet_settings() -> Dict:
+    """Fleet options from the environment"""
+    deadline = float(os.getenv("HELM_FLEET_DEADLINE", "0"))
+    return {
+        'contexts': [c.strip() for c in os.getenv("HELM_FLEET_CONTEXTS", "").split(',') if c.strip()],
+        'workers': int(os.getenv("HELM_FLEET_WORKERS", "8")),
+        'deadline': deadline or None,
+        'report_dir': os.getenv("HELM_FLEET_REPORT_DIR", "fleet_reports"),
+    }
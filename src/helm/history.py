@@ -0,0 +1,377 @@
+"""On-disk history of runs in SQLite: log counts, patterns, events and findings, for trend queries."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from helm.classifier import SEVERITY_RANK
+from helm.collector import ClusterScan
+from helm.inventory import workload_of
+from helm.kube import format_table, parse_duration
+from helm.packer import Item
+from helm.state import state_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, cluster TEXT NOT NULL, focus TEXT, since TEXT,
+    incremental INTEGER, pods INTEGER, unhealthy INTEGER, lines INTEGER, errors INTEGER, warnings INTEGER);
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (cluster, ts);
+CREATE TABLE IF NOT EXISTS log_counts (
+    run_id INTEGER, ts REAL, cluster TEXT, namespace TEXT, workload TEXT, pod TEXT, container TEXT,
+    lines INTEGER, errors INTEGER, warnings INTEGER, categories TEXT);
+CREATE INDEX IF NOT EXISTS log_counts_by_scope ON log_counts (cluster, namespace, workload, ts);
+CREATE INDEX IF NOT EXISTS log_counts_by_time ON log_counts (ts);
+CREATE TABLE IF NOT EXISTS hourly (
+    cluster TEXT, namespace TEXT, workload TEXT, hour INTEGER, lines INTEGER, errors INTEGER, warnings INTEGER,
+    PRIMARY KEY (cluster, hour, namespace, workload)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS patterns (
+    cluster TEXT, namespace TEXT, pattern TEXT, template TEXT, severity TEXT, rank INTEGER, categories TEXT,
+    first_seen REAL, last_seen REAL, runs INTEGER, lines INTEGER,
+    PRIMARY KEY (cluster, namespace, pattern)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS patterns_by_first_seen ON patterns (cluster, first_seen);
+CREATE TABLE IF NOT EXISTS pattern_hits (run_id INTEGER, ts REAL, cluster TEXT, namespace TEXT, pattern TEXT,
+                                         lines INTEGER);
+CREATE INDEX IF NOT EXISTS pattern_hits_by_pattern ON pattern_hits (cluster, pattern, ts);
+CREATE INDEX IF NOT EXISTS pattern_hits_by_time ON pattern_hits (ts);
+CREATE TABLE IF NOT EXISTS events (
+    cluster TEXT, namespace TEXT, object TEXT, reason TEXT, type TEXT, message TEXT,
+    first_seen TEXT, last_seen TEXT, count INTEGER,
+    PRIMARY KEY (cluster, namespace, object, reason)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_by_time ON events (cluster, last_seen);
+CREATE TABLE IF NOT EXISTS findings (id INTEGER PRIMARY KEY, run_id INTEGER, ts REAL, cluster TEXT, task TEXT,
+                                     text TEXT);
+CREATE INDEX IF NOT EXISTS findings_by_time ON findings (cluster, ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS findings_fts USING fts5(text, content='findings', content_rowid='id');
+"""
+
+
+def pattern_key(template: str) -> str:
+    return hashlib.sha1(template.encode()).hexdigest()[:16]
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class HistoryStore:
+    """
+    What each run saw, kept between runs. Incremental runs read every log line
+    once, so their per-container counts add up over time: they are kept per
+    run for ``raw_retention`` and rolled up per hour for ``retention``.
+    Patterns and event objects are running aggregates (first and last seen,
+    totals) and findings are full-text indexed. Runs that re-read a window
+    (investigations) only add their findings, so nothing is counted twice.
+    """
+
+    def __init__(self, path: Optional[str] = None, retention: Optional[str] = None,
+                 raw_retention: Optional[str] = None):
+        self.path = path or state_path("history.db")
+        self.retention = parse_duration(retention or os.getenv("HELM_HISTORY_RETENTION", "90d"))
+        self.raw_retention = parse_duration(raw_retention or os.getenv("HELM_HISTORY_RAW_RETENTION", "7d"))
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock:
+            # auto_vacuum only takes effect before the first table is created
+            self.db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def record_scan(self, scan: ClusterScan, focus: str = "", incremental: bool = True,
+                    ts: Optional[float] = None) -> int:
+        """Store a scan; returns the run id for :meth:`record_findings`"""
+        ts = ts or time.time()
+        cluster, logs = scan.cluster, scan.collection.logs
+        counts = [(log, workload_of(log.pod), log.digest.counts['error'], log.digest.counts['warning'])
+                  for log in logs]
+        pods = sum(len(scan.inventory.pods_in(ns)) for ns in scan.namespaces)
+        with self._lock, self.db:
+            run_id = self.db.execute(
+                "INSERT INTO runs (ts, cluster, focus, since, incremental, pods, unhealthy, lines, errors, warnings) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, cluster, focus, scan.since, int(incremental), pods,
+                 len(scan.inventory.unhealthy(scan.namespaces)), sum(log.digest.lines for log in logs),
+                 sum(c[2] for c in counts), sum(c[3] for c in counts))).lastrowid
+            self.db.executemany(
+                "INSERT INTO events (cluster, namespace, object, reason, type, message, first_seen, last_seen, count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (cluster, namespace, object, reason) DO UPDATE SET "
+                "count = max(count, excluded.count), last_seen = max(last_seen, excluded.last_seen), "
+                "message = excluded.message",
+                [(cluster, r.namespace, r.object, r.reason, r.type, r.message, r.first_seen, r.last_seen, r.count)
+                 for r in scan.events])
+            if not incremental:
+                return run_id
+
+            self.db.executemany(
+                "INSERT INTO log_counts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, ts, cluster, log.namespace, workload, log.pod, log.container, log.digest.lines,
+                  errors, warnings, json.dumps(dict(log.digest.categories)))
+                 for log, workload, errors, warnings in counts if log.digest.lines])
+            hourly = defaultdict(lambda: [0, 0, 0])
+            for log, workload, errors, warnings in counts:
+                totals = hourly[(log.namespace, workload)]
+                totals[0] += log.digest.lines
+                totals[1] += errors
+                totals[2] += warnings
+            self.db.executemany(
+                "INSERT INTO hourly VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (cluster, hour, namespace, workload) DO UPDATE SET "
+                "lines = lines + excluded.lines, errors = errors + excluded.errors, "
+                "warnings = warnings + excluded.warnings",
+                [(cluster, ns, workload, int(ts // 3600), *totals)
+                 for (ns, workload), totals in hourly.items() if totals[0]])
+
+            templates = scan.collection.templates.templates if scan.collection.templates else []
+            rows = [(cluster, ns, pattern_key(t.template), t.template, t.severity,
+                     SEVERITY_RANK.get(t.severity, 0), ','.join(sorted(t.categories)), ts, ts, lines)
+                    for t in templates for ns, lines in t.namespaces.items()]
+            self.db.executemany(
+                "INSERT INTO patterns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT (cluster, namespace, pattern) DO UPDATE SET "
+                "last_seen = excluded.last_seen, runs = runs + 1, lines = lines + excluded.lines, "
+                "severity = CASE WHEN excluded.rank > rank THEN excluded.severity ELSE severity END, "
+                "rank = max(rank, excluded.rank)",
+                rows)
+            self.db.executemany("INSERT INTO pattern_hits VALUES (?, ?, ?, ?, ?, ?)",
+                                [(run_id, ts, cluster, row[1], row[2], row[-1]) for row in rows])
+        return run_id
+
+    def record_findings(self, run_id: int, cluster: str, outputs: Dict[str, str], ts: Optional[float] = None):
+        """Store what each task concluded, searchable with :meth:`search`"""
+        ts = ts or time.time()
+        with self._lock, self.db:
+            for task, text in outputs.items():
+                if not text:
+                    continue
+                rowid = self.db.execute("INSERT INTO findings (run_id, ts, cluster, task, text) VALUES (?, ?, ?, ?, ?)",
+                                        (run_id, ts, cluster, task, text)).lastrowid
+                self.db.execute("INSERT INTO findings_fts (rowid, text) VALUES (?, ?)", (rowid, text))
+
+    def _scope(self, namespaces: Optional[List[str]], workload: Optional[str]) -> Tuple[str, List]:
+        sql, params = "", []
+        if namespaces:
+            sql += f" AND namespace IN ({','.join('?' * len(namespaces))})"
+            params += list(namespaces)
+        if workload:
+            sql += " AND workload = ?"
+            params.append(workload)
+        return sql, params
+
+    def trend(self, cluster: str, since: float, until: Optional[float] = None,
+              namespaces: Optional[List[str]] = None, workload: Optional[str] = None,
+              bucket: int = 86400) -> List[Tuple[int, str, str, int, int, int]]:
+        """(bucket start, namespace, workload, lines, errors, warnings) from the hourly rollup, oldest first"""
+        scope, params = self._scope(namespaces, workload)
+        until = until or time.time()
+        with self._lock:
+            return self.db.execute(
+                f"SELECT (hour * 3600 / ?) * ? AS start, namespace, workload, "
+                f"sum(lines), sum(errors), sum(warnings) FROM hourly "
+                f"WHERE cluster = ? AND hour >= ? AND hour <= ?{scope} "
+                f"GROUP BY start, namespace, workload ORDER BY start, namespace, workload",
+                [bucket, bucket, cluster, int(since // 3600), int(until // 3600)] + params).fetchall()
+
+    def changes(self, cluster: str, window: float = 86400, now: Optional[float] = None,
+                namespaces: Optional[List[str]] = None, limit: int = 20) -> List[Tuple[str, str, int, int]]:
+        """(namespace, workload, errors in the last window, errors in the window before), biggest rise first; limit -1 for all"""
+        now = now or time.time()
+        scope, params = self._scope(namespaces, None)
+        split, start, end = int((now - window) // 3600), int((now - 2 * window) // 3600), int(now // 3600)
+        with self._lock:
+            return self.db.execute(
+                f"SELECT namespace, workload, sum(CASE WHEN hour > ? THEN errors ELSE 0 END) AS recent, "
+                f"sum(CASE WHEN hour <= ? THEN errors ELSE 0 END) AS before FROM hourly "
+                f"WHERE cluster = ? AND hour > ? AND hour <= ?{scope} GROUP BY namespace, workload "
+                f"HAVING recent > 0 OR before > 0 ORDER BY recent - before DESC LIMIT ?",
+                [split, split, cluster, start, end] + params + [limit]).fetchall()
+
+    def patterns(self, cluster: str, first_seen_after: Optional[float] = None, seen_after: Optional[float] = None,
+                 namespaces: Optional[List[str]] = None, min_severity: str = 'warning',
+                 limit: int = 20) -> List[Tuple[str, str, str, float, float, int, int]]:
+        """(namespace, template, severity, first seen, last seen, runs, lines), most severe and frequent first"""
+        scope, params = self._scope(namespaces, None)
+        if first_seen_after is not None:
+            scope += " AND first_seen > ?"
+            params.append(first_seen_after)
+        if seen_after is not None:
+            scope += " AND last_seen > ?"
+            params.append(seen_after)
+        with self._lock:
+            return self.db.execute(
+                f"SELECT namespace, template, severity, first_seen, last_seen, runs, lines FROM patterns "
+                f"WHERE cluster = ? AND rank >= ?{scope} ORDER BY rank DESC, lines DESC LIMIT ?",
+                [cluster, SEVERITY_RANK.get(min_severity, 0)] + params + [limit]).fetchall()
+
+    def known_patterns(self, cluster: str) -> set:
+        with self._lock:
+            return {row[0] for row in self.db.execute("SELECT DISTINCT pattern FROM patterns WHERE cluster = ?",
+                                                       (cluster,))}
+
+    def search(self, query: str, cluster: Optional[str] = None, since: Optional[float] = None,
+               limit: int = 5) -> List[Tuple[float, str, str]]:
+        """(time, task, snippet) of past findings matching ``query``, best match first"""
+        phrase = '"' + query.replace('"', '""') + '"'
+        sql = ("SELECT f.ts, f.task, snippet(findings_fts, 0, '[', ']', '…', 24) FROM findings_fts "
+               "JOIN findings f ON f.id = findings_fts.rowid WHERE findings_fts MATCH ?")
+        params: List = [phrase]
+        if cluster:
+            sql += " AND f.cluster = ?"
+            params.append(cluster)
+        if since:
+            sql += " AND f.ts >= ?"
+            params.append(since)
+        with self._lock:
+            return self.db.execute(sql + " ORDER BY rank LIMIT ?", params + [limit]).fetchall()
+
+    def last_finding(self, cluster: str, task: str = 'log_analysis_task') -> Optional[Tuple[float, str]]:
+        with self._lock:
+            return self.db.execute("SELECT ts, text FROM findings WHERE cluster = ? AND task = ? "
+                                   "ORDER BY ts DESC LIMIT 1", (cluster, task)).fetchone()
+
+    def compact(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Drop per-run detail past raw_retention and everything past retention; rows deleted per table"""
+        now = now or time.time()
+        raw_cutoff, cutoff = now - self.raw_retention, now - self.retention
+        deleted = {}
+        with self._lock, self.db:
+            for table, sql, value in [
+                ('log_counts', "DELETE FROM log_counts WHERE ts < ?", raw_cutoff),
+                ('pattern_hits', "DELETE FROM pattern_hits WHERE ts < ?", raw_cutoff),
+                ('hourly', "DELETE FROM hourly WHERE hour < ?", int(cutoff // 3600)),
+                ('runs', "DELETE FROM runs WHERE ts < ?", cutoff),
+                ('patterns', "DELETE FROM patterns WHERE last_seen < ?", cutoff),
+                ('events', "DELETE FROM events WHERE last_seen < ?", _iso(cutoff)),
+                ('findings', "DELETE FROM findings WHERE ts < ?", cutoff),
+            ]:
+                deleted[table] = self.db.execute(sql, (value,)).rowcount
+            if deleted['findings']:
+                self.db.execute("INSERT INTO findings_fts (findings_fts) VALUES ('rebuild')")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('compacted', ?)", (str(now),))
+        with self._lock:
+            self.db.execute("PRAGMA incremental_vacuum")
+        return deleted
+
+    def maybe_compact(self, every: float = 86400) -> Optional[Dict[str, int]]:
+        with self._lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'compacted'").fetchone()
+        if row and time.time() - float(row[0]) < every:
+            return None
+        return self.compact()
+
+    def history_items(self, scan: ClusterScan, window: Optional[str] = None,
+                      now: Optional[float] = None) -> List[Item]:
+        """
+        Evidence items for the analysis: errors per day per workload over
+        ``window`` (default $HELM_HISTORY_WINDOW), the workloads whose errors
+        rose most, patterns in this scan that no earlier run saw, and the
+        previous run's analysis.
+        """
+        now = now or time.time()
+        window = window or os.getenv("HELM_HISTORY_WINDOW", "7d")
+        span = parse_duration(window)
+        cluster, namespaces = scan.cluster, None if scan.all_namespaces else scan.namespaces
+        items = []
+
+        rows = self.trend(cluster, now - span, now, namespaces)
+        if rows:
+            days = sorted({start for start, *_ in rows})
+            per_workload = defaultdict(dict)
+            for start, ns, workload, lines, errors, warnings in rows:
+                per_workload[(ns, workload)][start] = errors
+            section = f"=== HISTORY: ERRORS PER DAY, LAST {window} ==="
+            items.append(Item("days: " + ' '.join(_iso(d)[5:10] for d in days), section, pinned=True))
+            rising = {(ns, w): (recent, before)
+                      for ns, w, recent, before in self.changes(cluster, 86400, now, namespaces, limit=-1)}
+            for (ns, workload), by_day in sorted(per_workload.items()):
+                if not any(by_day.values()):
+                    continue
+                recent, before = rising.get((ns, workload), (0, 0))
+                text = (f"{ns}/{workload}: {' '.join(str(by_day.get(d, 0)) for d in days)} "
+                        f"(last 24h {recent}, 24h before {before})")
+                severity = 'warning' if recent > max(before * 1.5, before + 10) else 'info'
+                items.append(Item(text, section, SEVERITY_RANK[severity]))
+
+        if scan.collection.templates is not None:
+            known = self.known_patterns(cluster)
+            if known:
+                new = [t for t in scan.collection.templates.ranked()
+                       if pattern_key(t.template) not in known and SEVERITY_RANK.get(t.severity, 0) >= SEVERITY_RANK['warning']]
+                section = f"=== HISTORY: {len(new)} PATTERNS NOT SEEN IN EARLIER RUNS ==="
+                for t in new:
+                    items.append(Item(f"[{t.severity.upper()}] x{t.count} {t.template}", section,
+                                      SEVERITY_RANK[t.severity] if t.severity in SEVERITY_RANK else 0))
+
+        last = self.last_finding(cluster)
+        if last:
+            ts, text = last
+            items.append(Item(text.strip()[:1500], f"=== HISTORY: PREVIOUS ANALYSIS ({_iso(ts)}) ===",
+                              SEVERITY_RANK['info']))
+        return items
+
+    def report(self, cluster: str, since: str = "7d", namespaces: Optional[List[str]] = None,
+               workload: Optional[str] = None, search: Optional[str] = None) -> str:
+        """Plain-text answer to a trend question, for the CLI and the analyzer's history tool"""
+        now, span = time.time(), parse_duration(since)
+        start = now - span
+        # Keep the table a handful of columns wide
+        bucket = 3600 if span <= 12 * 3600 else 6 * 3600 if span <= 3 * 86400 else 86400
+        parts = []
+        rows = self.trend(cluster, start, now, namespaces, workload, bucket)
+        if rows:
+            stamps = sorted({r[0] for r in rows})
+            cells = defaultdict(dict)
+            for when, ns, wl, lines, errors, warnings in rows:
+                cells[(ns, wl)][when] = f"{errors}/{warnings}"
+            label = {3600: lambda t: _iso(t)[11:16], 6 * 3600: lambda t: f"{_iso(t)[5:10]} {_iso(t)[11:13]}h",
+                     86400: lambda t: _iso(t)[5:10]}[bucket]
+            unit = {3600: "hour", 6 * 3600: "6 hours", 86400: "day"}[bucket]
+            parts.append(f"Errors/warnings per {unit} (last {since}):\n" + format_table(
+                ['NAMESPACE', 'WORKLOAD'] + [label(t) for t in stamps],
+                [[ns, wl] + [by.get(t, '-') for t in stamps] for (ns, wl), by in sorted(cells.items())]))
+        new = self.patterns(cluster, first_seen_after=start, namespaces=namespaces)
+        if new:
+            parts.append(f"Patterns first seen in the last {since}:\n" + format_table(
+                ['NAMESPACE', 'SEVERITY', 'FIRST SEEN', 'RUNS', 'LINES', 'TEMPLATE'],
+                [[ns, sev, _iso(first), str(runs), str(lines), tpl[:120]]
+                 for ns, tpl, sev, first, last, runs, lines in new]))
+        if search:
+            hits = self.search(search, cluster, start)
+            parts.append(f"Past findings matching '{search}':\n" + ('\n'.join(
+                f"- {_iso(ts)} {task}: {snippet}" for ts, task, snippet in hits) or "none"))
+        return '\n'.join(parts) or f"No history recorded for {cluster} in the last {since}"
+
+
+_stores: Dict[str, HistoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_history() -> HistoryStore:
+    """The shared store of this process (one SQLite connection, serialised)"""
+    path = state_path("history.db")
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = HistoryStore(path)
+        return _stores[path]
+
+
+def history_enabled() -> bool:
+    return os.getenv("HELM_HISTORY", "1") != "0"
+
+
+def record_run(scan: ClusterScan, outputs: Dict[str, str], focus: str = "", incremental: bool = True) -> int:
+    """Store a finished analysis: the scan it saw and what each task concluded"""
+    store = get_history()
+    run_id = store.record_scan(scan, focus, incremental)
+    store.record_findings(run_id, scan.cluster, outputs)
+    store.maybe_compact()
+    return run_id
@@ -0,0 +1,238 @@
+"""In-memory pod inventory built from a single cluster-wide pod listing."""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from helm.kube import parse_quantity
+
+# How much each kind of trouble pushes a pod up the log fetch queue
+WAITING_REASON_SCORES = {
+    'CrashLoopBackOff': 100,
+    'CreateContainerConfigError': 70,
+    'CreateContainerError': 70,
+    'RunContainerError': 70,
+    'ErrImagePull': 40,
+    'ImagePullBackOff': 40,
+    'ContainerCreating': 10,
+}
+TERMINATED_REASON_SCORES = {
+    'OOMKilled': 80,
+    'Error': 50,
+    'ContainerCannotRun': 50,
+    'DeadlineExceeded': 40,
+}
+PHASE_SCORES = {'Failed': 90, 'Unknown': 60, 'Pending': 30}
+
+# Generated pod name suffixes (Kubernetes uses consonants and digits 2-9 for them)
+_SUFFIX = r'[bcdfghjklmnpqrstvwxz2-9]'
+_WORKLOAD_RES = [
+    re.compile(rf'^(.+)-{_SUFFIX}{{6,10}}-{_SUFFIX}{{5}}$'),  # Deployment: <name>-<replicaset hash>-<id>
+    re.compile(rf'^(.+)-{_SUFFIX}{{5}}$'),                    # DaemonSet, Job: <name>-<id>
+    re.compile(r'^(.+)-\d+$'),                                # StatefulSet: <name>-<ordinal>
+]
+
+
+def workload_of(pod: str) -> str:
+    """Best guess of the controller a pod belongs to, from its generated name"""
+    for pattern in _WORKLOAD_RES:
+        match = pattern.match(pod)
+        if match:
+            return match.group(1)
+    return pod
+
+
+@dataclass
+class ContainerStatus:
+    name: str
+    ready: bool = False
+    restart_count: int = 0
+    state: str = "unknown"
+    waiting_reason: Optional[str] = None
+    terminated_reason: Optional[str] = None
+    last_terminated_reason: Optional[str] = None
+    last_exit_code: Optional[int] = None
+    last_finished_at: Optional[str] = None
+    container_id: Optional[str] = None
+    last_container_id: Optional[str] = None
+    # From the pod spec: cores and bytes, None when not set
+    cpu_request: Optional[float] = None
+    cpu_limit: Optional[float] = None
+    memory_request: Optional[float] = None
+    memory_limit: Optional[float] = None
+
+    @classmethod
+    def from_status(cls, status: Dict) -> "ContainerStatus":
+        state = status.get('state') or {}
+        last = (status.get('lastState') or {}).get('terminated') or {}
+        container = cls(status.get('name', ''), ready=bool(status.get('ready')),
+                        restart_count=int(status.get('restartCount') or 0))
+        if 'waiting' in state:
+            container.state = 'waiting'
+            container.waiting_reason = state['waiting'].get('reason')
+        elif 'terminated' in state:
+            container.state = 'terminated'
+            container.terminated_reason = state['terminated'].get('reason')
+        elif 'running' in state:
+            container.state = 'running'
+        container.last_terminated_reason = last.get('reason')
+        container.last_exit_code = last.get('exitCode')
+        container.last_finished_at = last.get('finishedAt')
+        container.container_id = status.get('containerID')
+        container.last_container_id = last.get('containerID')
+        return container
+
+    @property
+    def score(self) -> int:
+        score = WAITING_REASON_SCORES.get(self.waiting_reason, 20 if self.waiting_reason else 0)
+        score = max(score, TERMINATED_REASON_SCORES.get(self.terminated_reason, 0))
+        score += TERMINATED_REASON_SCORES.get(self.last_terminated_reason, 0) // 2
+        score += min(self.restart_count, 20) * 2
+        if not self.ready and self.state == 'running':
+            score += 15
+        return score
+
+
+@dataclass
+class PodInfo:
+    namespace: str
+    name: str
+    phase: str = "Unknown"
+    node: Optional[str] = None
+    reason: Optional[str] = None
+    created: Optional[str] = None
+    containers: List[ContainerStatus] = field(default_factory=list)
+
+    @classmethod
+    def from_item(cls, item: Dict) -> "PodInfo":
+        meta, spec, status = item.get('metadata', {}), item.get('spec', {}), item.get('status', {})
+        pod = cls(meta.get('namespace', ''), meta.get('name', ''), phase=status.get('phase', 'Unknown'),
+                  node=spec.get('nodeName'), reason=status.get('reason'),
+                  created=meta.get('creationTimestamp'))
+        statuses = {s.get('name'): s for s in status.get('containerStatuses') or []}
+        # Containers that have not reported a status yet still need to be listed
+        names = [c.get('name') for c in spec.get('containers') or []] or list(statuses)
+        pod.containers = [ContainerStatus.from_status(statuses.get(name, {'name': name})) for name in names]
+        resources = {c.get('name'): c.get('resources') or {} for c in spec.get('containers') or []}
+        for container in pod.containers:
+            requests = resources.get(container.name, {}).get('requests') or {}
+            limits = resources.get(container.name, {}).get('limits') or {}
+            container.cpu_request = parse_quantity(requests.get('cpu'))
+            container.cpu_limit = parse_quantity(limits.get('cpu'))
+            container.memory_request = parse_quantity(requests.get('memory'))
+            container.memory_limit = parse_quantity(limits.get('memory'))
+        return pod
+
+    @property
+    def restarts(self) -> int:
+        return sum(c.restart_count for c in self.containers)
+
+    @property
+    def score(self) -> int:
+        container_score = max((c.score for c in self.containers), default=0)
+        return PHASE_SCORES.get(self.phase, 0) + container_score
+
+    @property
+    def healthy(self) -> bool:
+        return self.score == 0
+
+    @property
+    def worst_container(self) -> Optional[ContainerStatus]:
+        return max(self.containers, key=lambda c: c.score, default=None)
+
+    def problems(self) -> List[str]:
+        """Short human readable reasons this pod is ranked where it is"""
+        problems = []
+        if self.phase in PHASE_SCORES:
+            problems.append(f"phase={self.phase}" + (f" ({self.reason})" if self.reason else ""))
+        for c in self.containers:
+            if c.waiting_reason:
+                problems.append(f"{c.name}: {c.waiting_reason}")
+            if c.terminated_reason:
+                problems.append(f"{c.name}: terminated {c.terminated_reason}")
+            if c.last_terminated_reason:
+                problems.append(f"{c.name}: last exit {c.last_terminated_reason} ({c.last_exit_code})")
+            if c.restart_count:
+                problems.append(f"{c.name}: {c.restart_count} restarts")
+        return problems
+
+
+@dataclass
+class LogTarget:
+    """One log fetch chosen from the inventory"""
+    namespace: str
+    pod: str
+    container: Optional[str] = None
+    previous: bool = False
+    score: int = 0
+    restart_count: int = 0
+    container_id: Optional[str] = None
+
+    @classmethod
+    def for_container(cls, pod: "PodInfo", container: Optional[ContainerStatus],
+                      previous: bool = False) -> "LogTarget":
+        if container is None:
+            return cls(pod.namespace, pod.name, score=pod.score)
+        # The previous instance is the one before the latest restart
+        restart_count = container.restart_count - 1 if previous else container.restart_count
+        container_id = container.last_container_id if previous else container.container_id
+        return cls(pod.namespace, pod.name, container.name, previous, pod.score,
+                   max(restart_count, 0), container_id)
+
+
+class PodInventory:
+    """Index of every pod's phase, restarts, waiting reasons and last termination state"""
+
+    def __init__(self, pods: Iterable[PodInfo]):
+        self.pods: List[PodInfo] = list(pods)
+        self.by_namespace: Dict[str, List[PodInfo]] = {}
+        for pod in self.pods:
+            self.by_namespace.setdefault(pod.namespace, []).append(pod)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict]) -> "PodInventory":
+        return cls(PodInfo.from_item(item) for item in items)
+
+    def namespaces(self) -> List[str]:
+        return list(self.by_namespace)
+
+    def pods_in(self, namespace: str) -> List[PodInfo]:
+        return self.by_namespace.get(namespace, [])
+
+    def unhealthy(self, namespaces: Optional[List[str]] = None) -> List[PodInfo]:
+        return [pod for pod in self.ranked(namespaces) if not pod.healthy]
+
+    def ranked(self, namespaces: Optional[List[str]] = None) -> List[PodInfo]:
+        """Pods ordered from most to least worrying, optionally limited to some namespaces"""
+        pods = self.pods if namespaces is None else [p for ns in namespaces for p in self.pods_in(ns)]
+        order = {ns: i for i, ns in enumerate(namespaces or self.namespaces())}
+        return sorted(pods, key=lambda p: (-p.score, order.get(p.namespace, len(order)), p.name))
+
+    def select_targets(self, budget: int, namespaces: Optional[List[str]] = None) -> List[LogTarget]:
+        """
+        Spend a fixed log fetch budget: unhealthy pods first (worst first), then
+        healthy pods round-robin across namespaces so every namespace gets a sample.
+        """
+        ranked = self.ranked(namespaces)
+        targets = []
+        for pod in ranked:
+            if pod.healthy or len(targets) >= budget:
+                break
+            container = pod.worst_container
+            # A crash-looping container's useful output is in the previous instance
+            previous = bool(container and container.restart_count and container.state == 'waiting')
+            targets.append(LogTarget.for_container(pod, container, previous))
+
+        healthy_by_ns: Dict[str, List[PodInfo]] = {}
+        for pod in ranked:
+            if pod.healthy:
+                healthy_by_ns.setdefault(pod.namespace, []).append(pod)
+        queues = list(healthy_by_ns.values())
+        while queues and len(targets) < budget:
+            for queue in list(queues):
+                if len(targets) >= budget:
+                    break
+                pod = queue.pop(0)
+                targets.append(LogTarget.for_container(pod, pod.containers[0] if pod.containers else None))
+                if not queue:
+                    queues.remove(queue)
+        return targets
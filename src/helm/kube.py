@@ -0,0 +1,622 @@
+"""Kubernetes access backends: kubectl subprocesses or direct API calls."""
+import atexit
+import base64
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+import yaml
+
+from helm import tracing
+
+# Resource usage served by metrics-server (what ``kubectl top`` reads)
+METRICS_PATH = "/apis/metrics.k8s.io/v1beta1"
+# Seconds before an exec credential plugin's token expires that it is renewed
+TOKEN_REFRESH_MARGIN = 60
+
+
+class KubeError(RuntimeError):
+    """A Kubernetes call failed"""
+
+
+class KubeTimeout(KubeError):
+    """A Kubernetes call did not finish within its timeout"""
+
+
+_DURATION_RE = re.compile(r'(\d+)([smhd])')
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Names in API paths, replaced so spans of the same kind of request share a name
+_PATH_NAMES_RE = re.compile(r'/(namespaces|pods|nodes)/[^/?]+')
+
+
+def _span_name(path: str) -> str:
+    """A request's span name, e.g. ``GET /api/v1/namespaces/{namespace}/pods/{pod}/log``"""
+    return "GET " + _PATH_NAMES_RE.sub(lambda m: f"/{m.group(1)}/{{{m.group(1)[:-1]}}}", path)
+
+
+def parse_duration(value: str) -> int:
+    """Convert a kubectl style duration such as ``1h30m`` into seconds"""
+    parts = _DURATION_RE.findall(value.strip())
+    if not parts or ''.join(n + u for n, u in parts) != value.strip():
+        raise ValueError(f"Invalid duration: {value}")
+    return sum(int(n) * _DURATION_UNITS[u] for n, u in parts)
+
+
+_QUANTITY_RE = re.compile(r'^([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(Ki|Mi|Gi|Ti|Pi|Ei|[numkMGTPE]?)$')
+_QUANTITY_UNITS = {'n': 1e-9, 'u': 1e-6, 'm': 1e-3, '': 1, 'k': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15,
+                   'E': 1e18, 'Ki': 2 ** 10, 'Mi': 2 ** 20, 'Gi': 2 ** 30, 'Ti': 2 ** 40, 'Pi': 2 ** 50, 'Ei': 2 ** 60}
+
+
+def parse_quantity(value) -> Optional[float]:
+    """A Kubernetes resource quantity (``250m``, ``1.5``, ``512Mi``, ``12345n``) as a plain number, or None"""
+    if value is None:
+        return None
+    match = _QUANTITY_RE.match(str(value).strip())
+    if not match:
+        return None
+    return float(match.group(1)) * _QUANTITY_UNITS[match.group(2)]
+
+
+def _watch_params(resource_version: str, seconds: int) -> Dict:
+    return {'watch': '1', 'resourceVersion': resource_version, 'allowWatchBookmarks': 'true',
+            'timeoutSeconds': max(1, int(seconds))}
+
+
+def format_table(headers: List[str], rows: List[List[str]]) -> str:
+    """Render rows the way ``kubectl get`` prints them"""
+    widths = [max([len(h)] + [len(str(r[i])) for r in rows]) for i, h in enumerate(headers)]
+    lines = ['   '.join(str(v).ljust(w) for v, w in zip(row, widths)).rstrip()
+             for row in [headers] + rows]
+    return '\n'.join(lines) + '\n'
+
+
+class KubectlBackend:
+    """Runs one kubectl process per call"""
+
+    name = "kubectl"
+
+    def __init__(self, context: Optional[str] = None):
+        self.context = context
+        self.calls = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._cluster_id = context
+
+    def _run(self, args: List[str], timeout: float) -> str:
+        cmd = [os.getenv("KUBECTL", "kubectl")]
+        if self.context:
+            cmd += ["--context", self.context]
+        with self._lock:
+            self.calls += 1
+        with tracing.span(f"kubectl {args[0]}", "kube", command=' '.join(args)[:200]) as span:
+            try:
+                result = subprocess.run(cmd + args, capture_output=True, text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                raise KubeTimeout(f"kubectl {' '.join(args)} timed out after {timeout:.0f}s")
+            if result.returncode != 0:
+                raise KubeError(result.stderr.strip() or f"kubectl {' '.join(args)} failed")
+            span.set(bytes=len(result.stdout))
+        with self._lock:
+            self.bytes_received += len(result.stdout)
+        return result.stdout
+
+    @property
+    def cluster_id(self) -> str:
+        """Name of the context this backend talks to, used to key persisted state"""
+        if self._cluster_id is None:
+            try:
+                self._cluster_id = self._run(["config", "current-context"], 10).strip() or "default"
+            except KubeError:
+                self._cluster_id = "default"
+        return self._cluster_id
+
+    def list_namespaces(self, timeout: float = 30) -> List[str]:
+        output = self._run(["get", "namespaces", "-o", "name"], timeout)
+        return [ns.replace('namespace/', '') for ns in output.strip().split('\n') if ns.strip()]
+
+    def list_pods(self, namespace: str, timeout: float = 20) -> List[str]:
+        output = self._run(["get", "pods", "-n", namespace, "-o", "name"], timeout)
+        return [p.strip().replace('pod/', '') for p in output.strip().split('\n') if p.strip()]
+
+    def list_all_pods(self, timeout: float = 60) -> List[Dict]:
+        """Full pod objects for the whole cluster in one call (kubectl chunks the listing itself)"""
+        output = self._run(["get", "pods", "--all-namespaces", "-o", "json"], timeout)
+        return json.loads(output).get('items', [])
+
+    def pod_logs(self, namespace: str, pod: str, since: str = "1h", tail: int = 20,
+                 timeout: float = 10, container: Optional[str] = None, previous: bool = False,
+                 since_time: Optional[str] = None, timestamps: bool = False) -> str:
+        args = ["logs", pod, "-n", namespace, f"--tail={tail}"]
+        args.append(f"--since-time={since_time}" if since_time else f"--since={since}")
+        if timestamps:
+            args.append("--timestamps")
+        if container:
+            args += ["-c", container]
+        if previous:
+            args.append("--previous")
+        return self._run(args, timeout)
+
+    def stream_logs(self, namespace: str, pod: str, since: str = "1h", tail: Optional[int] = None,
+                    timeout: float = 10, container: Optional[str] = None, previous: bool = False,
+                    since_time: Optional[str] = None, timestamps: bool = False) -> Iterator[str]:
+        """Yield log lines as kubectl prints them instead of buffering the whole output"""
+        args = ["logs", pod, "-n", namespace]
+        args.append(f"--since-time={since_time}" if since_time else f"--since={since}")
+        if tail:
+            args.append(f"--tail={tail}")
+        if timestamps:
+            args.append("--timestamps")
+        if container:
+            args += ["-c", container]
+        if previous:
+            args.append("--previous")
+        return self._stream(args, timeout)
+
+    def _stream(self, args: List[str], timeout: float) -> Iterator[str]:
+        cmd = [os.getenv("KUBECTL", "kubectl")]
+        if self.context:
+            cmd += ["--context", self.context]
+        with self._lock:
+            self.calls += 1
+        received = 0
+        # Not the current span: the lines are consumed, and other spans opened, between yields
+        span = tracing.start_span(f"kubectl {args[0]}", "kube", command=' '.join(args)[:200], streamed=True)
+        # stderr goes to a file so a chatty stderr can never block the stdout pipe
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(cmd + args, stdout=subprocess.PIPE, stderr=stderr,
+                                    text=True, errors="replace")
+            timed_out = threading.Event()
+
+            def kill():
+                timed_out.set()
+                proc.kill()
+
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+            try:
+                for line in proc.stdout:
+                    received += len(line)
+                    yield line
+                proc.wait()
+            finally:
+                timer.cancel()
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                proc.stdout.close()
+                with self._lock:
+                    self.bytes_received += received
+                span.set(bytes=received)
+                span.finish(None if proc.returncode == 0 else f"exit status {proc.returncode}")
+            if proc.returncode != 0:
+                if timed_out.is_set():
+                    raise KubeTimeout(f"kubectl {' '.join(args)} timed out after {timeout:.0f}s")
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                raise KubeError(message or f"kubectl {' '.join(args)} failed")
+
+    def cluster_info(self, timeout: float = 15) -> str:
+        return self._run(["cluster-info"], timeout)
+
+    def nodes_table(self, timeout: float = 15) -> str:
+        return self._run(["get", "nodes", "-o", "wide"], timeout)
+
+    def namespaces_table(self, timeout: float = 15) -> str:
+        return self._run(["get", "namespaces"], timeout)
+
+    def events_table(self, timeout: float = 15) -> str:
+        return self._run(["get", "events", "--all-namespaces", "--sort-by=.lastTimestamp"], timeout)
+
+    def list_events(self, timeout: float = 30) -> Tuple[List[Dict], Optional[str]]:
+        """Every event in the cluster and the resourceVersion to watch from"""
+        listing = json.loads(self._run(["get", "--raw", "/api/v1/events"], timeout))
+        return listing.get('items', []), (listing.get('metadata') or {}).get('resourceVersion')
+
+    def list_nodes(self, timeout: float = 15) -> List[Dict]:
+        return json.loads(self._run(["get", "nodes", "-o", "json"], timeout)).get('items', [])
+
+    def pod_metrics(self, timeout: float = 15) -> List[Dict]:
+        """CPU and memory usage of every pod in the cluster, from one metrics API call"""
+        return json.loads(self._run(["get", "--raw", METRICS_PATH + "/pods"], timeout)).get('items', [])
+
+    def node_metrics(self, timeout: float = 15) -> List[Dict]:
+        return json.loads(self._run(["get", "--raw", METRICS_PATH + "/nodes"], timeout)).get('items', [])
+
+    def watch_events(self, resource_version: str, seconds: int = 1) -> Iterator[Dict]:
+        """Event changes after ``resource_version``; the server ends the watch after ``seconds``"""
+        path = "/api/v1/events?" + urlencode(_watch_params(resource_version, seconds))
+        for line in self._stream(["get", "--raw", path], timeout=seconds + 15):
+            if line.strip():
+                yield json.loads(line)
+
+    def close(self):
+        pass
+
+
+@dataclass
+class KubeConfig:
+    """The parts of a kubeconfig context needed to reach the API server"""
+    server: str
+    context: str = ""
+    namespace: str = "default"
+    ca_file: Optional[str] = None
+    verify: bool = True
+    cert_file: Optional[str] = None
+    key_file: Optional[str] = None
+    token: Optional[str] = None
+    username: Optional[str] = None
+    password: Optional[str] = None
+    exec_config: Optional[Dict] = None
+    temp_files: List[str] = field(default_factory=list)
+
+
+def _materialise(data: Optional[str], path: Optional[str], base_dir: str,
+                 temp_files: List[str]) -> Optional[str]:
+    """Return a file path for inline ``*-data`` fields or relative paths"""
+    if data:
+        handle = tempfile.NamedTemporaryFile(prefix="helm-kube-", delete=False)
+        handle.write(base64.b64decode(data))
+        handle.close()
+        temp_files.append(handle.name)
+        return handle.name
+    if path:
+        return path if os.path.isabs(path) else os.path.join(base_dir, path)
+    return None
+
+
+def _read_kubeconfig(path: Optional[str]) -> Tuple[str, Dict]:
+    path = path or os.getenv("KUBECONFIG", "").split(os.pathsep)[0] or os.path.expanduser("~/.kube/config")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return path, yaml.safe_load(f) or {}
+    except OSError as e:
+        raise KubeError(f"Cannot read kubeconfig {path}: {e}")
+
+
+def kubeconfig_contexts(path: Optional[str] = None) -> List[str]:
+    """Names of all contexts in the kubeconfig, in file order"""
+    path, raw = _read_kubeconfig(path)
+    return [entry['name'] for entry in raw.get('contexts') or [] if entry.get('name')]
+
+
+def load_kubeconfig(path: Optional[str] = None, context: Optional[str] = None) -> KubeConfig:
+    """Parse a kubeconfig file once and resolve the requested (or current) context"""
+    path, raw = _read_kubeconfig(path)
+
+    def named(section, name):
+        for entry in raw.get(section) or []:
+            if entry.get('name') == name:
+                return entry.get(section[:-1]) or {}
+        raise KubeError(f"{section[:-1]} '{name}' not found in {path}")
+
+    context_name = context or raw.get('current-context')
+    if not context_name:
+        raise KubeError(f"No current-context set in {path}")
+    ctx = named('contexts', context_name)
+    cluster = named('clusters', ctx.get('cluster'))
+    user = named('users', ctx.get('user')) if ctx.get('user') else {}
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    config = KubeConfig(server=cluster['server'].rstrip('/'), context=context_name,
+                        namespace=ctx.get('namespace', 'default'))
+    config.verify = not cluster.get('insecure-skip-tls-verify', False)
+    config.ca_file = _materialise(cluster.get('certificate-authority-data'),
+                                  cluster.get('certificate-authority'), base_dir, config.temp_files)
+    config.cert_file = _materialise(user.get('client-certificate-data'),
+                                    user.get('client-certificate'), base_dir, config.temp_files)
+    config.key_file = _materialise(user.get('client-key-data'),
+                                   user.get('client-key'), base_dir, config.temp_files)
+    config.token = user.get('token')
+    if user.get('tokenFile'):
+        with open(_materialise(None, user['tokenFile'], base_dir, config.temp_files)) as f:
+            config.token = f.read().strip()
+    config.username = user.get('username')
+    config.password = user.get('password')
+    config.exec_config = user.get('exec')
+    if user.get('auth-provider'):
+        raise KubeError(f"auth-provider credentials in context '{context_name}' are not supported")
+    return config
+
+
+def _exec_token(exec_config: Dict) -> Tuple[str, Optional[float]]:
+    """Run a client-go credential plugin; its bearer token and when the token expires (epoch seconds), if it says"""
+    env = dict(os.environ)
+    env.update({e['name']: e['value'] for e in exec_config.get('env') or []})
+    cmd = [exec_config['command']] + list(exec_config.get('args') or [])
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=60, env=env)
+    if result.returncode != 0:
+        raise KubeError(f"Credential plugin {cmd[0]} failed: {result.stderr.strip()}")
+    status = json.loads(result.stdout).get('status') or {}
+    if not status.get('token'):
+        raise KubeError(f"Credential plugin {cmd[0]} returned no token")
+    expires = None
+    if status.get('expirationTimestamp'):
+        expires = datetime.fromisoformat(status['expirationTimestamp'].replace('Z', '+00:00')).timestamp()
+    return status['token'], expires
+
+
+class ApiBackend:
+    """Talks to the API server over a pooled keep-alive HTTP session"""
+
+    name = "api"
+
+    def __init__(self, config: KubeConfig, pool_size: int = 32):
+        # requests is only needed when this backend is actually used
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.config = config
+        self.context = config.context
+        self.cluster_id = config.context or config.server
+        self.calls = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.verify = config.ca_file if (config.verify and config.ca_file) else config.verify
+        if config.cert_file and config.key_file:
+            self.session.cert = (config.cert_file, config.key_file)
+        # Tokens from an exec credential plugin expire; they are renewed shortly before, or on a 401
+        self._token_expires: Optional[float] = None
+        self._token_lock = threading.Lock()
+        if config.token:
+            self.session.headers['Authorization'] = f"Bearer {config.token}"
+        elif config.exec_config:
+            self._refresh_token()
+        elif config.username and config.password:
+            self.session.auth = (config.username, config.password)
+        self._timeout_errors = (requests.Timeout,)
+        self._request_errors = (requests.RequestException,)
+
+    def _refresh_token(self, rejected: Optional[str] = None):
+        """Run the credential plugin again, unless another thread already replaced the ``rejected`` header"""
+        with self._token_lock:
+            if rejected is not None and self.session.headers.get('Authorization') != rejected:
+                return
+            token, self._token_expires = _exec_token(self.config.exec_config)
+            self.session.headers['Authorization'] = f"Bearer {token}"
+
+    def request(self, path: str, params: Optional[Dict] = None, timeout: float = 15,
+                stream: bool = False):
+        with self._lock:
+            self.calls += 1
+        if self._token_expires is not None and time.time() > self._token_expires - TOKEN_REFRESH_MARGIN:
+            self._refresh_token(self.session.headers.get('Authorization'))
+        # A streamed body is read after this returns; _stream traces the whole read
+        with tracing.span(_span_name(path), "kube", path=path) if not stream else nullcontext() as span:
+            for attempt in range(2):
+                sent = self.session.headers.get('Authorization')
+                try:
+                    response = self.session.get(self.config.server + path, params=params,
+                                                timeout=timeout, stream=stream)
+                except self._timeout_errors:
+                    raise KubeTimeout(f"GET {path} timed out after {timeout:.0f}s")
+                except self._request_errors as e:
+                    raise KubeError(f"GET {path} failed: {e}")
+                # A token revoked or expired early: get a new one and try once more
+                if response.status_code != 401 or not self.config.exec_config or attempt:
+                    break
+                response.close()
+                self._refresh_token(sent)
+            if response.status_code != 200:
+                try:
+                    message = response.json().get('message', response.text)
+                except ValueError:
+                    message = response.text
+                response.close()
+                raise KubeError(f"GET {path} returned {response.status_code}: {message}")
+            if not stream:
+                span.set(bytes=len(response.content))
+                with self._lock:
+                    self.bytes_received += len(response.content)
+        return response
+
+    def get_json(self, path: str, params: Optional[Dict] = None, timeout: float = 15) -> Dict:
+        return self.request(path, params, timeout).json()
+
+    def list_namespaces(self, timeout: float = 30) -> List[str]:
+        items = self.get_json("/api/v1/namespaces", timeout=timeout).get('items', [])
+        return [item['metadata']['name'] for item in items]
+
+    def list_pods(self, namespace: str, timeout: float = 20) -> List[str]:
+        items = self.get_json(f"/api/v1/namespaces/{quote(namespace)}/pods", timeout=timeout).get('items', [])
+        return [item['metadata']['name'] for item in items]
+
+    def list_all_pods(self, timeout: float = 60, page_size: int = 500) -> List[Dict]:
+        """Full pod objects for the whole cluster, fetched with paginated list calls"""
+        items, params = [], {'limit': page_size}
+        while True:
+            page = self.get_json("/api/v1/pods", params, timeout=timeout)
+            items.extend(page.get('items', []))
+            token = (page.get('metadata') or {}).get('continue')
+            if not token:
+                return items
+            params = {'limit': page_size, 'continue': token}
+
+    def pod_logs(self, namespace: str, pod: str, since: str = "1h", tail: int = 20,
+                 timeout: float = 10, container: Optional[str] = None, previous: bool = False,
+                 since_time: Optional[str] = None, timestamps: bool = False) -> str:
+        params = {'tailLines': tail}
+        if since_time:
+            params['sinceTime'] = since_time
+        else:
+            params['sinceSeconds'] = parse_duration(since)
+        if timestamps:
+            params['timestamps'] = 'true'
+        if container:
+            params['container'] = container
+        if previous:
+            params['previous'] = 'true'
+        return self.request(f"/api/v1/namespaces/{quote(namespace)}/pods/{quote(pod)}/log",
+                            params, timeout).text
+
+    def stream_logs(self, namespace: str, pod: str, since: str = "1h", tail: Optional[int] = None,
+                    timeout: float = 10, container: Optional[str] = None, previous: bool = False,
+                    since_time: Optional[str] = None, timestamps: bool = False) -> Iterator[str]:
+        """Yield log lines as they arrive over a chunked response"""
+        params = {}
+        if since_time:
+            params['sinceTime'] = since_time
+        else:
+            params['sinceSeconds'] = parse_duration(since)
+        if tail:
+            params['tailLines'] = tail
+        if timestamps:
+            params['timestamps'] = 'true'
+        if container:
+            params['container'] = container
+        if previous:
+            params['previous'] = 'true'
+        path = f"/api/v1/namespaces/{quote(namespace)}/pods/{quote(pod)}/log"
+        return self._stream(path, params, timeout)
+
+    def _stream(self, path: str, params: Dict, timeout: float) -> Iterator[str]:
+        span = tracing.start_span(_span_name(path), "kube", path=path, streamed=True)
+        try:
+            response = self.request(path, params, timeout, stream=True)
+        except KubeError as e:
+            span.finish(str(e))
+            raise
+        expires_at = time.monotonic() + timeout
+        received = 0
+        error = None
+        try:
+            for raw in response.iter_lines(chunk_size=64 * 1024):
+                received += len(raw) + 1
+                yield raw.decode("utf-8", errors="replace")
+                if time.monotonic() > expires_at:
+                    error = f"GET {path} timed out after {timeout:.0f}s"
+                    raise KubeTimeout(error)
+        except self._timeout_errors:
+            error = f"GET {path} timed out after {timeout:.0f}s"
+            raise KubeTimeout(error)
+        except self._request_errors as e:
+            error = f"GET {path} failed: {e}"
+            raise KubeError(error)
+        finally:
+            response.close()
+            with self._lock:
+                self.bytes_received += received
+            span.set(bytes=received)
+            span.finish(error)
+
+    def cluster_info(self, timeout: float = 15) -> str:
+        version = self.get_json("/version", timeout=timeout)
+        return (f"Kubernetes control plane is running at {self.config.server}\n"
+                f"Server version: {version.get('gitVersion', 'unknown')}\n")
+
+    def nodes_table(self, timeout: float = 15) -> str:
+        rows = []
+        for node in self.get_json("/api/v1/nodes", timeout=timeout).get('items', []):
+            meta, status = node['metadata'], node.get('status', {})
+            ready = next((c['status'] for c in status.get('conditions', []) if c['type'] == 'Ready'), 'Unknown')
+            roles = [k.split('/', 1)[1] for k in meta.get('labels', {})
+                     if k.startswith('node-role.kubernetes.io/')] or ['<none>']
+            internal_ip = next((a['address'] for a in status.get('addresses', [])
+                                if a['type'] == 'InternalIP'), '<none>')
+            info = status.get('nodeInfo', {})
+            rows.append([meta['name'], 'Ready' if ready == 'True' else 'NotReady', ','.join(roles),
+                         info.get('kubeletVersion', ''), internal_ip, info.get('osImage', ''),
+                         info.get('containerRuntimeVersion', '')])
+        return format_table(['NAME', 'STATUS', 'ROLES', 'VERSION', 'INTERNAL-IP', 'OS-IMAGE',
+                             'CONTAINER-RUNTIME'], rows)
+
+    def namespaces_table(self, timeout: float = 15) -> str:
+        items = self.get_json("/api/v1/namespaces", timeout=timeout).get('items', [])
+        return format_table(['NAME', 'STATUS'],
+                            [[i['metadata']['name'], i.get('status', {}).get('phase', '')] for i in items])
+
+    def events_table(self, timeout: float = 15) -> str:
+        items = self.get_json("/api/v1/events", timeout=timeout).get('items', [])
+        items.sort(key=lambda e: e.get('lastTimestamp') or e.get('eventTime') or '')
+        rows = [[e['metadata'].get('namespace', ''), e.get('lastTimestamp') or '', e.get('type', ''),
+                 e.get('reason', ''),
+                 f"{e.get('involvedObject', {}).get('kind', '').lower()}/{e.get('involvedObject', {}).get('name', '')}",
+                 (e.get('message') or '').replace('\n', ' ')] for e in items]
+        return format_table(['NAMESPACE', 'LAST SEEN', 'TYPE', 'REASON', 'OBJECT', 'MESSAGE'], rows)
+
+    def list_events(self, timeout: float = 30, page_size: int = 500) -> Tuple[List[Dict], Optional[str]]:
+        """Every event in the cluster and the resourceVersion to watch from, in paginated calls"""
+        items, params = [], {'limit': page_size}
+        while True:
+            page = self.get_json("/api/v1/events", params, timeout=timeout)
+            items.extend(page.get('items', []))
+            meta = page.get('metadata') or {}
+            if not meta.get('continue'):
+                return items, meta.get('resourceVersion')
+            params = {'limit': page_size, 'continue': meta['continue']}
+
+    def list_nodes(self, timeout: float = 15) -> List[Dict]:
+        return self.get_json("/api/v1/nodes", timeout=timeout).get('items', [])
+
+    def pod_metrics(self, timeout: float = 15) -> List[Dict]:
+        """CPU and memory usage of every pod in the cluster, from one metrics API call"""
+        return self.get_json(METRICS_PATH + "/pods", timeout=timeout).get('items', [])
+
+    def node_metrics(self, timeout: float = 15) -> List[Dict]:
+        return self.get_json(METRICS_PATH + "/nodes", timeout=timeout).get('items', [])
+
+    def watch_events(self, resource_version: str, seconds: int = 1) -> Iterator[Dict]:
+        """Event changes after ``resource_version``; the server ends the watch after ``seconds``"""
+        for line in self._stream("/api/v1/events", _watch_params(resource_version, seconds), seconds + 15):
+            if line.strip():
+                yield json.loads(line)
+
+    def close(self):
+        self.session.close()
+        for path in self.config.temp_files:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+_backends: Dict[tuple, object] = {}
+_backends_lock = threading.Lock()
+
+
+def create_backend(kind: Optional[str] = None, context: Optional[str] = None):
+    """
+    Build a backend. ``kind`` is ``api``, ``kubectl`` or ``auto`` (the default,
+    overridable with $HELM_KUBE_BACKEND); ``auto`` uses the API when the
+    kubeconfig can be handled natively and falls back to kubectl otherwise.
+    """
+    kind = kind or os.getenv("HELM_KUBE_BACKEND", "auto")
+    if kind == "kubectl":
+        return KubectlBackend(context)
+    try:
+        return ApiBackend(load_kubeconfig(context=context))
+    except (KubeError, ImportError, OSError, KeyError, ValueError) as e:
+        if kind == "api":
+            raise KubeError(f"API backend unavailable: {e}")
+        return KubectlBackend(context)
+
+
+def get_backend(kind: Optional[str] = None, context: Optional[str] = None):
+    """Return a shared backend so connections and kubeconfig parsing are reused"""
+    key = (kind or os.getenv("HELM_KUBE_BACKEND", "auto"), context)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = create_backend(*key)
+        return _backends[key]
+
+
+def close_backends():
+    with _backends_lock:
+        for backend in _backends.values():
+            backend.close()
+        _backends.clear()
+
+
+atexit.register(close_backends)
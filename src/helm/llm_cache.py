@@ -0,0 +1,234 @@
+"""Content-addressed cache of LLM responses shared across crew runs, and tracing of LLM calls."""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from crewai.llms.base_llm import BaseLLM
+
+from helm import tracing
+from helm.packer import count_tokens
+from helm.state import state_path
+
+# Parts of a prompt that change on every run without changing the evidence
+_VOLATILE = [
+    (re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'), '<TS>'),
+    (re.compile(r'\b\d{2}:\d{2}:\d{2}(?:\.\d+)?\b'), '<TIME>'),
+    (re.compile(r'\b\d+(?:\.\d+)?\s?(?:ms|s)\b'), '<DURATION>'),
+]
+
+
+def normalise(text: str) -> str:
+    """Mask timestamps and durations so identical evidence gives an identical fingerprint"""
+    for pattern, replacement in _VOLATILE:
+        text = pattern.sub(replacement, text)
+    return ' '.join(text.split())
+
+
+class LLMCache:
+    """
+    Responses stored one file per key under the state directory. Entries
+    expire after ``ttl`` seconds and the least recently used ones are evicted
+    beyond ``max_entries``.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.path = path or state_path("llm_cache")
+        self.ttl = ttl if ttl is not None else float(os.getenv("HELM_LLM_CACHE_TTL", "86400"))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("HELM_LLM_CACHE_SIZE", "500"))
+        os.makedirs(self.path, exist_ok=True)
+        self.hits = self.misses = self.stores = self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, task: Optional[Dict[str, str]], messages: Union[str, List[Dict[str, str]]]) -> str:
+        if isinstance(messages, str):
+            messages = [{'role': 'user', 'content': messages}]
+        payload = {
+            'model': model,
+            'task': task or {},
+            'messages': [[m.get('role'), normalise(str(m.get('content', '')))] for m in messages],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._file(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None and time.time() - entry.get('created', 0) > self.ttl:
+            self._remove(path)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # mtime tracks last use for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['response']
+
+    def put(self, key: str, response: str, task: Optional[str] = None):
+        tmp = f"{self._file(key)}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({'created': time.time(), 'task': task, 'response': response}, f)
+        os.replace(tmp, self._file(key))
+        with self._lock:
+            self.stores += 1
+        self.evict()
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self.evictions += 1
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # A hit refreshes mtime, so an old mtime means both old and unused
+            if now - stat.st_mtime > self.ttl:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, path))
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self._remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores,
+                'evictions': self.evictions, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"{s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%} hit rate), "
+                f"{s['stores']} stored, {s['evictions']} evicted")
+
+
+class CachedLLM(BaseLLM):
+    """
+    Wraps another crewAI LLM and answers repeated prompts from an LLMCache.
+    The key covers the model, the calling task's config and the normalised
+    messages, which hold the rendered inputs and the upstream task outputs.
+    Calls that pass function-calling tools go straight to the wrapped LLM.
+    """
+
+    def __init__(self, llm: BaseLLM, cache: Optional[LLMCache] = None):
+        self.llm = llm
+        self.cache = cache or LLMCache()
+        self.calls = 0
+        super().__init__(model=llm.model, temperature=getattr(llm, 'temperature', None))
+
+    # The agent executor sets stop words on the LLM it was given
+    @property
+    def stop(self):
+        return self.llm.stop
+
+    @stop.setter
+    def stop(self, value):
+        self.llm.stop = value
+
+    @staticmethod
+    def _task_config(task) -> Optional[Dict[str, str]]:
+        if task is None:
+            return None
+        return {
+            'name': getattr(task, 'name', None) or '',
+            'description': getattr(task, '_original_description', None) or getattr(task, 'description', ''),
+            'expected_output': getattr(task, '_original_expected_output', None) or getattr(task, 'expected_output', ''),
+        }
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None):
+        if tools or available_functions:
+            self.calls += 1
+            return self.llm.call(messages, tools, callbacks, available_functions, from_task, from_agent)
+        key = LLMCache.key(self.model, self._task_config(from_task), messages)
+        cached = self.cache.get(key)
+        tracing.current_span().set(cache_hit=int(cached is not None))
+        if cached is not None:
+            return cached
+        self.calls += 1
+        response = self.llm.call(messages, tools, callbacks, available_functions, from_task, from_agent)
+        if isinstance(response, str) and response.strip():
+            self.cache.put(key, response, getattr(from_task, 'name', None))
+        return response
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
+
+
+class TracedLLM(BaseLLM):
+    """
+    Wraps another crewAI LLM and records every call as an ``llm`` span with
+    its prompt and response tokens; a CachedLLM inside marks cache hits.
+    Attributes it does not have (``cache``, ``calls``) are the wrapped LLM's.
+    """
+
+    def __init__(self, llm: BaseLLM):
+        self.llm = llm
+        super().__init__(model=llm.model, temperature=getattr(llm, 'temperature', None))
+
+    def __getattr__(self, name):
+        llm = self.__dict__.get('llm')
+        if llm is None:
+            raise AttributeError(name)
+        return getattr(llm, name)
+
+    @property
+    def stop(self):
+        return self.llm.stop
+
+    @stop.setter
+    def stop(self, value):
+        self.llm.stop = value
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None):
+        task = getattr(from_task, 'name', None)
+        with tracing.span(f"llm {task}" if task else "llm call", "llm", model=self.model) as span:
+            prompt = messages if isinstance(messages, str) else \
+                '\n'.join(str(m.get('content', '')) for m in messages)
+            span.set(tokens_in=count_tokens(prompt))
+            response = self.llm.call(messages, tools, callbacks, available_functions, from_task, from_agent)
+            span.set(tokens_out=count_tokens(str(response)))
+            return response
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
@@ -0,0 +1,113 @@
+"""Streaming log digestion with bounded memory."""
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Iterable, List, Optional, Tuple
+
+from helm.classifier import LogClassifier, get_classifier
+
+ISSUE_SEVERITIES = ('error', 'warning')
+
+
+def line_severity(line: str) -> str:
+    return get_classifier().classify(line).severity
+
+
+@dataclass
+class Excerpt:
+    """An issue line together with the lines that led up to it"""
+    severity: str
+    line: str
+    context: List[str] = field(default_factory=list)
+    line_number: int = 0
+    categories: tuple = ()
+
+
+class LogDigest:
+    """
+    Consumes a log stream line by line and keeps only bounded state: severity
+    counters, a ring buffer of the most recent lines, and the first few issue
+    lines with their preceding context. Memory does not grow with log volume.
+    With ``rates`` timestamped lines are also counted per pattern, severity
+    and minute, for anomaly detection (see :mod:`helm.anomaly`).
+    """
+
+    def __init__(self, context_lines: int = 3, max_excerpts: int = 5, tail_lines: int = 5,
+                 max_line_length: int = 500, miner=None, source: Optional[str] = None,
+                 classifier: Optional[LogClassifier] = None, rates: bool = False):
+        self.classifier = classifier or get_classifier()
+        self.counts: Counter = Counter()
+        self.categories: Counter = Counter()
+        self.lines = 0
+        self.bytes = 0
+        self.excerpts: List[Excerpt] = []
+        self.max_excerpts = max_excerpts
+        self.max_line_length = max_line_length
+        self.truncated = False
+        self.last_timestamp: Optional[str] = None
+        self._context: Deque[str] = deque(maxlen=context_lines)
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        # Optional shared TemplateMiner that clusters every line into patterns
+        self.miner = miner
+        self.source = source
+        # (template id or None, severity, "YYYY-MM-DDTHH:MM") -> lines
+        self.rates: Optional[Counter] = Counter() if rates else None
+
+    def add(self, line: str, timestamp: Optional[str] = None):
+        line = line.rstrip('\r\n')
+        self.lines += 1
+        if timestamp:
+            self.last_timestamp = timestamp
+        self.bytes += len(line) + 1
+        if len(line) > self.max_line_length:
+            line = line[:self.max_line_length] + '…'
+        result = self.classifier.classify(line)
+        severity = result.severity
+        self.counts[severity] += 1
+        self.categories.update(result.categories)
+        template = None
+        if self.miner is not None:
+            template = self.miner.add(line, self.source, timestamp, severity, result.categories)
+        if self.rates is not None and timestamp:
+            self.rates[(template.id if template else None, severity, timestamp[:16])] += 1
+        if severity in ISSUE_SEVERITIES and len(self.excerpts) < self.max_excerpts:
+            self.excerpts.append(Excerpt(severity, line, list(self._context), self.lines, result.categories))
+        self._context.append(line)
+        self.tail.append(line)
+
+    def add_all(self, lines: Iterable[Tuple[str, Optional[str]]]):
+        """Add (line, timestamp) pairs"""
+        for line, timestamp in lines:
+            self.add(line, timestamp)
+
+    def consume(self, lines: Iterable[str]) -> "LogDigest":
+        for line in lines:
+            self.add(line)
+        return self
+
+    @property
+    def issue_count(self) -> int:
+        return sum(self.counts[s] for s in ISSUE_SEVERITIES)
+
+    def summary(self) -> str:
+        parts = [f"{self.counts[s]} {s}s" for s in ISSUE_SEVERITIES if self.counts[s]]
+        # Generic error/warning categories just repeat the severity counts
+        parts += [f"{category}: {n}" for category, n in self.categories.most_common()
+                  if category not in ISSUE_SEVERITIES][:3]
+        text = f"{self.lines} lines" + (f", {', '.join(parts)}" if parts else "")
+        return text + (" (partial)" if self.truncated else "")
+
+    def render(self, max_chars: Optional[int] = None) -> str:
+        """Issue excerpts (or the latest lines for a quiet pod) as plain text"""
+        out = []
+        if self.excerpts:
+            for excerpt in self.excerpts:
+                out.extend(f"  {line}" for line in excerpt.context)
+                out.append(f"> {excerpt.line}")
+            if self.issue_count > len(self.excerpts):
+                out.append(f"... {self.issue_count - len(self.excerpts)} more issue lines")
+        else:
+            out.extend(self.tail)
+        text = '\n'.join(out)
+        if max_chars is not None and len(text) > max_chars:
+            text = text[:max_chars] + '...'
+        return text
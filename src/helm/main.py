@@ -1,9 +1,14 @@
 #!/usr/bin/env python
+import os
 import sys
+import threading
 import warnings
+import time
 import argparse
 from datetime import datetime, timedelta
 
+from helm import tracing
+
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 def get_default_inputs():
@@ -24,13 +29,26 @@ def get_default_inputs():
         'include_charts': 'no'
     }
 
-def run_log_analysis(custom_inputs=None):
+def run_log_analysis(custom_inputs=None, incremental=True, direct=None, llm=None, context=None,
+                     evidence=None, report_file='kubernetes_log_analysis_report.md', scope='run', analyzer=None):
     """
     Run the Kubernetes log analysis crew.
+
+    With ``incremental`` each container's logs are only read from where the
+    previous run of the same ``scope`` (health, security, ...) stopped. With ``direct`` (the default, see
+    $HELM_DIRECT_COLLECTION) logs are collected in Python before the crew
+    starts, and the LLM work begins at the analysis task; ``evidence`` passes
+    in an already collected one. ``llm`` reuses an existing LLM client instead
+    of creating one, ``analyzer`` a whole crew definition (see
+    KubernetesLogAnalysis.rebind). ``context`` selects the kubeconfig context
+    to analyze.
     """
+    if direct is None:
+        direct = os.getenv("HELM_DIRECT_COLLECTION", "1") != "0"
     # Import here to avoid issues if not properly configured
     try:
         from helm.crew import KubernetesLogAnalysis
+        from helm.evidence import collect_evidence
     except ImportError as e:
         print(f"❌ Error importing KubernetesLogAnalysis: {e}")
         print("Make sure you're in the correct directory and dependencies are installed")
@@ -53,12 +71,47 @@ def run_log_analysis(custom_inputs=None):
     
     try:
         # Create and run the crew
-        analyzer = KubernetesLogAnalysis()
-        crew = analyzer.crew()
-        result = crew.kickoff(inputs=inputs)
+        if analyzer is None:
+            analyzer = KubernetesLogAnalysis(incremental=incremental, llm=llm, context=context,
+                                             report_file=report_file, scope=scope)
+        else:
+            analyzer.rebind(incremental, report_file, scope)
+        if direct or evidence is not None:
+            if evidence is None:
+                print("📥 Collecting cluster evidence...")
+                evidence = collect_evidence(inputs['namespaces'], inputs['time_range'], incremental, context, scope)
+            with tracing.span("prepare evidence", "analysis"):
+                analyzer.evidence = analyzer.prepare_evidence(evidence, inputs)
+            if analyzer.shard_findings:
+                slowest = max(f.elapsed for f in analyzer.shard_findings)
+                print(f"🧩 Analyzed {len(analyzer.shard_findings)} namespace shards in parallel "
+                      f"(slowest {slowest:.1f}s)")
+        crew = analyzer.next_crew()
+        with tracing.span("crew kickoff", "cli"):
+            result = crew.kickoff(inputs=inputs)
         
         print("✅ Log analysis completed successfully!")
-        print("📄 Report generated: kubernetes_log_analysis_report.md")
+        if hasattr(analyzer.llm, 'cache'):
+            print(f"🗄️ LLM cache: {analyzer.llm.cache.summary()}")
+        if evidence is not None and evidence.scan is not None:
+            # Later runs read trends from the history store instead of re-reading old logs
+            from helm.history import history_enabled, record_run
+            if history_enabled():
+                try:
+                    outputs = {t.name or f"task_{i}": t.raw for i, t in enumerate(result.tasks_output)}
+                    with tracing.span("record history", "history"):
+                        run_id = record_run(evidence.scan, outputs, inputs['focus_area'], incremental)
+                    print(f"🗃️ Run {run_id} recorded in the history store")
+                except Exception as e:
+                    print(f"⚠️ Could not record run history: {e}")
+        # Alerts are sent in the background; make sure they are out before the run ends
+        from helm.notify import flush_notifiers
+        with tracing.span("flush notifications", "notify"):
+            summaries = flush_notifiers()
+        for summary in summaries:
+            print(f"📨 Slack: {summary}")
+        if report_file:
+            print(f"📄 Report generated: {report_file}")
         return result
         
     except Exception as e:
@@ -68,7 +121,7 @@ def run_log_analysis(custom_inputs=None):
         traceback.print_exc()
         raise Exception(f"An error occurred while running the log analysis crew: {e}")
 
-def run_incident_investigation(namespace, pod_name=None, since="30m"):
+def run_incident_investigation(namespace, pod_name=None, since="30m", llm=None, analyzer=None):
     """
     Run focused incident investigation for specific namespace/pod.
     """
@@ -86,9 +139,10 @@ def run_incident_investigation(namespace, pod_name=None, since="30m"):
         print(f"🎯 Focusing on pod: {pod_name}")
     print(f"⏰ Time range: {since}")
     
-    return run_log_analysis(inputs)
+    # An investigation needs the whole window, not just what changed since the last run
+    return run_log_analysis(inputs, incremental=False, llm=llm, analyzer=analyzer)
 
-def run_health_check():
+def run_health_check(llm=None, analyzer=None):
     """
     Run routine health check analysis.
     """
@@ -101,9 +155,9 @@ def run_health_check():
     })
     
     print("🏥 Starting routine health check analysis...")
-    return run_log_analysis(inputs)
+    return run_log_analysis(inputs, llm=llm, scope='health', analyzer=analyzer)
 
-def run_security_audit():
+def run_security_audit(llm=None, analyzer=None):
     """
     Run security-focused log analysis.
     """
@@ -111,13 +165,176 @@ def run_security_audit():
     inputs.update({
         'time_range': '24h',  # 24 hours instead of 7 days to reduce load
         'focus_area': 'security events and unauthorized access attempts',
-        'priority_issues': 'authentication failures, unauthorized access, security violations',
+        'priority_issues': 'authentication failures (auth-failure), TLS/certificate errors (tls), unauthorized access, security violations',
         'log_levels': 'ERROR,WARN',
         'report_audience': 'Security team, DevOps engineers'
     })
     
     print("🔒 Starting security audit analysis...")
-    return run_log_analysis(inputs)
+    return run_log_analysis(inputs, llm=llm, scope='security', analyzer=analyzer)
+
+def run_daemon(schedule=None, port=None):
+    """
+    Keep one warm process running: health and security analyses on a
+    schedule, incident investigations on request over local HTTP.
+    """
+    from helm.crew import KubernetesLogAnalysis
+    from helm.daemon import Daemon, daemon_settings, parse_schedule
+    
+    settings = daemon_settings()
+    schedules = parse_schedule(schedule or settings['schedule'], settings['jitter'])
+    # Build the crew definition once per job up front (configs, agents, tools, tasks); each run
+    # only rebinds its inputs. All of them share one LLM client and cache.
+    warm = {'health': KubernetesLogAnalysis()}
+    llm = warm['health'].llm
+    warm.update((name, KubernetesLogAnalysis(llm=llm)) for name in ('security', 'incident'))
+    for analyzer in warm.values():
+        analyzer.crew()
+    locks = {name: threading.Lock() for name in warm}
+
+    def with_warm(name, run):
+        def job(*args, **kwargs):
+            # A second job of the same kind running at once (HELM_DAEMON_WORKERS > 1) builds its own crew
+            if not locks[name].acquire(blocking=False):
+                return run(*args, analyzer=KubernetesLogAnalysis(llm=llm), **kwargs)
+            try:
+                return run(*args, analyzer=warm[name], **kwargs)
+            finally:
+                locks[name].release()
+        return job
+
+    jobs = {
+        'health': with_warm('health', run_health_check),
+        'security': with_warm('security', run_security_audit),
+        'incident': with_warm('incident', lambda namespace, pod=None, since="30m", analyzer=None:
+                              run_incident_investigation(namespace, pod, since, analyzer=analyzer)),
+    }
+    if tracing.enabled():
+        jobs = {name: _traced_job(name, job) for name, job in jobs.items()}
+    daemon = Daemon(jobs, schedules, host=settings['host'], port=settings['port'] if port is None else port,
+                    workers=settings['workers']).start()
+    
+    print("🛰️ Helm daemon running")
+    for s in schedules:
+        print(f"   - {s.job} every {s.interval:.0f}s (±{s.jitter:.0%})")
+    if daemon.server is not None:
+        print(f"   - POST http://{daemon.host}:{daemon.port}/incident {{\"namespace\": ..., \"pod\": ..., \"since\": ...}}")
+        print(f"   - GET  http://{daemon.host}:{daemon.port}/status")
+    daemon.wait()
+    print("🛑 Stopping daemon...")
+    daemon.stop()
+
+def _traced_job(name, job):
+    """A daemon job recorded as its own span tree, exported as soon as it finishes"""
+    def run(*args, **kwargs):
+        try:
+            with tracing.span(f"job {name}", "cli"):
+                return job(*args, **kwargs)
+        finally:
+            tracing.get_tracer().export()
+    return run
+
+def run_fleet_analysis(contexts=None, custom_inputs=None, incremental=True, llm=None):
+    """
+    Run the log analysis for several kubeconfig contexts at once and write
+    one fleet report. ``contexts`` defaults to $HELM_FLEET_CONTEXTS, then to
+    every context in the kubeconfig. A cluster that cannot be reached or
+    fails its analysis is reported as failed; the others are not affected.
+    """
+    from helm.evidence import collect_evidence
+    from helm.fleet import fan_out, fleet_settings, render_fleet_report, report_path
+    from helm.kube import KubeError, kubeconfig_contexts
+    
+    settings = fleet_settings()
+    contexts = contexts or settings['contexts'] or kubeconfig_contexts()
+    inputs = get_default_inputs()
+    if custom_inputs:
+        inputs.update(custom_inputs)
+    os.makedirs(settings['report_dir'], exist_ok=True)
+    
+    print(f"🌐 Analyzing {len(contexts)} clusters: {', '.join(contexts)}")
+    
+    def analyze(context):
+        # Each cluster has its own backend, cursors, event index and report file
+        evidence = collect_evidence(inputs['namespaces'], inputs['time_range'], incremental, context, 'fleet')
+        if evidence.scan is None:
+            raise KubeError(evidence.error)
+        result = run_log_analysis(dict(inputs, cluster_context=f"Kubernetes cluster '{context}'"), incremental,
+                                  llm=llm, context=context, evidence=evidence, report_file=None)
+        if result is False:
+            raise RuntimeError("the analysis crew could not be loaded")
+        # Written here rather than by the crew, which only takes paths relative to the working directory
+        with tracing.span("write report", "report", context=context), \
+                open(report_path(settings['report_dir'], context), "w", encoding="utf-8") as f:
+            f.write(str(result))
+        return evidence, str(result)
+    
+    started = time.perf_counter()
+    results = fan_out(contexts, analyze, settings['workers'], settings['deadline'])
+    path = os.path.join(settings['report_dir'], "fleet_report.md")
+    with tracing.span("write fleet report", "report"), open(path, "w", encoding="utf-8") as f:
+        f.write(render_fleet_report(results))
+    
+    failed = [r for r in results if not r.ok]
+    print(f"✅ Fleet analysis finished in {time.perf_counter() - started:.1f}s: "
+          f"{len(results) - len(failed)} of {len(results)} clusters analyzed")
+    for result in failed:
+        print(f"❌ {result.context}: {result.error}")
+    print(f"📄 Fleet report generated: {path}")
+    return results
+
+def run_collect(namespaces="ALL_NAMESPACES", since="1h", budget=None):
+    """
+    Print the evidence the crew would get, without the crew or an LLM.
+    Resume cursors are left alone, so the next analysis still sees these lines.
+    """
+    from helm.evidence import collect_evidence
+    
+    evidence = collect_evidence(namespaces, since, incremental=False)
+    print(evidence.render(budget=budget))
+    return evidence
+
+def run_events(namespaces=None, event_type=None, since="1h", top=None):
+    """
+    Print events from the event index, newest first, or the top reasons with ``top``.
+    """
+    from helm.events import ago, get_event_index
+    from helm.kube import KubeError, format_table, get_backend
+    
+    try:
+        index = get_event_index(get_backend())
+    except KubeError as e:
+        print(f"❌ Error reading cluster events: {e}")
+        return None
+    scope = [ns.strip() for ns in namespaces.split(',')] if namespaces else None
+    if top:
+        reasons = index.top_reasons(ago(since), scope, event_type, limit=top)
+        print(format_table(['REASON', 'TYPE', 'EVENTS', 'OBJECTS'],
+                           [[reason, type, str(count), str(objects)] for reason, type, count, objects in reasons]))
+        return reasons
+    records = index.query(scope, event_type, ago(since))
+    print(format_table(['NAMESPACE', 'LAST SEEN', 'TYPE', 'REASON', 'OBJECT', 'COUNT', 'MESSAGE'],
+                       [[r.namespace, r.last_seen, r.type, r.reason, r.object, str(r.count), r.message]
+                        for r in records]))
+    return records
+
+def run_history(namespaces=None, since="7d", workload=None, search=None):
+    """
+    Print trends from earlier runs: errors and warnings per workload over
+    time, patterns first seen in the window, and matching past findings.
+    """
+    from helm.history import get_history
+    from helm.kube import KubeError, get_backend
+    
+    try:
+        cluster = get_backend().cluster_id
+    except KubeError as e:
+        print(f"❌ Error resolving the current cluster: {e}")
+        return None
+    scope = [ns.strip() for ns in namespaces.split(',')] if namespaces else None
+    report = get_history().report(cluster, since, scope, workload, search)
+    print(report)
+    return report
 
 def run():
     """
@@ -173,23 +390,75 @@ def main():
     """
     parser = argparse.ArgumentParser(description='Kubernetes Log Analysis Tool')
     parser.add_argument('action', nargs='?', default='run', 
-                       choices=['run', 'incident', 'health', 'security', 'train', 'replay', 'test'],
+                       choices=['run', 'incident', 'health', 'security', 'daemon', 'fleet', 'collect', 'events',
+                                'history', 'train', 'replay', 'test'],
                        help='Action to perform')
     parser.add_argument('--namespace', '-n', type=str, default='default',
                        help='Kubernetes namespace to analyze')
     parser.add_argument('--pod', '-p', type=str, 
                        help='Specific pod name to analyze')
-    parser.add_argument('--since', '-s', type=str, default='1h',
-                       help='Time range for log collection (e.g., 1h, 30m, 2d)')
+    parser.add_argument('--since', '-s', type=str,
+                       help='Time range for log collection (e.g., 1h, 30m, 2d; default: 1h, 7d for history)')
     parser.add_argument('--namespaces', type=str, 
                        help='Comma-separated list of namespaces to analyze')
     parser.add_argument('--focus', type=str,
                        help='Focus area for analysis')
+    parser.add_argument('--schedule', type=str,
+                       help='Daemon jobs and intervals (e.g., health=15m,security=6h)')
+    parser.add_argument('--port', type=int,
+                       help='Daemon HTTP port for ad-hoc incident investigations')
+    parser.add_argument('--contexts', type=str,
+                       help='Comma-separated kubeconfig contexts to analyze (fleet, default: all)')
+    parser.add_argument('--type', type=str, choices=['Warning', 'Normal'],
+                       help='Event type to list (events)')
+    parser.add_argument('--top', type=int,
+                       help='Show the N most frequent event reasons instead of events (events)')
+    parser.add_argument('--workload', type=str,
+                       help='Workload to show trends for (history)')
+    parser.add_argument('--search', type=str,
+                       help='Search past findings for this text (history)')
+    parser.add_argument('--budget', type=int,
+                       help='Token budget for the printed evidence (collect, default: everything)')
+    parser.add_argument('--profile', action='store_true',
+                       help='Print a per-stage latency breakdown and the critical path at the end of the run')
     
     args = parser.parse_args()
     
+    # Spans go to $HELM_TRACE_FILE when it is set; --profile also summarises them
+    if not (args.profile or os.getenv("HELM_TRACE_FILE")):
+        run_action(args)
+        return
+    tracer = tracing.enable()
+    try:
+        with tracing.span(f"helm {args.action}", "cli"):
+            run_action(args)
+    finally:
+        spans = list(tracer.spans)
+        path = tracer.export()
+        if args.profile:
+            print()
+            print(tracing.profile(spans))
+        if path:
+            print(f"🧵 Trace written to {path}")
+
+def run_action(args):
+    """
+    Run the action parsed from the command line.
+    """
+    # collect, events and history never load crewAI or need LLM credentials
+    if args.action == 'history':
+        run_history(args.namespaces, args.since or '7d', args.workload, args.search)
+        return
+    args.since = args.since or '1h'
+
+    if args.action == 'collect':
+        run_collect(args.namespaces or 'ALL_NAMESPACES', args.since, args.budget)
+        return
+    if args.action == 'events':
+        run_events(args.namespaces, args.type, args.since, args.top)
+        return
+    
     # Basic environment check
-    import os
     if not os.getenv("AZURE_API_KEY"):
         print("⚠️ AZURE_API_KEY not found. Make sure to set your Azure OpenAI credentials.")
         print("   Run: source .env  (if you have an .env file)")
@@ -216,6 +485,18 @@ def main():
     elif args.action == 'security':
         run_security_audit()
         
+    elif args.action == 'daemon':
+        run_daemon(args.schedule, args.port)
+        
+    elif args.action == 'fleet':
+        custom_inputs = {'time_range': args.since}
+        if args.namespaces:
+            custom_inputs['namespaces'] = args.namespaces
+        if args.focus:
+            custom_inputs['focus_area'] = args.focus
+        contexts = [c.strip() for c in args.contexts.split(',') if c.strip()] if args.contexts else None
+        run_fleet_analysis(contexts, custom_inputs)
+        
     elif args.action == 'train':
         train()
         
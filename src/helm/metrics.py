@@ -0,0 +1,321 @@
+"""Resource usage from the metrics API, sampled into array-backed buffers and joined with requests and limits."""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from helm.classifier import SEVERITY_RANK
+from helm.inventory import PodInventory
+from helm.kube import format_table, parse_quantity
+from helm.packer import Item
+
+# Utilisation of a limit (or of a node's allocatable) that counts as close to it
+NEAR_LIMIT = 0.9
+NODE_PRESSURE = 0.85
+# Memory growth is reported when the limit would be reached within this many hours
+GROWTH_HORIZON = 6
+# Memory use this many times the request makes a pod an early eviction candidate
+OVER_REQUEST = 1.5
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _number(quantity) -> float:
+    value = parse_quantity(quantity)
+    return np.nan if value is None else value
+
+
+def _cores(value: float) -> str:
+    if np.isnan(value):
+        return "-"
+    return f"{value * 1000:.0f}m" if value < 1 else f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def _bytes(value: float) -> str:
+    if np.isnan(value):
+        return "-"
+    return f"{value / 2 ** 30:.1f}Gi" if value >= 2 ** 30 else f"{value / 2 ** 20:.0f}Mi"
+
+
+def _percent(part: float, whole: float) -> str:
+    return "-" if np.isnan(part) or np.isnan(whole) or not whole else f"{100 * part / whole:.0f}%"
+
+
+class SampleBuffer:
+    """
+    The last ``capacity`` samples of many series in preallocated float32
+    arrays, one per field, of rows x slots used as a ring. A sweep writes one
+    column; a series missing from a sweep reads NaN there. Rows are added as
+    new series appear, doubling the arrays when they are full.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int = 120, rows: int = 256):
+        self.capacity = capacity
+        self.keys: List[tuple] = []
+        self.index: Dict[tuple, int] = {}
+        self.times = np.full(capacity, np.nan)
+        # Column-major, so a sweep writes one contiguous column
+        self.values = {name: np.full((rows, capacity), np.nan, np.float32, order='F') for name in fields}
+        self.samples = 0
+
+    def _rows(self, keys: Sequence[tuple]) -> np.ndarray:
+        rows = np.empty(len(keys), np.int64)
+        for i, key in enumerate(keys):
+            row = self.index.get(key)
+            if row is None:
+                row = self.index[key] = len(self.keys)
+                self.keys.append(key)
+            rows[i] = row
+        allocated = next(iter(self.values.values())).shape[0]
+        if len(self.keys) > allocated:
+            size = max(len(self.keys), allocated * 2)
+            for name, array in self.values.items():
+                grown = np.full((size, self.capacity), np.nan, np.float32, order='F')
+                grown[:allocated] = array
+                self.values[name] = grown
+        return rows
+
+    def add(self, ts: float, keys: Sequence[tuple], columns: Dict[str, Sequence[float]]):
+        """One sample: ``columns[field][i]`` is the value of series ``keys[i]``"""
+        rows = self._rows(keys)
+        slot = self.samples % self.capacity
+        self.times[slot] = ts
+        for name, array in self.values.items():
+            array[:, slot] = np.nan
+            array[rows, slot] = columns[name]
+        self.samples += 1
+
+    @property
+    def last_time(self) -> Optional[float]:
+        return float(self.times[(self.samples - 1) % self.capacity]) if self.samples else None
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + sum(array.nbytes for array in self.values.values())
+
+    def window(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Sample times and values of the series seen so far, oldest sample first"""
+        taken = min(self.samples, self.capacity)
+        order = (np.arange(taken) + self.samples - taken) % self.capacity
+        return self.times[order], {name: array[:len(self.keys), order] for name, array in self.values.items()}
+
+    def stats(self, name: str) -> Dict[str, np.ndarray]:
+        """Per series: latest, mean and peak value, samples, and the least-squares slope per second"""
+        times, values = self.window()
+        v = values[name].astype(np.float64)
+        valid = ~np.isnan(v)
+        count = valid.sum(axis=1)
+        filled = np.where(valid, v, 0)
+        mean = filled.sum(axis=1) / np.maximum(count, 1)
+        peak = np.where(valid, v, -np.inf).max(axis=1, initial=-np.inf)
+        t = np.where(valid, times - (times[0] if len(times) else 0), 0)
+        dt = np.where(valid, t - (t.sum(axis=1) / np.maximum(count, 1))[:, None], 0)
+        spread = (dt ** 2).sum(axis=1)
+        slope = (dt * (filled - mean[:, None])).sum(axis=1) / np.where(spread > 0, spread, 1)
+        return {
+            'latest': v[:, -1] if v.shape[1] else np.full(len(v), np.nan),
+            'mean': np.where(count > 0, mean, np.nan),
+            'peak': np.where(count > 0, peak, np.nan),
+            'count': count,
+            'slope': np.where((count >= 3) & (spread > 0), slope, np.nan),
+        }
+
+
+class ResourceMetrics:
+    """
+    Resource usage of one cluster. A sweep reads the usage of every pod and
+    every node with one metrics API call each, not one ``kubectl top`` per
+    pod, and appends it to array-backed sample buffers. Several sweeps, or
+    the jobs of a long-running daemon, build up a short history in memory
+    that shows peaks and growth, not just the latest value.
+    """
+
+    def __init__(self, cluster: str = "default", capacity: Optional[int] = None):
+        capacity = capacity or int(os.getenv("HELM_METRICS_SAMPLES", "120"))
+        self.cluster = cluster
+        # (namespace, pod, container) and (node,) series of cores and bytes
+        self.pods = SampleBuffer(('cpu', 'memory'), capacity)
+        self.nodes = SampleBuffer(('cpu', 'memory'), capacity, rows=16)
+        # node -> (allocatable cores, allocatable bytes)
+        self.allocatable: Dict[str, Tuple[float, float]] = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def sweep(self, backend, timeout: float = 15) -> bool:
+        """Sample every pod and node once; False when metrics-server has nothing newer than the last sweep"""
+        pods, nodes = backend.pod_metrics(timeout), backend.node_metrics(timeout)
+        stamp = max((_timestamp(item.get('timestamp')) or 0 for item in pods), default=0) or time.time()
+        keys, cpu, memory = [], [], []
+        for item in pods:
+            meta = item.get('metadata') or {}
+            for container in item.get('containers') or []:
+                usage = container.get('usage') or {}
+                keys.append((meta.get('namespace', ''), meta.get('name', ''), container.get('name', '')))
+                cpu.append(_number(usage.get('cpu')))
+                memory.append(_number(usage.get('memory')))
+        with self._lock:
+            self.calls += 2
+            if stamp == self.pods.last_time:
+                return False
+            self.pods.add(stamp, keys, {'cpu': cpu, 'memory': memory})
+            self.nodes.add(stamp, [((item.get('metadata') or {}).get('name', ''),) for item in nodes], {
+                'cpu': [_number((item.get('usage') or {}).get('cpu')) for item in nodes],
+                'memory': [_number((item.get('usage') or {}).get('memory')) for item in nodes],
+            })
+        return True
+
+    def sample(self, backend, sweeps: int = 1, interval: float = 15, timeout: float = 15) -> int:
+        """Node capacity, then ``sweeps`` sweeps ``interval`` seconds apart; the number of new samples"""
+        allocatable = {}
+        for node in backend.list_nodes(timeout):
+            available = (node.get('status') or {}).get('allocatable') or {}
+            allocatable[node['metadata']['name']] = (_number(available.get('cpu')), _number(available.get('memory')))
+        with self._lock:
+            self.calls += 1
+            self.allocatable = allocatable
+        taken = 0
+        for i in range(max(1, sweeps)):
+            if i:
+                time.sleep(interval)
+            taken += self.sweep(backend, timeout)
+        return taken
+
+    def items(self, inventory: Optional[PodInventory] = None, namespaces: Optional[List[str]] = None,
+              limit: Optional[int] = None) -> List[Item]:
+        """
+        Usage joined with requests and limits from ``inventory``, as evidence
+        items: a summary, node utilisation, containers near a limit, growing
+        towards one or above their request, and the top consumers.
+        """
+        limit = limit or int(os.getenv("HELM_METRICS_LIMIT", "25"))
+        with self._lock:
+            if not self.pods.samples:
+                return []
+            keys = list(self.pods.keys)
+            cpu, memory = self.pods.stats('cpu'), self.pods.stats('memory')
+            times, _ = self.pods.window()
+            node_keys = [key[0] for key in self.nodes.keys]
+            node_cpu, node_memory = self.nodes.stats('cpu')['latest'], self.nodes.stats('memory')['latest']
+            allocatable = dict(self.allocatable)
+
+        spec = {(pod.namespace, pod.name, c.name): (pod, c) for pod in inventory.pods for c in pod.containers} \
+            if inventory is not None else {}
+        joined = [spec.get(key, (None, None)) for key in keys]
+
+        def column(attribute):
+            values = [getattr(c, attribute, None) for _, c in joined]
+            return np.array([np.nan if v is None else v for v in values], np.float64)
+
+        cpu_request, cpu_limit = column('cpu_request'), column('cpu_limit')
+        memory_request, memory_limit = column('memory_request'), column('memory_limit')
+        scope = np.array([namespaces is None or key[0] in namespaces for key in keys]) & ~np.isnan(cpu['latest'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            memory_used = memory['peak'] / memory_limit
+            cpu_used = cpu['peak'] / cpu_limit
+            hours_left = (memory_limit - memory['latest']) / (memory['slope'] * 3600)
+            growing = (memory['slope'] > 0) & (memory['slope'] * (times[-1] - times[0]) > 0.05 * memory['mean'])
+            over_request = memory['latest'] > OVER_REQUEST * memory_request
+        near_memory = scope & (memory_used >= NEAR_LIMIT)
+        near_cpu = scope & (cpu_used >= NEAR_LIMIT)
+        leaking = scope & growing & (hours_left < GROWTH_HORIZON)
+        over_request &= scope
+
+        span = times[-1] - times[0]
+        samples = len(times)
+        section = (f"=== RESOURCE USAGE: {samples} sample{'s' if samples != 1 else ''}"
+                   + (f" over {span / 60:.0f}m" if samples > 1 else "") + " ===")
+        used_cpu, used_memory = np.nansum(cpu['latest'][scope]), np.nansum(memory['latest'][scope])
+        total_cpu = sum(a[0] for a in allocatable.values())
+        total_memory = sum(a[1] for a in allocatable.values())
+        summary = (f"{int(scope.sum())} containers: CPU {_cores(used_cpu)} used, "
+                   f"{_cores(np.nansum(cpu_request[scope]))} requested"
+                   + (f", of {_cores(total_cpu)} allocatable" if namespaces is None and total_cpu else "")
+                   + f"; memory {_bytes(used_memory)} used, {_bytes(np.nansum(memory_request[scope]))} requested"
+                   + (f", of {_bytes(total_memory)} allocatable" if namespaces is None and total_memory else "")
+                   + f". {int(near_memory.sum())} near their memory limit, {int(near_cpu.sum())} at their CPU limit, "
+                   f"{int(leaking.sum())} growing towards their memory limit, "
+                   f"{int(over_request.sum())} using over {OVER_REQUEST:g}x their memory request, "
+                   f"{int((scope & np.isnan(memory_limit)).sum())} without a memory limit")
+        items = [Item(summary, section, pinned=True)]
+
+        if namespaces is None and node_keys:
+            rows = []
+            for name, used_cpu_node, used_memory_node in zip(node_keys, node_cpu, node_memory):
+                cores, capacity = allocatable.get(name, (np.nan, np.nan))
+                rows.append([name, _cores(used_cpu_node), _percent(used_cpu_node, cores),
+                             _bytes(used_memory_node), _percent(used_memory_node, capacity)])
+            lines = format_table(['NODE', 'CPU', 'CPU%', 'MEMORY', 'MEMORY%'], rows).splitlines()
+            items.append(Item(lines[0], "=== NODE USAGE ===", pinned=True))
+            for name, line, used_cpu_node, used_memory_node in zip(node_keys, lines[1:], node_cpu, node_memory):
+                cores, capacity = allocatable.get(name, (np.nan, np.nan))
+                pressure = used_cpu_node >= NODE_PRESSURE * cores or used_memory_node >= NODE_PRESSURE * capacity
+                items.append(Item(line, "=== NODE USAGE ===", SEVERITY_RANK['warning' if pressure else 'info']))
+
+        flagged = near_memory | near_cpu | leaking | over_request
+        top = set(np.argsort(-np.where(scope, cpu['latest'], -np.inf))[:5].tolist())
+        top |= set(np.argsort(-np.where(scope, memory['latest'], -np.inf))[:5].tolist())
+        rows = sorted(set(np.flatnonzero(flagged).tolist()) | {i for i in top if scope[i]},
+                      key=lambda i: (-int(near_memory[i] or leaking[i]), -int(near_cpu[i]), -memory_used[i]
+                                     if not np.isnan(memory_used[i]) else 0, -cpu['latest'][i]))
+        section = "=== CONTAINER USAGE (flagged and top consumers) ==="
+        for i in rows[:limit]:
+            namespace, pod, container = keys[i]
+            node = joined[i][0].node if joined[i][0] is not None else None
+            problems = []
+            if near_memory[i]:
+                problems.append("memory near its limit (OOM risk)")
+            if leaking[i]:
+                problems.append(f"memory growing, limit reached in ~{hours_left[i]:.1f}h")
+            if near_cpu[i]:
+                problems.append("CPU at its limit (throttled)")
+            if over_request[i]:
+                problems.append(f"memory {memory['latest'][i] / memory_request[i]:.1f}x its request "
+                                "(evicted first under node pressure)")
+            text = (f"{namespace}/{pod} [{container}]" + (f" on {node}" if node else "")
+                    + f": cpu {_cores(cpu['latest'][i])} (peak {_cores(cpu['peak'][i])}, "
+                    f"request {_cores(cpu_request[i])}, limit {_cores(cpu_limit[i])}"
+                    + (f", {_percent(cpu['peak'][i], cpu_limit[i])} of limit" if not np.isnan(cpu_limit[i]) else "")
+                    + f") | memory {_bytes(memory['latest'][i])} (peak {_bytes(memory['peak'][i])}, "
+                    f"request {_bytes(memory_request[i])}, limit {_bytes(memory_limit[i])}")
+            if not np.isnan(memory_limit[i]):
+                text += (f", {_percent(memory['peak'][i], memory_limit[i])} of limit, "
+                         f"{_bytes(max(memory_limit[i] - memory['peak'][i], 0))} headroom")
+            if not np.isnan(memory['slope'][i]) and growing[i]:
+                text += f", {'+' if memory['slope'][i] > 0 else ''}{_bytes(memory['slope'][i] * 3600)}/h"
+            text += ")" + (f" | {'; '.join(problems)}" if problems else "")
+            severity = 'error' if near_memory[i] or (leaking[i] and hours_left[i] < 1) else \
+                'warning' if problems else 'info'
+            items.append(Item(text, section, SEVERITY_RANK[severity], key=f"usage:{namespace}/{pod}/{container}"))
+        return items
+
+
+_metrics: Dict[str, ResourceMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def get_metrics(backend) -> ResourceMetrics:
+    """The shared usage buffers of the backend's cluster, kept for the life of the process"""
+    with _metrics_lock:
+        if backend.cluster_id not in _metrics:
+            _metrics[backend.cluster_id] = ResourceMetrics(backend.cluster_id)
+        return _metrics[backend.cluster_id]
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("HELM_METRICS", "1") != "0"
+
+
+def sample_metrics(backend, sweeps: Optional[int] = None, interval: Optional[float] = None) -> ResourceMetrics:
+    """Sample the backend's cluster $HELM_METRICS_SWEEPS times, $HELM_METRICS_INTERVAL seconds apart"""
+    metrics = get_metrics(backend)
+    metrics.sample(backend, sweeps or int(os.getenv("HELM_METRICS_SWEEPS", "1")),
+                   interval if interval is not None else float(os.getenv("HELM_METRICS_INTERVAL", "15")))
+    return metrics
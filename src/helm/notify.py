@@ -0,0 +1,309 @@
+"""Outbound Slack notifications: queued, batched into digests, rate limited and deduplicated."""
+import atexit
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from helm import tracing
+from helm.kube import parse_duration
+from helm.state import state_path
+
+SEVERITY_COLORS = {
+    "critical": "#FF0000", "high": "#FF6600", "medium": "#FFCC00",
+    "low": "#0066CC", "info": "#36a64f"
+}
+
+SEVERITY_EMOJI = {
+    "critical": "🚨", "high": "⚠️", "medium": "🔶", "low": "🔵", "info": "ℹ️"
+}
+
+_SEVERITY_ORDER = ["critical", "high", "medium", "low", "info"]
+
+# Parts of an alert that change between runs without making it a different alert: timestamps,
+# durations, percentages and counts ("12 restarts", "x3", "count=5"). Other numbers (IPs, ports,
+# status codes, names like team-1) tell alerts apart and are kept.
+_VOLATILE_RE = re.compile(
+    r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'
+    r'|\b\d{2}:\d{2}:\d{2}(?:\.\d+)?\b'
+    r'|(?<![\w.-])\d+(?:\.\d+)?\s?(?:%|(?:ms|s|m|h|d|sec|secs|seconds?|mins?|minutes?|hours?|days?'
+    r'|times|restarts?|errors?|warnings?|events?|occurrences?|failures?|attempts?|retries|lines)\b)'
+    r'|\b(?:x|count[=:]\s?)\d+\b',
+    re.IGNORECASE)
+
+
+@dataclass
+class Alert:
+    message: str
+    severity: str = "info"
+    title: str = "K8s Alert"
+    created: float = field(default_factory=time.time)
+    # Identical alerts raised while this one was still queued
+    count: int = 1
+
+    @property
+    def fingerprint(self) -> str:
+        # Counts and timestamps change between runs without making it a different alert
+        text = _VOLATILE_RE.sub('#', f"{self.severity}|{self.title}|{self.message}")
+        return hashlib.sha256(' '.join(text.lower().split()).encode()).hexdigest()[:16]
+
+    def attachment(self) -> Dict:
+        title = f"{SEVERITY_EMOJI.get(self.severity, 'ℹ️')} {self.title}"
+        if self.count > 1:
+            title += f" (x{self.count})"
+        return {
+            "color": SEVERITY_COLORS.get(self.severity, "#36a64f"),
+            "title": title,
+            "text": self.message,
+            "fields": [
+                {"title": "Severity", "value": self.severity.upper(), "short": True},
+                {"title": "Time", "value": datetime.fromtimestamp(self.created).strftime("%H:%M:%S"), "short": True}
+            ]
+        }
+
+
+def digest_payload(alerts: List[Alert]) -> Dict:
+    """One Slack message for a batch: a single alert as before, several as a digest, most severe first"""
+    payload = {"username": "K8s Log Analyzer", "icon_emoji": ":kubernetes:"}
+    alerts = sorted(alerts, key=lambda a: _SEVERITY_ORDER.index(a.severity) if a.severity in _SEVERITY_ORDER else 99)
+    if len(alerts) > 1:
+        worst = alerts[0].severity
+        payload["text"] = f"{SEVERITY_EMOJI.get(worst, 'ℹ️')} {len(alerts)} alerts from the Kubernetes log analysis"
+    payload["attachments"] = [alert.attachment() for alert in alerts]
+    return payload
+
+
+class FingerprintStore:
+    """
+    Fingerprints of alerts already sent, remembered for ``window`` seconds
+    across runs. Saving merges with the file on disk, so a cron run and the
+    daemon sharing the state directory do not forget each other's alerts.
+    """
+
+    def __init__(self, path: Optional[str] = None, window: Optional[float] = None):
+        self.path = path or state_path("slack_sent.json")
+        self.window = window if window is not None else parse_duration(os.getenv("HELM_SLACK_DEDUP_WINDOW", "6h"))
+        self._lock = threading.Lock()
+        self._sent: Dict[str, float] = self._read()
+
+    def _read(self) -> Dict[str, float]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def recent(self, fingerprint: str, now: Optional[float] = None) -> bool:
+        """True if the alert was sent within the window"""
+        with self._lock:
+            sent = self._sent.get(fingerprint)
+        return sent is not None and (now or time.time()) - sent < self.window
+
+    def mark(self, fingerprints: Iterable[str], now: Optional[float] = None):
+        now = now or time.time()
+        with self._lock:
+            for fingerprint in fingerprints:
+                self._sent[fingerprint] = now
+        self.save()
+
+    def save(self):
+        cutoff = time.time() - self.window
+        with self._lock:
+            merged = self._read()
+            for fingerprint, sent in self._sent.items():
+                merged[fingerprint] = max(sent, merged.get(fingerprint, 0))
+            self._sent = {k: v for k, v in merged.items() if v >= cutoff}
+            data = json.dumps(self._sent)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self._sent)
+
+
+class SlackNotifier:
+    """
+    Sends alerts to a Slack webhook from a background thread over one pooled
+    session, so callers never wait on the network. Alerts raised within
+    ``batch_window`` seconds of the first queued one go out as one digest
+    message, and messages are at least ``min_interval`` seconds apart (Slack
+    allows about one per second per webhook). A 429 is retried after its
+    Retry-After, connection errors and 5xx with exponential backoff. An alert
+    sent within the dedup window, or already queued, is not sent again.
+    """
+
+    def __init__(self, webhook_url: str, store: Optional[FingerprintStore] = None,
+                 batch_window: Optional[float] = None, min_interval: Optional[float] = None,
+                 max_batch: int = 20, max_retries: int = 5, max_backoff: float = 30.0):
+        self.webhook_url = webhook_url
+        self.store = store or FingerprintStore()
+        self.batch_window = batch_window if batch_window is not None else \
+            float(os.getenv("HELM_SLACK_BATCH_SECONDS", "10"))
+        self.min_interval = min_interval if min_interval is not None else \
+            float(os.getenv("HELM_SLACK_MIN_INTERVAL", "1"))
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.queue: "queue.Queue[Optional[Alert]]" = queue.Queue()
+        self.pending: Dict[str, Alert] = {}
+        self.sent = self.messages = self.suppressed = self.retries = self.rate_limited = self.failed = 0
+        self._last_post = 0.0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._flush = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self, message: str, severity: str = "info", title: str = "K8s Alert") -> bool:
+        """Queue an alert; False when it is a duplicate and will not be sent"""
+        alert = Alert(message, severity, title)
+        fingerprint = alert.fingerprint
+        with self._lock:
+            if fingerprint in self.pending:
+                self.pending[fingerprint].count += 1
+                self.suppressed += 1
+                return False
+            if self.store.recent(fingerprint):
+                self.suppressed += 1
+                return False
+            self.pending[fingerprint] = alert
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="helm-slack", daemon=True)
+                self._thread.start()
+        self.queue.put(alert)
+        return True
+
+    def _work(self):
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                return
+            batch = [alert]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                # On flush, take what is already queued but do not wait for more
+                remaining = 0 if self._flush.is_set() else deadline - time.monotonic()
+                try:
+                    alert = self.queue.get(timeout=min(remaining, 0.1)) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    if remaining <= 0:
+                        break
+                    continue
+                if alert is None:
+                    self._send(batch)
+                    return
+                batch.append(alert)
+            self._send(batch)
+
+    def _send(self, batch: List[Alert]):
+        with tracing.span("slack post", "notify", alerts=len(batch)) as span:
+            delivered = self._post(digest_payload(batch))
+            span.set(delivered=delivered)
+        fingerprints = [alert.fingerprint for alert in batch]
+        if delivered:
+            self.store.mark(fingerprints)
+        with self._lock:
+            for fingerprint in fingerprints:
+                self.pending.pop(fingerprint, None)
+            if delivered:
+                self.sent += len(batch)
+                self.messages += 1
+            else:
+                self.failed += len(batch)
+            self._idle.notify_all()
+
+    def _post(self, payload: Dict) -> bool:
+        for attempt in range(self.max_retries + 1):
+            wait = self._last_post + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_post = time.monotonic()
+            tracing.current_span().add('attempts')
+            delay = min(self.max_backoff, 0.5 * 2 ** attempt) * random.uniform(0.8, 1.2)
+            try:
+                response = self.session.post(self.webhook_url, json=payload, timeout=10)
+            except requests.RequestException as e:
+                error = str(e)
+            else:
+                if response.status_code == 200:
+                    return True
+                error = f"HTTP {response.status_code}"
+                if response.status_code == 429:
+                    self.rate_limited += 1
+                    try:
+                        delay = float(response.headers.get("Retry-After", delay))
+                    except ValueError:
+                        pass
+                elif response.status_code < 500:
+                    # The payload or the webhook is wrong; retrying will not help
+                    print(f"⚠️ Slack notification failed: {error} {response.text[:200]}")
+                    return False
+            if attempt < self.max_retries:
+                self.retries += 1
+                time.sleep(delay)
+        print(f"⚠️ Slack notification failed after {self.max_retries + 1} attempts: {error}")
+        return False
+
+    def flush(self, timeout: float = 60) -> bool:
+        """Send everything queued now, without waiting out the batch window; False on timeout"""
+        self._flush.set()
+        deadline = time.monotonic() + timeout
+        try:
+            with self._lock:
+                while self.pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._idle.wait(remaining)
+            return True
+        finally:
+            self._flush.clear()
+
+    def summary(self) -> str:
+        text = f"{self.sent} alerts in {self.messages} messages, {self.suppressed} duplicates suppressed"
+        if self.rate_limited:
+            text += f", {self.rate_limited} rate limited"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+
+_notifiers: Dict[str, SlackNotifier] = {}
+_notifiers_lock = threading.Lock()
+
+
+def get_notifier(webhook_url: str) -> SlackNotifier:
+    """The shared notifier of a webhook, so every run in the process uses one queue and session"""
+    with _notifiers_lock:
+        if webhook_url not in _notifiers:
+            _notifiers[webhook_url] = SlackNotifier(webhook_url)
+        return _notifiers[webhook_url]
+
+
+def flush_notifiers(timeout: float = 60) -> List[str]:
+    """Send all queued alerts; one summary per notifier that was used"""
+    with _notifiers_lock:
+        notifiers = list(_notifiers.values())
+    summaries = []
+    for notifier in notifiers:
+        notifier.flush(timeout)
+        if notifier.sent or notifier.suppressed or notifier.failed:
+            summaries.append(notifier.summary())
+    return summaries
+
+
+atexit.register(flush_notifiers)
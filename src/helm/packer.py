@@ -0,0 +1,142 @@
+"""Token-budgeted packing of evidence into agent prompts."""
+import os
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# gpt-4o's tokenizer; any other model is close enough for budgeting
+DEFAULT_ENCODING = "o200k_base"
+
+# Evidence budgets per task, in tokens
+TASK_BUDGETS = {
+    'log_analysis_task': int(os.getenv("HELM_ANALYSIS_TOKENS", "24000")),
+    'alerting_task': int(os.getenv("HELM_FOLLOWUP_TOKENS", "8000")),
+    'reporting_task': int(os.getenv("HELM_FOLLOWUP_TOKENS", "8000")),
+}
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception:
+        # Not installed, or the encoding cannot be downloaded
+        return None
+
+
+def count_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    """Tokenizer-backed size of ``text``, or ~4 characters per token without tiktoken"""
+    enc = _encoding(encoding)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, tokens: int, encoding: str = DEFAULT_ENCODING) -> str:
+    enc = _encoding(encoding)
+    if enc is None:
+        return text if len(text) <= tokens * 4 else text[:tokens * 4] + '...'
+    encoded = enc.encode(text, disallowed_special=())
+    return text if len(encoded) <= tokens else enc.decode(encoded[:tokens]) + '...'
+
+
+@dataclass
+class Item:
+    """One piece of evidence competing for space in a prompt"""
+    text: str
+    section: str = ""
+    priority: int = 0
+    timestamp: Optional[str] = None
+    key: Optional[str] = None
+    pinned: bool = False
+    count: int = 1
+
+
+class ContextPacker:
+    """
+    Fills a token budget with the most important evidence. Pinned items
+    (headers, summaries) always go in; the rest are taken by priority, newest
+    first within a priority, skipping anything that no longer fits. Items with
+    the same key are merged and counted. The chosen items are rendered back in
+    their original order under their section headings.
+    """
+
+    def __init__(self, budget: Optional[int] = None, max_item_tokens: int = 400,
+                 encoding: str = DEFAULT_ENCODING):
+        self.budget = budget
+        self.max_item_tokens = max_item_tokens
+        self.encoding = encoding
+        self.used = 0
+        self.omitted = 0
+
+    def _dedupe(self, items: Iterable[Item]) -> List[Item]:
+        merged: Dict[str, Item] = {}
+        unique = []
+        for item in items:
+            if item.key is None:
+                unique.append(item)
+                continue
+            first = merged.get(item.key)
+            if first is None:
+                # A copy, so the caller's items can be packed again with another budget
+                merged[item.key] = first = replace(item)
+                unique.append(first)
+                continue
+            first.count += item.count
+            if (item.priority, item.timestamp or '') > (first.priority, first.timestamp or ''):
+                first.text, first.priority, first.timestamp = item.text, item.priority, item.timestamp
+        return unique
+
+    def pack(self, items: Iterable[Item]) -> str:
+        items = self._dedupe(items)
+        sections = list(dict.fromkeys(item.section for item in items))
+        texts, costs = {}, {}
+        for item in items:
+            text = f"{item.text} (x{item.count})" if item.count > 1 else item.text
+            if self.max_item_tokens and not item.pinned:
+                text = truncate_tokens(text, self.max_item_tokens, self.encoding)
+            texts[id(item)] = text
+            costs[id(item)] = count_tokens(text, self.encoding) + 1
+
+        # Newest first, then a stable sort puts the highest priority first
+        order = sorted(items, key=lambda i: i.timestamp or '', reverse=True)
+        order.sort(key=lambda i: (not i.pinned, -i.priority))
+        # Room for a section's "... N more omitted" line, in case one is needed
+        footer = count_tokens(_omitted(999), self.encoding) + 1
+        chosen, used, opened = set(), 0, set()
+        for item in order:
+            cost = costs[id(item)]
+            if item.section not in opened:
+                cost += footer + (count_tokens(item.section, self.encoding) + 1 if item.section else 0)
+            if not item.pinned and self.budget is not None and used + cost > self.budget:
+                continue
+            chosen.add(id(item))
+            opened.add(item.section)
+            used += cost
+
+        out = []
+        self.omitted = hidden = 0
+        for section in sections:
+            members = [item for item in items if item.section == section]
+            kept = [item for item in members if id(item) in chosen]
+            dropped = len(members) - len(kept)
+            self.omitted += dropped
+            if not kept:
+                hidden += dropped
+                continue
+            if section:
+                out.append(section)
+            out.extend(texts[id(item)] for item in kept)
+            if dropped:
+                out.append(_omitted(dropped))
+            if section:
+                out.append("")
+        if hidden:
+            out.append(_omitted(hidden, " items in other sections"))
+        self.used = used
+        return '\n'.join(out).rstrip('\n')
+
+
+def _omitted(count: int, what: str = "") -> str:
+    return f"... {count} more{what} omitted to fit the token budget"
@@ -0,0 +1,14 @@
+"""Location of files the tool keeps between runs (cursors, caches, history)."""
+import os
+
+
+def state_dir() -> str:
+    """Directory for persistent state, overridable with $HELM_STATE_DIR"""
+    default = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "helm")
+    path = os.getenv("HELM_STATE_DIR", default)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def state_path(name: str) -> str:
+    return os.path.join(state_dir(), name)
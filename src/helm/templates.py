@@ -0,0 +1,182 @@
+"""Drain-style log template mining to compress repeated log lines before analysis."""
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from helm.classifier import SEVERITY_RANK
+
+WILDCARD = '<*>'
+
+# Variable parts of a line are masked before clustering, most specific first
+_MASKS = [
+    (re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'), '<TS>'),
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<UUID>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<IP>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b'), '<HEX>'),
+    (re.compile(r'(?<![\w.])[-+]?\d+(?:\.\d+)?(?:ns|us|µs|ms|s|m|h|d|B|KB|MB|GB|Ki|Mi|Gi|%)?\b'), '<NUM>'),
+]
+
+
+def mask(line: str) -> str:
+    for pattern, replacement in _MASKS:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+def _is_variable(token: str) -> bool:
+    return token.startswith('<') and token.endswith('>') or any(c.isdigit() for c in token)
+
+
+@dataclass
+class LogTemplate:
+    id: int
+    tokens: List[str]
+    count: int = 0
+    severity: str = 'info'
+    first_seen: Optional[str] = None
+    last_seen: Optional[str] = None
+    sample: str = ""
+    pods: Set[str] = field(default_factory=set)
+    more_pods: bool = False
+    categories: Set[str] = field(default_factory=set)
+    # Lines per namespace, so a table can be rendered for part of the cluster
+    namespaces: Counter = field(default_factory=Counter)
+
+    @property
+    def template(self) -> str:
+        return ' '.join(self.tokens)
+
+    def similarity(self, tokens: List[str]) -> Tuple[float, int]:
+        same = wildcards = 0
+        for mine, theirs in zip(self.tokens, tokens):
+            if mine == WILDCARD:
+                wildcards += 1
+            elif mine == theirs:
+                same += 1
+        return same / len(tokens), wildcards
+
+
+class TemplateMiner:
+    """
+    Online Drain clustering: lines are routed through a fixed-depth prefix tree
+    keyed on token count and leading tokens, then matched against the templates
+    in the leaf by token similarity. Each template carries counts, first/last
+    seen times, the pods it appeared in and one sample line.
+    """
+
+    def __init__(self, depth: int = 4, similarity: float = 0.4, max_children: int = 100,
+                 max_templates: int = 5000, max_pods_per_template: int = 10):
+        self.prefix_depth = max(1, depth - 2)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_templates = max_templates
+        self.max_pods = max_pods_per_template
+        self.templates: List[LogTemplate] = []
+        self.lines = 0
+        self.unclustered = 0
+        self._root: Dict = {}
+        self._lock = threading.Lock()
+
+    def _leaf(self, tokens: List[str]) -> List[LogTemplate]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.prefix_depth]:
+            key = WILDCARD if _is_variable(token) else token
+            if key not in node:
+                if len(node) >= self.max_children:
+                    key = WILDCARD
+                node = node.setdefault(key, {})
+            else:
+                node = node[key]
+        return node.setdefault(None, [])
+
+    def add(self, line: str, source: Optional[str] = None, timestamp: Optional[str] = None,
+            severity: str = 'info', categories: Iterable[str] = ()) -> Optional[LogTemplate]:
+        tokens = mask(line).split()
+        if not tokens:
+            return None
+        with self._lock:
+            self.lines += 1
+            leaf = self._leaf(tokens)
+            best, best_key = None, (-1.0, -1)
+            for candidate in leaf:
+                key = candidate.similarity(tokens)
+                if key > best_key:
+                    best, best_key = candidate, key
+            if best is None or best_key[0] < self.similarity:
+                if len(self.templates) >= self.max_templates:
+                    self.unclustered += 1
+                    return None
+                best = LogTemplate(len(self.templates) + 1, tokens, sample=line)
+                leaf.append(best)
+                self.templates.append(best)
+            else:
+                best.tokens = [mine if mine == theirs else WILDCARD for mine, theirs in zip(best.tokens, tokens)]
+
+            best.count += 1
+            best.categories.update(categories)
+            if SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(best.severity, 0):
+                best.severity = severity
+                best.sample = line
+            if timestamp:
+                if best.first_seen is None or timestamp < best.first_seen:
+                    best.first_seen = timestamp
+                if best.last_seen is None or timestamp > best.last_seen:
+                    best.last_seen = timestamp
+            if source:
+                best.namespaces[source.split('/', 1)[0]] += 1
+            if source and source not in best.pods:
+                if len(best.pods) < self.max_pods:
+                    best.pods.add(source)
+                else:
+                    # Keep the first pods by name, not by arrival, so the table is
+                    # the same whatever order the parallel fetches finish in
+                    best.more_pods = True
+                    last = max(best.pods)
+                    if source < last:
+                        best.pods.discard(last)
+                        best.pods.add(source)
+            return best
+
+    def ranked(self) -> List[LogTemplate]:
+        """Most severe first, then most frequent"""
+        return sorted(self.templates, key=lambda t: (-SEVERITY_RANK.get(t.severity, 0), -t.count, t.id))
+
+    def rows(self, limit: Optional[int] = None, sample_chars: int = 160,
+             namespaces: Optional[Iterable[str]] = None) -> List[Tuple[LogTemplate, int, str]]:
+        """(template, line count, rendered row) for the patterns seen in ``namespaces`` (default: all)"""
+        if namespaces is None:
+            counted = [(t, t.count) for t in self.ranked()]
+        else:
+            scope = set(namespaces)
+            counted = [(t, sum(n for ns, n in t.namespaces.items() if ns in scope)) for t in self.templates]
+            counted = sorted([(t, n) for t, n in counted if n],
+                             key=lambda c: (-SEVERITY_RANK.get(c[0].severity, 0), -c[1], c[0].id))
+        rows = []
+        for t, count in counted if limit is None else counted[:limit]:
+            pods = sorted(p for p in t.pods if namespaces is None or p.split('/', 1)[0] in scope)
+            pods = ', '.join(pods) + (', ...' if t.more_pods else '')
+            seen = f"{_short(t.first_seen)} → {_short(t.last_seen)}" if t.first_seen else "-"
+            tags = ','.join(sorted(c for c in t.categories if c not in ('error', 'warning')))
+            text = (f"[{t.severity.upper()}]" + (f" {{{tags}}}" if tags else "")
+                    + f" x{count} | {seen} | pods: {pods}\n    template: {t.template}")
+            if t.severity != 'info':
+                text += f"\n    sample:   {t.sample[:sample_chars]}"
+            rows.append((t, count, text))
+        return rows
+
+    def render_table(self, limit: Optional[int] = None, sample_chars: int = 160,
+                     namespaces: Optional[Iterable[str]] = None) -> str:
+        """Compact pattern table for the analyzer prompt, optionally for some namespaces only"""
+        every = self.rows(None, sample_chars, namespaces)
+        shown = every if limit is None else every[:limit]
+        lines = self.lines if namespaces is None else sum(count for _, count, _ in every)
+        header = (f"{len(every)} patterns from {lines} lines"
+                  + (f" (showing top {len(shown)})" if len(shown) < len(every) else ""))
+        return '\n'.join([header] + [text for _, _, text in shown])
+
+
+def _short(timestamp: Optional[str]) -> str:
+    """Drop the fraction of a normalised timestamp for display"""
+    return timestamp.split('.')[0] + 'Z' if timestamp and '.' in timestamp else (timestamp or '')
@@ -0,0 +1,310 @@
+"""
+Span-based tracing of a run: CLI actions, crew tasks, tool calls, cluster
+requests and LLM calls, exported as OTLP JSON and summarised as a profile.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Stages a span can belong to, in the order the profile lists them
+STAGES = ['cli', 'collect', 'analysis', 'task', 'tool', 'llm', 'kube', 'history', 'notify', 'report']
+# Stages whose spans wait on another system; OTLP kind CLIENT rather than INTERNAL
+_CLIENT_STAGES = {'kube', 'llm', 'notify'}
+
+
+@dataclass
+class Span:
+    name: str
+    stage: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    # Epoch nanoseconds
+    start: int
+    end: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    tracer: Optional['Tracer'] = field(default=None, repr=False)
+
+    @property
+    def duration(self) -> float:
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+    def set(self, **attributes):
+        """Add attributes, e.g. bytes received or tokens, once they are known"""
+        self.attributes.update((k, v) for k, v in attributes.items() if v is not None)
+
+    def add(self, name: str, amount: float = 1):
+        """Increase a counting attribute"""
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def fail(self, message: str):
+        """Mark the span failed without raising, e.g. for an error returned as text"""
+        self.error = message
+
+    def finish(self, error: Optional[str] = None):
+        if self.end:
+            return
+        self.end = time.time_ns()
+        self.error = error or self.error
+        if self.tracer is not None:
+            self.tracer.record(self)
+
+    def otlp(self) -> Dict:
+        """The span in the OTLP/JSON encoding"""
+        attributes = [{'key': 'helm.stage', 'value': {'stringValue': self.stage}}]
+        for key, value in self.attributes.items():
+            if isinstance(value, bool):
+                encoded = {'boolValue': value}
+            elif isinstance(value, int):
+                encoded = {'intValue': str(value)}
+            elif isinstance(value, float):
+                encoded = {'doubleValue': value}
+            else:
+                encoded = {'stringValue': str(value)}
+            attributes.append({'key': f"helm.{key}", 'value': encoded})
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 3 if self.stage in _CLIENT_STAGES else 1,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': attributes,
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class _NoSpan:
+    """Stands in for a span when tracing is off, so call sites need no checks"""
+
+    def set(self, **attributes):
+        pass
+
+    def add(self, name: str, amount: float = 1):
+        pass
+
+    def fail(self, message: str):
+        pass
+
+    def finish(self, error: Optional[str] = None):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+_current: ContextVar[Optional[Span]] = ContextVar("helm_span", default=None)
+
+
+class Tracer:
+    """
+    Collects the finished spans of one process. Spans started in a thread
+    with no current span (a worker pool not wrapped with ``bind``) hang off
+    the open top-level span, so the tree stays connected.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+
+    def start(self, name: str, stage: str, **attributes) -> Span:
+        parent = _current.get() or (self.root if self.root is not None and not self.root.end else None)
+        span = Span(name, stage, self.trace_id, os.urandom(8).hex(), parent.span_id if parent else None,
+                    time.time_ns(), tracer=self)
+        span.set(**attributes)
+        if parent is None:
+            self.root = span
+        return span
+
+    def record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def export(self, path: Optional[str] = None) -> Optional[str]:
+        """
+        Append the spans recorded so far to ``path`` as one line of OTLP/JSON
+        (an ExportTraceServiceRequest), the format of the OpenTelemetry
+        collector's file exporter and otlpjsonfile receiver.
+        """
+        path = path or self.path
+        with self._lock:
+            spans, self.spans = self.spans, []
+        if not path or not spans:
+            return None
+        request = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'helm'}}]},
+            'scopeSpans': [{'scope': {'name': 'helm.tracing'}, 'spans': [s.otlp() for s in spans]}],
+        }]}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request) + "\n")
+        return path
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(path: Optional[str] = None) -> Tracer:
+    """Start tracing this process; spans are exported to ``path`` (default $HELM_TRACE_FILE)"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(path or os.getenv("HELM_TRACE_FILE") or None)
+    return _tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, stage: str, **attributes):
+    """Context manager timing a block as a child of the current span; yields the span"""
+    if _tracer is None:
+        return nullcontext(_NO_SPAN)
+    return _span(_tracer, name, stage, attributes)
+
+
+@contextmanager
+def _span(tracer: Tracer, name: str, stage: str, attributes: Dict):
+    current = tracer.start(name, stage, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.finish()
+
+
+def start_span(name: str, stage: str, **attributes):
+    """
+    A span that is not made current, for work that outlives the caller's
+    block, such as a generator streaming lines; end it with ``finish()``.
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.start(name, stage, **attributes)
+
+
+def activate(span):
+    """Make a span from ``start_span`` current until ``deactivate(token)``, for start/end callbacks"""
+    if _tracer is None or isinstance(span, _NoSpan):
+        return None
+    return _current.set(span)
+
+
+def deactivate(token):
+    if token is not None:
+        _current.reset(token)
+
+
+def current_span():
+    """The innermost open span, for adding attributes such as a cache hit"""
+    return (_current.get() if _tracer is not None else None) or _NO_SPAN
+
+
+def bind(function: Callable) -> Callable:
+    """``function`` run under the caller's current span, for work handed to a thread pool"""
+    if _tracer is None:
+        return function
+    parent = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+def _union(intervals: List[tuple]) -> float:
+    """Seconds covered by at least one of the (start, end) intervals"""
+    covered, reach = 0, None
+    for start, end in sorted(intervals):
+        if reach is None or start > reach:
+            covered += end - start
+            reach = end
+        elif end > reach:
+            covered += end - reach
+            reach = end
+    return covered / 1e9
+
+
+def profile(spans: List[Span], path_lines: int = 40) -> str:
+    """
+    Where the time of a run went: per stage the number of spans, the wall
+    time they cover (overlapping calls counted once), their summed time and
+    the slowest one, the bytes, tokens and cache hits they recorded, and the
+    critical path: under each span, the chain of child spans that ran back
+    to back up to its end, so shortening any of them shortens the run.
+    """
+    spans = [s for s in spans if s.end]
+    if not spans:
+        return "No spans recorded"
+    roots = [s for s in spans if s.parent_id is None]
+    start, end = min(s.start for s in spans), max(s.end for s in spans)
+    total = (end - start) / 1e9
+    by_stage: Dict[str, List[Span]] = {}
+    for s in spans:
+        by_stage.setdefault(s.stage, []).append(s)
+    order = [stage for stage in STAGES if stage in by_stage] + sorted(set(by_stage) - set(STAGES))
+
+    lines = [f"⏱️ Profile: {total:.2f}s, {len(spans)} spans",
+             f"{'STAGE':<10} {'SPANS':>6} {'WALL':>8} {'SHARE':>6} {'SUMMED':>8} {'SLOWEST':>8}  DETAILS"]
+    for stage in order:
+        members = by_stage[stage]
+        wall = _union([(s.start, s.end) for s in members])
+        slowest = max(members, key=lambda s: s.duration)
+        details = []
+        for key, label in (('bytes', "bytes"), ('tokens_in', "tokens in"), ('tokens_out', "tokens out"),
+                           ('cache_hit', "cache hits")):
+            amount = sum(s.attributes.get(key, 0) for s in members)
+            if amount:
+                details.append(f"{int(amount):,} {label}")
+        errors = sum(1 for s in members if s.error)
+        if errors:
+            details.append(f"{errors} failed")
+        details.append(f"slowest: {slowest.name}")
+        lines.append(f"{stage:<10} {len(members):6} {wall:7.2f}s {wall / total if total else 0:6.0%} "
+                     f"{sum(s.duration for s in members):7.2f}s {slowest.duration:7.2f}s  {', '.join(details)}")
+
+    children: Dict[str, List[Span]] = {}
+    for s in spans:
+        if s.parent_id:
+            children.setdefault(s.parent_id, []).append(s)
+    lines.append("Critical path:")
+
+    def walk(node: Span, depth: int):
+        if len(lines) >= path_lines:
+            return
+        lines.append(f"{'  ' * depth}{node.name} [{node.stage}] {node.duration:.2f}s"
+                     + (f" (failed: {node.error[:60]})" if node.error else ""))
+        # Backwards from the end: the child that finished last, then the one that finished before it started...
+        chain, cursor = [], node.end
+        while True:
+            before = [c for c in children.get(node.span_id, []) if c.end <= cursor]
+            if not before:
+                break
+            chain.append(max(before, key=lambda c: c.end))
+            cursor = chain[-1].start
+        for child in reversed(chain):
+            walk(child, depth + 1)
+
+    walk(max(roots, key=lambda s: s.end) if roots else max(spans, key=lambda s: s.end), 0)
+    return "\n".join(lines)
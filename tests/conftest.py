@@ -0,0 +1,32 @@
+import pytest
+
+import fake_kubectl
+from fake_apiserver import FakeApiServer
+from helm import events
+from helm.kube import close_backends
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Cursors, caches and event indexes of each test go to its own state directory"""
+    path = tmp_path / "state"
+    monkeypatch.setenv("HELM_STATE_DIR", str(path))
+    monkeypatch.setenv("CREWAI_TELEMETRY_OPT_OUT", "true")
+    monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+    yield path
+    # Backends and event indexes are shared per context; the next test has new servers
+    close_backends()
+    events._indexes.clear()
+
+
+@pytest.fixture
+def cluster_config():
+    """A small, fast fake cluster"""
+    return dict(fake_kubectl.config(), namespaces=3, pods=2, latency=0, log_lines=20)
+
+
+@pytest.fixture
+def apiserver(cluster_config):
+    server = FakeApiServer(cluster_config).start()
+    yield server
+    server.stop()
@@ -0,0 +1,61 @@
+import pytest
+
+from helm.classifier import DEFAULT_RULES_FILE, LogClassifier
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return LogClassifier.from_file(DEFAULT_RULES_FILE)
+
+
+@pytest.mark.parametrize("line", [
+    '{"level":"info","msg":"timeoutSeconds set to 30"}',
+    'INFO restartPolicy=Always timeoutSeconds=30',
+    'probe config failureThreshold=3',
+    'sigsegv_handler installed',
+    'error404 page not cached',
+    'listening on 10.0.0.1:40123',
+])
+def test_identifiers_and_numbers_do_not_match_as_prefixes(classifier, line):
+    result = classifier.classify(line)
+    assert result.severity == 'info'
+    assert result.categories == ()
+
+
+@pytest.mark.parametrize("line, severity, category", [
+    ('3 errors occurred', 'error', 'error'),
+    ('process crashed', 'error', 'crash'),
+    ('Connection timeout', 'warning', 'timeout'),
+    ('pod restarts 5', 'warning', 'restart'),
+    ('received SIGSEGV', 'error', 'crash'),
+    ('Status: CrashLoopBackOff', 'error', 'crash'),
+    ('Warning: FailedMount MountVolume.SetUp failed', 'error', 'storage'),
+    ('HTTP 503 from upstream', 'warning', 'network'),
+])
+def test_keywords_match_at_word_starts(classifier, line, severity, category):
+    result = classifier.classify(line)
+    assert result.severity == severity
+    assert category in result.categories
+
+
+def test_explicit_level_wins_over_broad_keywords(classifier):
+    result = classifier.classify('{"level":"info","msg":"request timed out, restarting"}')
+    assert result.severity == 'info'
+    assert result.categories == ('timeout', 'restart')
+    assert classifier.classify('INFO 3 errors retried').severity == 'info'
+
+
+def test_explicit_level_raised_by_specific_categories(classifier):
+    assert classifier.classify('INFO container OOMKilled').severity == 'error'
+
+
+@pytest.mark.parametrize("line, severity", [
+    ('2024-05-01T10:00:00Z ERROR connection lost', 'error'),
+    ('[warn] disk almost full', 'warning'),
+    ('E0501 10:00:00.000000 1 controller.go:12] sync', 'error'),
+    ('msg="done" level=warning', 'warning'),
+    ('User info request failed', 'error'),
+    ('trace id 42 completed', 'info'),
+])
+def test_levels(classifier, line, severity):
+    assert classifier.classify(line).severity == severity
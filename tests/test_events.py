@@ -0,0 +1,32 @@
+from helm.events import EventIndex
+
+
+def event(uid, count, last, reason="BackOff"):
+    return {'metadata': {'uid': uid, 'namespace': 'default', 'resourceVersion': '1'},
+            'involvedObject': {'kind': 'Pod', 'name': 'api-1'}, 'reason': reason, 'type': 'Warning',
+            'count': count, 'firstTimestamp': last, 'lastTimestamp': last}
+
+
+def test_top_reasons_counts_only_the_window(tmp_path):
+    index = EventIndex("test", path=str(tmp_path / "events.json"))
+    index.apply('ADDED', event('old', 500, '2024-05-01T00:00:00Z'))
+    index.apply('ADDED', event('new', 3, '2024-05-10T12:00:00Z'))
+    assert index.top_reasons('2024-05-10T00:00:00Z') == [('BackOff', 'Warning', 3, 1)]
+    assert index.top_reasons() == [('BackOff', 'Warning', 503, 1)]
+
+
+def test_modified_events_are_not_counted_twice(tmp_path):
+    index = EventIndex("test", path=str(tmp_path / "events.json"))
+    index.apply('ADDED', event('a', 2, '2024-05-10T12:00:00Z'))
+    index.apply('MODIFIED', event('a', 5, '2024-05-10T12:05:00Z'))
+    assert index.top_reasons('2024-05-10T12:01:00Z') == [('BackOff', 'Warning', 5, 1)]
+
+
+def test_prune_drops_old_event_objects_of_kept_records(tmp_path):
+    index = EventIndex("test", path=str(tmp_path / "events.json"))
+    index.apply('ADDED', event('old', 500, '2024-05-01T00:00:00Z'))
+    index.apply('ADDED', event('new', 3, '2024-05-10T12:00:00Z'))
+    index.prune('2024-05-05T00:00:00Z')
+    record, = index.records.values()
+    assert (record.sources, record.count) == ({'new': 3}, 3)
+    assert list(record.source_seen) == ['new']
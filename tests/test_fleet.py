@@ -0,0 +1,112 @@
+import contextlib
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import fake_kubectl
+from fake_apiserver import FakeApiServer, write_fleet_kubeconfig
+from helm.cursors import CursorStore
+from helm.fleet import fan_out
+from stub_llm import StubLLM
+
+
+def test_failing_cluster_fails_alone():
+    def job(context):
+        if context == "broken":
+            raise RuntimeError("API server unreachable")
+        return None, f"report of {context}"
+
+    results = fan_out(["a", "broken", "b"], job)
+    assert [r.context for r in results] == ["a", "broken", "b"]
+    assert [r.ok for r in results] == [True, False, True]
+    assert results[1].error == "RuntimeError: API server unreachable"
+    assert results[2].report == "report of b"
+
+
+def test_cluster_past_the_deadline_fails_alone():
+    release = threading.Event()
+
+    def job(context):
+        if context == "hung":
+            release.wait(30)
+        return None, context
+
+    started = time.monotonic()
+    results = fan_out(["a", "hung", "b"], job, max_workers=2, deadline=0.5)
+    release.set()
+    assert time.monotonic() - started < 5
+    assert [r.ok for r in results] == [True, False, True]
+    assert "not finished within 0.5s" in results[1].error
+
+
+def test_saves_from_several_stores_are_merged(tmp_path):
+    path = str(tmp_path / "cursors.json")
+    stores = [CursorStore(path, scope="fleet") for _ in range(8)]
+
+    def scan(i, store):
+        for pod in range(50):
+            store.advance(store.key(f"cluster-{i}", "default", f"pod-{pod}", "app", 0),
+                          f"2024-05-01T10:00:{pod:02d}.000000000Z")
+        store.save()
+
+    threads = [threading.Thread(target=scan, args=(i, store)) for i, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(path) as f:
+        saved = json.load(f)
+    assert len(saved) == 8 * 50
+    assert len(CursorStore(path, scope="fleet")) == 8 * 50
+
+
+def test_newer_cursor_wins_the_merge(tmp_path):
+    path = str(tmp_path / "cursors.json")
+    stale, fresh = CursorStore(path), CursorStore(path)
+    key = fresh.key("c", "default", "pod", "app", 0)
+    fresh.advance(key, "2024-05-01T10:00:00.000000000Z")
+    fresh.save()
+    stale.save()
+    assert CursorStore(path).get(key) == "2024-05-01T10:00:00.000000000Z"
+
+
+@pytest.fixture
+def fleet(tmp_path, monkeypatch):
+    """Two clusters of different sizes and one that is down, in one kubeconfig"""
+    servers = {name: FakeApiServer(dict(fake_kubectl.config(), namespaces=size, pods=2, latency=0,
+                                        log_lines=20)).start()
+               for name, size in (("small", 3), ("large", 5))}
+    down = FakeApiServer().start()
+    urls = {name: server.url for name, server in servers.items()}
+    urls["down"] = down.url
+    down.stop()
+    monkeypatch.setenv("KUBECONFIG", write_fleet_kubeconfig(str(tmp_path / "config"), urls))
+    monkeypatch.setenv("HELM_KUBE_BACKEND", "api")
+    monkeypatch.setenv("HELM_LLM_CACHE", "0")
+    monkeypatch.setenv("HELM_FLEET_REPORT_DIR", str(tmp_path / "reports"))
+    monkeypatch.chdir(tmp_path)
+    yield servers
+    for server in servers.values():
+        server.stop()
+
+
+def test_fleet_analysis_keeps_clusters_apart(fleet, tmp_path, state_dir):
+    from helm.main import run_fleet_analysis
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {r.context: r for r in run_fleet_analysis(llm=StubLLM(latency=0), incremental=True)}
+
+    assert results["down"].ok is False
+    assert results["small"].ok and results["large"].ok
+    # Each cluster's evidence comes from its own API server
+    assert len(results["small"].evidence.scan.namespaces) == 3
+    assert len(results["large"].evidence.scan.namespaces) == 5
+    assert (tmp_path / "reports" / "fleet_report.md").exists()
+    # Both clusters' cursors survive their concurrent saves, in the fleet scope
+    with open(state_dir / "log_cursors.json") as f:
+        keys = list(json.load(f))
+    assert all(key.startswith("fleet:") for key in keys)
+    assert {key.split(":", 1)[1].split("/")[0] for key in keys} == {"small", "large"}
@@ -0,0 +1,92 @@
+import sys
+import textwrap
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import yaml
+
+from helm.kube import ApiBackend, KubeError, load_kubeconfig
+
+# A client-go credential plugin handing out token-1, token-2, ... one per run
+PLUGIN = textwrap.dedent("""
+    import json, os, sys
+    counter = sys.argv[1]
+    runs = int(open(counter).read()) + 1 if os.path.exists(counter) else 1
+    open(counter, "w").write(str(runs))
+    status = {"token": f"token-{runs}"}
+    if os.getenv("EXPIRES"):
+        status["expirationTimestamp"] = os.environ["EXPIRES"]
+    print(json.dumps({"apiVersion": "client.authentication.k8s.io/v1", "kind": "ExecCredential",
+                      "status": status}))
+""")
+
+
+def write_kubeconfig(path, server, user):
+    config = {
+        'apiVersion': 'v1', 'kind': 'Config', 'current-context': 'fake',
+        'clusters': [{'name': 'fake', 'cluster': {'server': server.url}}],
+        'users': [{'name': 'fake', 'user': user}],
+        'contexts': [{'name': 'fake', 'context': {'cluster': 'fake', 'user': 'fake'}}],
+    }
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+
+@pytest.fixture
+def plugin(tmp_path):
+    script = tmp_path / "plugin.py"
+    script.write_text(PLUGIN)
+    counter = tmp_path / "runs"
+
+    def exec_user(expires=None):
+        env = [{'name': 'EXPIRES', 'value': expires}] if expires else []
+        return {'exec': {'apiVersion': 'client.authentication.k8s.io/v1', 'command': sys.executable,
+                         'args': [str(script), str(counter)], 'env': env}}
+
+    exec_user.runs = lambda: int(counter.read_text()) if counter.exists() else 0
+    return exec_user
+
+
+def test_rejected_token_is_refreshed_and_retried(tmp_path, apiserver, plugin):
+    backend = ApiBackend(load_kubeconfig(write_kubeconfig(tmp_path / "config", apiserver, plugin())))
+    apiserver.tokens = {'token-1'}
+    assert 'default' in backend.list_namespaces()
+    # The token is revoked: the next request gets a 401, runs the plugin again and retries
+    apiserver.tokens = {'token-2'}
+    assert 'default' in backend.list_namespaces()
+    assert apiserver.unauthorized == 1
+    assert plugin.runs() == 2
+    assert backend.session.headers['Authorization'] == "Bearer token-2"
+
+
+def test_refresh_is_retried_only_once(tmp_path, apiserver, plugin):
+    backend = ApiBackend(load_kubeconfig(write_kubeconfig(tmp_path / "config", apiserver, plugin())))
+    apiserver.tokens = set()
+    with pytest.raises(KubeError, match="401"):
+        backend.list_namespaces()
+    assert apiserver.unauthorized == 2
+    assert plugin.runs() == 2
+
+
+def test_static_token_is_not_refreshed(tmp_path, apiserver):
+    backend = ApiBackend(load_kubeconfig(write_kubeconfig(tmp_path / "config", apiserver, {'token': 'old'})))
+    apiserver.tokens = {'new'}
+    with pytest.raises(KubeError, match="401"):
+        backend.list_namespaces()
+    assert apiserver.unauthorized == 1
+
+
+def test_token_is_renewed_before_it_expires(tmp_path, apiserver, plugin):
+    # Expires within the refresh margin, so every request renews it first
+    soon = (datetime.now(timezone.utc) + timedelta(seconds=30)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    backend = ApiBackend(load_kubeconfig(write_kubeconfig(tmp_path / "config", apiserver, plugin(soon))))
+    backend.list_namespaces()
+    assert plugin.runs() == 2
+    assert apiserver.unauthorized == 0
+
+
+def test_token_file_is_relative_to_the_kubeconfig(tmp_path, apiserver):
+    (tmp_path / "kube").mkdir()
+    (tmp_path / "kube" / "token").write_text("file-token\n")
+    config = load_kubeconfig(write_kubeconfig(tmp_path / "kube" / "config", apiserver, {'tokenFile': 'token'}))
+    assert config.token == "file-token"
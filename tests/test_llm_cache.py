@@ -0,0 +1,92 @@
+import contextlib
+import io
+import time
+
+import pytest
+
+from helm.llm_cache import CachedLLM, LLMCache
+from stub_llm import StubLLM
+
+
+def prompt(evidence):
+    return [{'role': 'system', 'content': "You are a Kubernetes log analyst."},
+            {'role': 'user', 'content': f"Analyze this evidence:\n{evidence}"}]
+
+
+@pytest.fixture
+def stub():
+    return StubLLM(latency=0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(path=str(tmp_path / "llm_cache"))
+
+
+def test_repeated_prompt_is_answered_from_the_cache(stub, cache):
+    llm = CachedLLM(stub, cache)
+    first = llm.call(prompt("api-1 OOMKilled"))
+    assert llm.call(prompt("api-1 OOMKilled")) == first
+    assert stub.calls == 1
+    assert (cache.hits, cache.misses, cache.stores) == (1, 1, 1)
+
+
+def test_timestamps_and_durations_do_not_change_the_key(stub, cache):
+    llm = CachedLLM(stub, cache)
+    llm.call(prompt("2024-05-01T10:00:00Z api-1 request took 120ms"))
+    llm.call(prompt("2024-05-02T11:30:05Z api-1 request took 87ms"))
+    assert stub.calls == 1
+
+
+def test_different_evidence_misses(stub, cache):
+    llm = CachedLLM(stub, cache)
+    llm.call(prompt("api-1 OOMKilled"))
+    llm.call(prompt("api-2 CrashLoopBackOff"))
+    assert stub.calls == 2
+    assert cache.hits == 0
+
+
+def test_cache_is_shared_across_runs(stub, cache):
+    CachedLLM(stub, cache).call(prompt("api-1 OOMKilled"))
+    again = CachedLLM(stub, LLMCache(path=cache.path))
+    again.call(prompt("api-1 OOMKilled"))
+    assert stub.calls == 1
+    assert again.cache.hits == 1
+
+
+def test_expired_entries_miss(stub, tmp_path):
+    cache = LLMCache(path=str(tmp_path / "llm_cache"), ttl=0)
+    llm = CachedLLM(stub, cache)
+    llm.call(prompt("api-1 OOMKilled"))
+    time.sleep(0.01)
+    llm.call(prompt("api-1 OOMKilled"))
+    assert stub.calls == 2
+
+
+def test_function_calling_bypasses_the_cache(stub, cache):
+    llm = CachedLLM(stub, cache)
+    tools = [{'type': 'function', 'function': {'name': 'collect_logs'}}]
+    llm.call(prompt("api-1 OOMKilled"), tools=tools)
+    llm.call(prompt("api-1 OOMKilled"), tools=tools)
+    assert stub.calls == 2
+    assert cache.hits + cache.misses == 0
+
+
+def test_repeated_crew_run_is_served_from_the_cache(apiserver, tmp_path, monkeypatch):
+    from helm.crew import KubernetesLogAnalysis
+    from helm.main import get_default_inputs
+
+    # Pods stopped logging a minute ago, so both runs collect the same evidence
+    apiserver.cfg['quiet_since'] = time.time() - 60
+    monkeypatch.setenv("HELM_KUBE_BACKEND", "api")
+    monkeypatch.setenv("KUBECONFIG", apiserver.write_kubeconfig(str(tmp_path / "config")))
+    monkeypatch.chdir(tmp_path)
+    stubs = []
+    for _ in range(2):
+        stubs.append(StubLLM(latency=0))
+        analyzer = KubernetesLogAnalysis(incremental=False, llm=stubs[-1], cache=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyzer.crew().kickoff(inputs=get_default_inputs())
+    assert stubs[0].calls > 0
+    assert stubs[1].calls == 0
+    assert analyzer.llm.cache.misses == 0
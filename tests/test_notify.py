@@ -0,0 +1,71 @@
+import pytest
+
+from fake_slack import FakeSlack
+from helm.notify import Alert, FingerprintStore, SlackNotifier
+
+
+@pytest.fixture
+def slack():
+    server = FakeSlack(rate=1.0, latency=0, retry_after=1).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FingerprintStore(str(tmp_path / "slack_sent.json"), window=3600)
+
+
+def notifier(slack, store, **options):
+    return SlackNotifier(slack.url, store, **dict({'batch_window': 0, 'min_interval': 0}, **options))
+
+
+def test_duplicates_are_folded_into_one_alert(slack, store):
+    sender = notifier(slack, store, batch_window=0.5)
+    assert sender.notify("pod api-1 restarted 5 times", "high", "Restarts")
+    assert not sender.notify("pod api-1 restarted 6 times", "high", "Restarts")
+    assert sender.flush(10)
+    assert len(slack.messages) == 1
+    assert slack.messages[0]['attachments'][0]['title'].endswith("(x2)")
+    assert (sender.sent, sender.suppressed) == (1, 1)
+
+
+def test_sent_alerts_are_not_repeated_by_the_next_run(slack, store):
+    first = notifier(slack, store)
+    first.notify("10.0.0.5:5432 connection refused", "high")
+    assert first.flush(10)
+    again = notifier(slack, FingerprintStore(store.path, window=3600))
+    assert not again.notify("10.0.0.5:5432 connection refused", "high")
+    # Another host is another alert
+    assert again.notify("10.0.0.6:5432 connection refused", "high")
+    assert again.flush(10)
+    assert slack.alerts == 2
+
+
+def test_identifying_numbers_tell_alerts_apart():
+    assert Alert("HTTP 503 from payments").fingerprint != Alert("HTTP 502 from payments").fingerprint
+    assert Alert("team-1 quota exceeded").fingerprint != Alert("team-2 quota exceeded").fingerprint
+    assert Alert("3 errors at 2024-05-01T10:00:00Z").fingerprint == \
+        Alert("7 errors at 2024-05-02T11:00:00Z").fingerprint
+
+
+def test_rate_limited_message_is_retried_after_retry_after(slack, store):
+    sender = notifier(slack, store)
+    sender.notify("first alert", "high")
+    assert sender.flush(10)
+    # Within Slack's one message per second: 429, then sent after Retry-After
+    sender.notify("second alert", "high")
+    assert sender.flush(10)
+    assert slack.throttled >= 1
+    assert sender.rate_limited >= 1
+    assert [m['attachments'][0]['text'] for m in slack.messages] == ["first alert", "second alert"]
+    assert sender.failed == 0
+
+
+def test_alerts_raised_together_go_out_as_one_digest(slack, store):
+    sender = notifier(slack, store, batch_window=0.5)
+    for i in range(5):
+        sender.notify(f"node-{i} NotReady", "critical")
+    assert sender.flush(10)
+    assert len(slack.messages) == 1
+    assert slack.alerts == 5